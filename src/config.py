@@ -1,21 +1,30 @@
 import os
 import logging
-from typing import Dict, NamedTuple
-
-class Scenario(NamedTuple):
-    name: str
-    temp_increase: float
-    carbon_price: float
-    renewable_energy: float
-    policy_stringency: float
-    biodiversity_loss: float
-    ecosystem_degradation: float
-    financial_stability: float
-    supply_chain_disruption: float
-    biodiversity_index: float  # New parameter
-    ecosystem_health: float  # New parameter
-    financial_system_stability: float  # New parameter
-    global_supply_chain_resilience: float  # New parameter
+from typing import Dict
+from src.models import Scenario
+
+# File paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+OUTPUT_DIR = os.environ.get('OUTPUT_DIR', os.path.join(BASE_DIR, 'output'))
+
+# Simulation parameters
+NUM_SIMULATIONS = 1000
+
+# Model configuration
+LLM_MODEL = "gpt-3.5-turbo"
+LLM_API_KEY = os.environ.get('OPENAI_API_KEY')
+
+# Visualization settings
+VIZ_DPI = 300
+HEATMAP_CMAP = 'YlOrRd'
+
+# Analysis parameters
+TIME_SERIES_HORIZON = 10  # Years projected by the time series analysis
+
+def setup_logging(log_level: str = "INFO") -> None:
+    logging.basicConfig(level=getattr(logging, log_level.upper(), logging.INFO),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
 # Scenario definitions
 SCENARIOS: Dict[str, Scenario] = {
@@ -96,4 +105,63 @@ SCENARIOS: Dict[str, Scenario] = {
     )
 }
 
+# Parallel execution
+RISK_CHUNK_SIZE = 64  # Risks per process-pool work unit in the Monte Carlo engines
+
+# Monte Carlo output for the scenario model: full draws, or per risk/scenario summaries
+SIMULATION_MODES = ('full', 'streaming', 'adaptive')
+SIMULATION_MODE = 'full'
+
+# Streaming Monte Carlo summaries
+STREAMING_BATCH_SIZE = 10000  # Draws held in memory at once per work unit
+STREAMING_BLOCK_SIZE = 100000  # Draws per independently seeded, mergeable work unit
+STREAMING_HISTOGRAM_BINS = 2048  # Quantile sketch resolution on [0, 1]
+STREAMING_PERCENTILES = (5, 50, 95)
+
+# Adaptive (target-precision) Monte Carlo
+ADAPTIVE_BATCH_SIZE = 1000  # Draws per convergence check
+ADAPTIVE_MAX_SIMULATIONS = 100000  # Hard cap per risk/scenario cell
+ADAPTIVE_TOLERANCE = 0.005  # Target confidence-interval half-width of each mean and percentile
+
+# LLM backend
+LLM_BACKEND = 'openai'  # openai, record, replay or stub
+LLM_TRANSCRIPT_PATH = os.path.join('cache', 'llm_transcript.jsonl')  # Written by record, read by replay
+LLM_STUB_LATENCY_SECONDS = 0.0
+LLM_STUB_JITTER_SECONDS = 0.0
+LLM_REPLAY_LATENCY = False  # Replay sleeps for each response's recorded latency
+
+# LLM response cache
+LLM_CACHE_MODE = 'read-write'  # read-write, read-only or off
+LLM_CACHE_PATH = os.path.join('cache', 'llm_responses.sqlite')
+LLM_CACHE_TTL_SECONDS = 30 * 24 * 3600  # Entries older than this are treated as misses and evicted
+LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Least recently used responses are evicted beyond this size
+
+# Concurrent LLM requests
+LLM_MAX_CONCURRENCY = 8  # Requests in flight at once
+LLM_REQUESTS_PER_MINUTE = 500
+LLM_TOKENS_PER_MINUTE = 90000  # Prompt estimate plus max_tokens per request
+LLM_MAX_RETRIES = 5  # Retries on 429/5xx responses, with exponential backoff
+LLM_BACKOFF_BASE_SECONDS = 1.0
+LLM_BACKOFF_MAX_SECONDS = 60.0
+
+# Risk interaction scoring
+INTERACTION_BLOCK_SIZE = 8  # Risks per side of a k x k tile in block-scoring mode
+INTERACTION_CANDIDATES_PER_RISK = 10  # Most similar partners per risk sent to the scorer in sparse mode
+INTERACTION_SIMILARITY_CHUNK_SIZE = 1024  # Rows of the similarity matrix held in memory at once
+INTERACTION_MATRIX_PATH = os.path.join('cache', 'interaction_matrix.npz')  # Last matrix, reused for unchanged risks
+INTERACTION_SPARSE_MAX_DENSITY = 0.1  # Matrices with at most this share of non-zero entries are stored as CSR
+AGGREGATE_IMPACT_CHUNK_SIZE = 1000  # Simulations propagated together as columns of one (risks x sims) block
+INTERACTION_POWER_MAX_RISKS = 4000  # Largest register for which dense (I + 0.1A)^T transition powers are precomputed
+GRAPH_METRICS_CACHE_SIZE = 8  # Network versions whose metrics are kept
+GRAPH_EXACT_BETWEENNESS_MAX_NODES = 500  # Larger networks use pivot-sampled betweenness
+GRAPH_BETWEENNESS_EPSILON = 0.05  # Additive error bound of sampled normalised betweenness ...
+GRAPH_BETWEENNESS_DELTA = 0.1  # ... holding for all nodes with probability 1 - delta
+GRAPH_PIVOT_BATCH_SIZE = 256  # Pivots whose distance rows are held in memory at once
+TIPPING_POINT_MODES = ('grid', 'adaptive')
+TIPPING_POINT_MODE = 'grid'  # grid scans TIPPING_POINT_LEVELS levels; adaptive refines a coarse scan by bisection
+TIPPING_POINT_LEVELS = 100
+TIPPING_POINT_COARSE_LEVELS = 17  # Levels of the first adaptive scan
+TIPPING_POINT_RESOLUTION = 0.01  # Adaptive search stops once the break is bracketed this tightly
+TIPPING_POINT_BATCH_SIZE = 1000  # (risk, level) evaluations propagated together
+
 # Keep existing content below this line
\ No newline at end of file
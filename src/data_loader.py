@@ -1,6 +1,7 @@
 import pandas as pd
 from typing import List, Dict
 from src.models import Risk, ExternalData
+from src.external_data import ExternalDataTable, OPTIONAL_EXTERNAL_DATA_DEFAULTS
 
 def load_risk_data(file_path: str) -> List[Risk]:
     try:
@@ -52,4 +53,13 @@ def load_external_data(file_path: str) -> Dict[str, ExternalData]:
     except FileNotFoundError:
         raise FileNotFoundError(f"External data file not found: {file_path}")
     except pd.errors.EmptyDataError:
-        raise ValueError(f"External data file is empty: {file_path}")
\ No newline at end of file
+        raise ValueError(f"External data file is empty: {file_path}")
+
+def load_external_data_table(file_path: str) -> ExternalDataTable:
+    try:
+        df = pd.read_csv(file_path)
+        return ExternalDataTable.from_dataframe(df, OPTIONAL_EXTERNAL_DATA_DEFAULTS)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"External data file not found: {file_path}")
+    except pd.errors.EmptyDataError:
+        raise ValueError(f"External data file is empty: {file_path}")
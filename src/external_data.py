@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, Mapping, Optional, Sequence
+from src.models import ExternalData
+
+EXTERNAL_DATA_FIELDS = tuple(field for field in ExternalData.__fields__ if field != 'year')
+# Columns load_external_data fills with 0 when a CSV does not have them
+OPTIONAL_EXTERNAL_DATA_DEFAULTS = {'carbon_price': 0.0, 'renewable_energy_share': 0.0, 'biodiversity_index': 0.0, 'deforestation_rate': 0.0}
+
+class ExternalDataTable(Mapping):
+    # Columnar store for yearly external data: one NumPy array per field, rows sorted by integer year.
+    # It is a read-only Mapping[str, ExternalData] keyed by the year as a string, so every function
+    # that takes Dict[str, ExternalData] accepts it unchanged, while the array methods below give
+    # O(1) year lookups and vectorized perturbation.
+
+    def __init__(self, years: Sequence[int], columns: Mapping[str, Sequence[float]]):
+        # latest() and the array methods need at least one row, so an empty table is rejected up front
+        if len(years) == 0:
+            raise ValueError("External data table needs at least one year")
+        order = np.argsort(np.asarray(years, dtype=np.int64))
+        self.years = np.asarray(years, dtype=np.int64)[order]
+        self.values = np.column_stack([np.asarray(columns[field], dtype=float)[order] for field in EXTERNAL_DATA_FIELDS])
+        self._row_by_year = {int(year): i for i, year in enumerate(self.years)}
+
+    @classmethod
+    def from_records(cls, external_data: Mapping[str, ExternalData]) -> 'ExternalDataTable':
+        records = list(external_data.values())
+        return cls([record.year for record in records],
+                   {field: [getattr(record, field) for record in records] for field in EXTERNAL_DATA_FIELDS})
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, defaults: Optional[Mapping[str, float]] = None) -> 'ExternalDataTable':
+        # Columns missing from df are only filled from defaults; any other missing column is an error
+        defaults = defaults or {}
+        missing = [field for field in ('year',) + EXTERNAL_DATA_FIELDS if field not in df and field not in defaults]
+        if missing:
+            raise ValueError(f"External data is missing columns: {', '.join(missing)}")
+        columns = {field: df[field].to_numpy(dtype=float) if field in df else np.full(len(df), float(defaults[field]))
+                   for field in EXTERNAL_DATA_FIELDS}
+        return cls(df['year'].to_numpy(dtype=np.int64), columns)
+
+    def __getitem__(self, year: str) -> ExternalData:
+        # Non-numeric and fractional keys are missing years, so .get and `in` work as for a dict
+        try:
+            key = int(year)
+        except (TypeError, ValueError):
+            raise KeyError(year) from None
+        row = self._row_by_year.get(key) if key == float(year) else None
+        if row is None:
+            raise KeyError(year)
+        return self._record(row)
+
+    def __iter__(self) -> Iterator[str]:
+        return (str(year) for year in self.years)
+
+    def __len__(self) -> int:
+        return len(self.years)
+
+    def _record(self, row: int) -> ExternalData:
+        values = dict(zip(EXTERNAL_DATA_FIELDS, self.values[row].tolist()))
+        values['population'] = int(values['population'])
+        return ExternalData(year=int(self.years[row]), **values)
+
+    def column(self, field: str) -> np.ndarray:
+        return self.values[:, EXTERNAL_DATA_FIELDS.index(field)]
+
+    @property
+    def latest_year(self) -> int:
+        return int(self.years[-1])
+
+    def latest(self) -> ExternalData:
+        return self._record(len(self.years) - 1)
+
+    def year_range(self, start: int, end: int) -> 'ExternalDataTable':
+        # Inclusive year range as a new table; raises ValueError when no year falls in the range
+        mask = (self.years >= start) & (self.years <= end)
+        return ExternalDataTable(self.years[mask], {field: self.values[mask, i] for i, field in enumerate(EXTERNAL_DATA_FIELDS)})
+
+    def interpolate(self, year: float) -> Dict[str, float]:
+        # Linear interpolation between observed years, held constant outside the observed range
+        return {field: float(np.interp(year, self.years, self.values[:, i])) for i, field in enumerate(EXTERNAL_DATA_FIELDS)}
+
+    def perturb(self, num_samples: int, perturbation_scale: float = 0.05,
+                rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        # Vectorized perturb_external_data: (samples x years x fields) in one draw
+        rng = rng if rng is not None else np.random.default_rng()
+        noise = rng.normal(0, perturbation_scale, (num_samples,) + self.values.shape)
+        return np.maximum(0, self.values[None] * (1 + noise))
+
+def latest_external_data(external_data: Mapping[str, ExternalData]) -> ExternalData:
+    if isinstance(external_data, ExternalDataTable):
+        return external_data.latest()
+    return external_data[max(external_data.keys(), key=float)]
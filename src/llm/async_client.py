@@ -0,0 +1,118 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from src.config import (LLM_MODEL, LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_MAX_RETRIES,
+                        LLM_BACKOFF_BASE_SECONDS, LLM_BACKOFF_MAX_SECONDS)
+from src.llm.cache import LLMCache, cache_key
+from src.llm.backends import LLMBackend
+from src.llm.client import get_llm_cache, get_llm_backend
+
+# Awaitable transport: (model, messages, temperature, max_tokens) -> response text
+SendFunction = Callable[[str, List[Dict[str, str]], float, int], Awaitable[str]]
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+async def backend_send(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+    # Resolved per request, so a backend configured after the client was created is still used
+    return await get_llm_backend().acomplete(model, messages, temperature, max_tokens)
+
+def response_status(error: Exception) -> Optional[int]:
+    # HTTP status of a failed request, as exposed by openai errors (http_status) or HTTP clients (status_code)
+    status = getattr(error, 'http_status', None) or getattr(error, 'status_code', None)
+    return int(status) if status is not None else None
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    # Rough budget for the tokens-per-minute limit: ~4 characters per prompt token plus the completion cap
+    return sum(len(message["content"]) for message in messages) // 4 + max_tokens
+
+class TokenBucket:
+    # Continuously refilling budget of rate_per_minute units with a burst of at most capacity.
+    # Waiters are served in arrival order.
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.available = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.available < amount:
+                await asyncio.sleep((amount - self.available) / self.rate_per_second)
+                self._refill()
+            self.available -= amount
+
+class AsyncLLMClient:
+    # Concurrent chat requests with bounded concurrency, request and token rate limits, exponential
+    # backoff with jitter on 429/5xx responses and the shared response cache. Results come back in
+    # request order, so callers can assemble them positionally.
+
+    def __init__(self, send: Optional[SendFunction] = None, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 requests_per_minute: float = LLM_REQUESTS_PER_MINUTE, tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+                 max_retries: int = LLM_MAX_RETRIES, backoff_base: float = LLM_BACKOFF_BASE_SECONDS,
+                 backoff_max: float = LLM_BACKOFF_MAX_SECONDS, cache: Optional[LLMCache] = None,
+                 backend: Optional[LLMBackend] = None):
+        # send overrides backend, which defaults to the process-wide one
+        self.send = send if send is not None else backend.acomplete if backend is not None else backend_send
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = cache
+        self.retries = 0
+        self._loop = None
+
+    def _limiters(self) -> Tuple[asyncio.Semaphore, TokenBucket, TokenBucket]:
+        # asyncio primitives belong to one event loop, so they are rebuilt for each new loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._request_bucket = TokenBucket(self.requests_per_minute)
+            self._token_bucket = TokenBucket(self.tokens_per_minute)
+        return self._semaphore, self._request_bucket, self._token_bucket
+
+    async def complete(self, messages: List[Dict[str, str]], temperature: float = 0.7, max_tokens: int = 400,
+                       template: Optional[str] = None, model: str = LLM_MODEL) -> str:
+        cache = self.cache if self.cache is not None else get_llm_cache()
+        key = cache_key(model, messages, temperature, max_tokens, template)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        semaphore, request_bucket, token_bucket = self._limiters()
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                await request_bucket.acquire(1)
+                await token_bucket.acquire(estimate_tokens(messages, max_tokens))
+                try:
+                    content = await self.send(model, messages, temperature, max_tokens)
+                    break
+                except Exception as e:
+                    if response_status(e) not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                        raise
+                    self.retries += 1
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+        cache.put(key, content)
+        return content
+
+    async def complete_all(self, requests: List[Dict[str, Any]]) -> List[str]:
+        # requests are keyword arguments for complete()
+        return await asyncio.gather(*(self.complete(**request) for request in requests))
+
+def run_chat_completions(requests: List[Dict[str, Any]], client: Optional[AsyncLLMClient] = None) -> List[str]:
+    # Blocking entry point for synchronous pipeline stages
+    client = client if client is not None else AsyncLLMClient()
+    return asyncio.run(client.complete_all(requests))
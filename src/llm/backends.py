@@ -0,0 +1,162 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from src.config import LLM_API_KEY, LLM_REPLAY_LATENCY
+from src.llm.cache import cache_key
+
+LLM_BACKENDS = ('openai', 'record', 'replay', 'stub')
+
+class LLMBackend:
+    # Transport for chat requests: (model, messages, temperature, max_tokens) -> response text.
+    # Subclasses implement complete(); acomplete() runs it in a thread unless overridden.
+
+    def complete(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        raise NotImplementedError
+
+    async def acomplete(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        return await asyncio.to_thread(self.complete, model, messages, temperature, max_tokens)
+
+class OpenAIBackend(LLMBackend):
+    # The API key is set when the backend is created rather than when a module is imported,
+    # so offline backends never need the openai package or a key
+
+    def __init__(self, api_key: Optional[str] = LLM_API_KEY):
+        import openai
+        self.openai = openai
+        self.openai.api_key = api_key
+
+    def complete(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        response = self.openai.ChatCompletion.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message['content']
+
+    async def acomplete(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        response = await self.openai.ChatCompletion.acreate(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message['content']
+
+class RecordingBackend(LLMBackend):
+    # Forwards requests to another backend and appends each prompt/response pair, with the observed
+    # latency, to a JSON-lines transcript that ReplayBackend can serve later
+
+    def __init__(self, backend: LLMBackend, path: str):
+        self.backend = backend
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def complete(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        started_at = time.perf_counter()
+        response = self.backend.complete(model, messages, temperature, max_tokens)
+        self._record(model, messages, temperature, max_tokens, response, time.perf_counter() - started_at)
+        return response
+
+    async def acomplete(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        started_at = time.perf_counter()
+        response = await self.backend.acomplete(model, messages, temperature, max_tokens)
+        self._record(model, messages, temperature, max_tokens, response, time.perf_counter() - started_at)
+        return response
+
+    def _record(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int,
+                response: str, latency: float) -> None:
+        entry = {
+            "key": cache_key(model, messages, temperature, max_tokens),
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "response": response,
+            "latency": latency
+        }
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+class ReplayBackend(LLMBackend):
+    # Serves responses from a RecordingBackend transcript. With replay_latency the recorded latency
+    # of each response is reproduced, so production timings can be re-run offline.
+
+    def __init__(self, path: str, replay_latency: bool = False):
+        self.path = path
+        self.replay_latency = replay_latency
+        self.responses = {}
+        self.latencies = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.responses[entry["key"]] = entry["response"]
+                    self.latencies[entry["key"]] = entry.get("latency", 0.0)
+
+    def _lookup(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        key = cache_key(model, messages, temperature, max_tokens)
+        if key not in self.responses:
+            raise KeyError(f"No recorded response in {self.path} for this {model} request")
+        return key
+
+    def complete(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        key = self._lookup(model, messages, temperature, max_tokens)
+        if self.replay_latency:
+            time.sleep(self.latencies[key])
+        return self.responses[key]
+
+    async def acomplete(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        key = self._lookup(model, messages, temperature, max_tokens)
+        if self.replay_latency:
+            await asyncio.sleep(self.latencies[key])
+        return self.responses[key]
+
+def stub_response(messages: List[Dict[str, str]]) -> str:
+    # Deterministic placeholder: the same prompt always gets the same score between 0 and 1
+    score = int(cache_key('stub', messages, 0, 0)[:8], 16) / 0xFFFFFFFF
+    return f"Interaction score: {score:.2f}\nThis is a deterministic stub response for offline runs."
+
+class StubBackend(LLMBackend):
+    # Local stand-in that answers after latency +/- jitter seconds without any network access.
+    # responder maps the messages to the response text; the jitter stream is seeded for repeatable runs.
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0,
+                 responder: Callable[[List[Dict[str, str]]], str] = stub_response, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.responder = responder
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay(self) -> float:
+        with self._lock:
+            self.calls += 1
+            return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def complete(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        time.sleep(self._delay())
+        return self.responder(messages)
+
+    async def acomplete(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        await asyncio.sleep(self._delay())
+        return self.responder(messages)
+
+def create_llm_backend(name: str, transcript_path: Optional[str] = None, latency: float = 0.0,
+                       jitter: float = 0.0, replay_latency: bool = LLM_REPLAY_LATENCY) -> LLMBackend:
+    if name == 'openai':
+        return OpenAIBackend()
+    if name == 'record':
+        return RecordingBackend(OpenAIBackend(), transcript_path)
+    if name == 'replay':
+        return ReplayBackend(transcript_path, replay_latency=replay_latency)
+    if name == 'stub':
+        return StubBackend(latency, jitter)
+    raise ValueError(f"Unknown LLM backend: {name}. Expected one of {LLM_BACKENDS}")
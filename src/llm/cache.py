@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from src.config import LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_BYTES
+
+LLM_CACHE_MODES = ('read-write', 'read-only', 'off')
+
+def cache_key(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int,
+              template: Optional[str] = None) -> str:
+    # Content address of a request: any change to the model, template, rendered messages or
+    # sampling settings yields a new key, so stale responses are never served after an edit
+    payload = json.dumps({
+        "model": model,
+        "template": template,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class LLMCache:
+    # SQLite-backed response cache. Entries expire after ttl_seconds; once the stored responses
+    # exceed max_bytes the least recently used ones are evicted. read-only mode serves hits but
+    # never writes, which keeps shared caches stable across concurrent runs.
+
+    def __init__(self, path: str, mode: str = 'read-write', ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+                 max_bytes: int = LLM_CACHE_MAX_BYTES):
+        if mode not in LLM_CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode: {mode}. Expected one of {LLM_CACHE_MODES}")
+        self.path = path
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._connection = None
+        if mode != 'off':
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            self._connection.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        if self._connection is None:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.mode == 'read-write':
+                self._connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._connection.commit()
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        if self._connection is None or self.mode != 'read-write':
+            return
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode('utf-8')), now, now)
+            )
+            self.writes += 1
+            self._evict(now)
+            self._connection.commit()
+
+    def _evict(self, now: float) -> None:
+        expired = self._connection.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+        self.evictions += expired
+        total_bytes = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+        # Walk entries from least to most recently used until the cache fits again
+        excess = total_bytes - self.max_bytes
+        stale_keys = []
+        for key, size in self._connection.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if excess <= 0:
+                break
+            stale_keys.append((key,))
+            excess -= size
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+        self.evictions += len(stale_keys)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        entries = 0
+        if self._connection is not None:
+            with self._lock:
+                entries = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries
+        }
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,46 @@
+from typing import Dict, List, Optional
+from src.config import LLM_MODEL, LLM_CACHE_MODE, LLM_CACHE_PATH
+from src.llm.cache import LLMCache, cache_key
+from src.llm.backends import LLMBackend, OpenAIBackend
+
+# Process-wide backend used by every prompt-driven stage; the OpenAI backend is created on first use
+_llm_backend: Optional[LLMBackend] = None
+
+def configure_llm_backend(backend: LLMBackend) -> LLMBackend:
+    global _llm_backend
+    _llm_backend = backend
+    return _llm_backend
+
+def get_llm_backend() -> LLMBackend:
+    if _llm_backend is None:
+        return configure_llm_backend(OpenAIBackend())
+    return _llm_backend
+
+# Process-wide response cache shared by every prompt-driven stage; created lazily from config
+_llm_cache: Optional[LLMCache] = None
+
+def configure_llm_cache(mode: str = LLM_CACHE_MODE, path: str = LLM_CACHE_PATH) -> LLMCache:
+    global _llm_cache
+    if _llm_cache is not None:
+        _llm_cache.close()
+    _llm_cache = LLMCache(path, mode=mode)
+    return _llm_cache
+
+def get_llm_cache() -> LLMCache:
+    if _llm_cache is None:
+        return configure_llm_cache()
+    return _llm_cache
+
+def chat_completion(messages: List[Dict[str, str]], temperature: float = 0.7, max_tokens: int = 400,
+                    template: Optional[str] = None, model: str = LLM_MODEL) -> str:
+    # Single entry point for chat requests. template is the unrendered prompt the user message was
+    # built from; it is part of the cache key so template edits invalidate earlier responses.
+    cache = get_llm_cache()
+    key = cache_key(model, messages, temperature, max_tokens, template)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    content = get_llm_backend().complete(model, messages, temperature, max_tokens)
+    cache.put(key, content)
+    return content
@@ -3,20 +3,32 @@ import logging
 import argparse
 from typing import Dict, List
 
-from src.data_loader import load_risk_data, load_external_data
+from src.data_loader import load_risk_data, load_external_data_table
 from src.risk_analysis.categorization import categorize_risks, categorize_risks_multi_level, prioritize_risks
-from src.risk_analysis.interaction_analysis import analyze_risk_interactions, build_risk_network, identify_central_risks, detect_risk_clusters, analyze_risk_cascades, create_risk_interaction_matrix, simulate_risk_interactions
-from src.risk_analysis.scenario_analysis import simulate_scenario_impact, monte_carlo_simulation, llm_risk_assessment, analyze_scenario_sensitivity
+from src.risk_analysis.interaction_analysis import analyze_risk_interactions, build_risk_network, identify_central_risks, detect_risk_clusters, analyze_risk_cascades, update_interaction_matrix, simulate_risk_interactions, InteractionPropagator, create_risk_interaction_matrix, create_sparse_interaction_matrix
+from src.risk_analysis.scenario_analysis import (simulate_scenario_impacts, monte_carlo_simulation, streaming_monte_carlo_simulation,
+                                                adaptive_monte_carlo_simulation, llm_risk_assessment, analyze_scenario_sensitivity,
+                                                SCENARIO_MODEL, SCENARIO_MODEL_NAME)
+from src.risk_analysis.tail_risk import calculate_tail_risk
 from src.risk_analysis.time_series_analysis import time_series_analysis, analyze_impact_trends, identify_critical_periods, forecast_cumulative_impact
 from src.risk_analysis.advanced_analysis import conduct_advanced_risk_analysis, assess_aggregate_impact, identify_tipping_points
 from src.visualization import generate_visualizations
 from src.reporting import generate_report
-from src.config import SCENARIOS, OUTPUT_DIR, setup_logging
+from src.config import (SCENARIOS, OUTPUT_DIR, LLM_CACHE_MODE, LLM_CACHE_PATH, LLM_BACKEND, LLM_TRANSCRIPT_PATH,
+                        LLM_STUB_LATENCY_SECONDS, LLM_STUB_JITTER_SECONDS, LLM_REPLAY_LATENCY, INTERACTION_MATRIX_PATH, TIPPING_POINT_MODES,
+                        TIPPING_POINT_MODE, SIMULATION_MODES, SIMULATION_MODE, ADAPTIVE_TOLERANCE, setup_logging)
+from src.llm.cache import LLM_CACHE_MODES
+from src.llm.backends import LLM_BACKENDS, create_llm_backend
+from src.llm.client import configure_llm_cache, configure_llm_backend
 from src.data_collection.nlp_extraction import extract_risk_statements_from_10k
 from src.risk_analysis.pestel_analysis import perform_pestel_analysis
 from src.risk_analysis.sasb_integration import integrate_sasb_materiality
 from src.risk_analysis.systemic_risk_analysis import analyze_systemic_risks, identify_trigger_points, assess_system_resilience
-from src.sensitivity_analysis.monte_carlo import perform_monte_carlo_simulations
+from src.sensitivity_analysis.monte_carlo import SENSITIVITY_MODEL, SENSITIVITY_MODEL_NAME
+from src.sensitivity_analysis.simulation_engine import run_simulation_engine
+from src.sensitivity_analysis.sampling import SAMPLERS
+from src.sensitivity_analysis.distribution_store import default_store_path
+from src.sensitivity_analysis.global_sensitivity import sobol_indices, morris_screening
 from src.reporting.stakeholder_reports import generate_stakeholder_reports
 from src.models import Risk, ExternalData, Scenario
 
@@ -25,6 +37,24 @@ def parse_arguments() -> argparse.Namespace:
     parser.add_argument("--risk_data", type=str, default="data/risk_data.csv", help="Path to risk data CSV file")
     parser.add_argument("--external_data", type=str, default="data/external_data.csv", help="Path to external data CSV file")
     parser.add_argument("--output_dir", type=str, default="output", help="Directory for output files")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes for scenario simulations")
+    parser.add_argument("--store_distributions", action="store_true", help="Keep Monte Carlo draws in memory-mapped files under the output directory")
+    parser.add_argument("--simulation_mode", type=str, default=SIMULATION_MODE, choices=list(SIMULATION_MODES), help="Scenario Monte Carlo output: full draws, constant-memory streaming summaries, or adaptive summaries that stop once --adaptive_tolerance is met; tail risk needs full draws")
+    parser.add_argument("--adaptive_tolerance", type=float, default=ADAPTIVE_TOLERANCE, help="Target confidence-interval half-width for --simulation_mode adaptive")
+    parser.add_argument("--sampler", type=str, default='plain', choices=list(SAMPLERS), help="Perturbation sampler: pseudo-random, antithetic, Latin hypercube or scrambled Sobol")
+    interaction_scoring = parser.add_mutually_exclusive_group()
+    interaction_scoring.add_argument("--interaction_block_size", type=int, default=None, help="Score interactions in tiles of this many risks per prompt; rescores every pair instead of reusing --interaction_matrix_path")
+    interaction_scoring.add_argument("--interaction_candidates", type=int, default=None, help="Only score each risk's this many most similar partners, giving a sparse interaction matrix")
+    parser.add_argument("--importance_tilt", type=float, default=None, help="Also run an importance-sampled simulation shifted this many standard deviations towards adverse outcomes, for 99.5%%/99.9%% tail figures")
+    parser.add_argument("--llm_cache", type=str, default=LLM_CACHE_MODE, choices=list(LLM_CACHE_MODES), help="LLM response cache mode")
+    parser.add_argument("--interaction_matrix_path", type=str, default=INTERACTION_MATRIX_PATH, help="Saved interaction matrix; only pairs touching new or edited risks are rescored")
+    parser.add_argument("--tipping_point_mode", type=str, default=TIPPING_POINT_MODE, choices=list(TIPPING_POINT_MODES), help="Tipping point search: full level grid or coarse scan refined by bisection")
+    parser.add_argument("--llm_backend", type=str, default=LLM_BACKEND, choices=list(LLM_BACKENDS), help="LLM backend: OpenAI, OpenAI with a recorded transcript, transcript replay or a local stub")
+    parser.add_argument("--llm_transcript", type=str, default=LLM_TRANSCRIPT_PATH, help="Transcript written by the record backend and served by the replay backend")
+    parser.add_argument("--llm_replay_latency", action=argparse.BooleanOptionalAction, default=LLM_REPLAY_LATENCY, help="Make the replay backend wait for each response's recorded latency")
+    parser.add_argument("--llm_stub_latency", type=float, default=LLM_STUB_LATENCY_SECONDS, help="Seconds the stub backend waits per request")
+    parser.add_argument("--llm_stub_jitter", type=float, default=LLM_STUB_JITTER_SECONDS, help="Uniform +/- jitter on the stub latency in seconds")
+    parser.add_argument("--llm_cache_path", type=str, default=LLM_CACHE_PATH, help="Path to the SQLite LLM response cache")
     parser.add_argument("--log_level", type=str, default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"], help="Logging level")
     return parser.parse_args()
 
@@ -34,12 +64,15 @@ def main(args: argparse.Namespace) -> None:
     logger.info("Starting Advanced Climate Risk Assessment Tool")
 
     os.makedirs(args.output_dir, exist_ok=True)
+    configure_llm_backend(create_llm_backend(args.llm_backend, args.llm_transcript, args.llm_stub_latency, args.llm_stub_jitter,
+                                             args.llm_replay_latency))
+    llm_cache = configure_llm_cache(args.llm_cache, args.llm_cache_path)
 
     try:
         # Data Collection and Preprocessing
         risk_statements = extract_risk_statements_from_10k('data/10k_filings')
         risks: List[Risk] = load_risk_data(args.risk_data)
-        external_data: Dict[str, ExternalData] = load_external_data(args.external_data)
+        external_data: Dict[str, ExternalData] = load_external_data_table(args.external_data)
         
         # Enhanced Risk Categorization
         categorized_risks = categorize_risks(risks)
@@ -54,22 +87,47 @@ def main(args: argparse.Namespace) -> None:
         central_risks = identify_central_risks(risk_network)
         risk_clusters = detect_risk_clusters(risk_network)
         risk_cascades = analyze_risk_cascades(risk_network, [r.id for r in risks if r.impact > 0.8])
-        interaction_matrix = create_risk_interaction_matrix(risks)
+        if args.interaction_candidates is not None:
+            interaction_matrix = create_sparse_interaction_matrix(risks, args.interaction_candidates)
+        elif args.interaction_block_size is not None:
+            interaction_matrix = create_risk_interaction_matrix(risks, block_size=args.interaction_block_size)
+        else:
+            interaction_matrix = update_interaction_matrix(risks, args.interaction_matrix_path)
         risk_progression = simulate_risk_interactions(risks, interaction_matrix)
         
         # Scenario Analysis
-        scenario_impacts = {
-            scenario_name: simulate_scenario_impact(risks, external_data, scenario_params)
-            for scenario_name, scenario_params in SCENARIOS.items()
-        }
+        scenario_impacts = simulate_scenario_impacts(risks, external_data, SCENARIOS, workers=args.workers)
         
-        simulation_results = monte_carlo_simulation(risks, external_data, SCENARIOS)
+        # One engine pass evaluates both Monte Carlo models on common random numbers. The summary modes
+        # reduce the scenario model on the fly instead, so it keeps no draws and has no tail risk figures.
+        simulation_models = {SCENARIO_MODEL_NAME: SCENARIO_MODEL, SENSITIVITY_MODEL_NAME: SENSITIVITY_MODEL}
+        if args.simulation_mode != 'full':
+            del simulation_models[SCENARIO_MODEL_NAME]
+        store_paths = {model_name: default_store_path(args.output_dir, model_name) for model_name in simulation_models} if args.store_distributions else None
+        engine_results = run_simulation_engine(risks, external_data, SCENARIOS, simulation_models, workers=args.workers, sampler=args.sampler,
+                                               store_paths=store_paths)
+        tail_risk = None
+        if args.simulation_mode == 'streaming':
+            simulation_results = streaming_monte_carlo_simulation(risks, external_data, SCENARIOS, workers=args.workers, sampler=args.sampler)
+        elif args.simulation_mode == 'adaptive':
+            simulation_results = adaptive_monte_carlo_simulation(risks, external_data, SCENARIOS, tolerance=args.adaptive_tolerance,
+                                                                 workers=args.workers, sampler=args.sampler)
+        else:
+            simulation_results = engine_results[SCENARIO_MODEL_NAME]
+            tail_risk = calculate_tail_risk(simulation_results)
+        extreme_tail_risk = None
+        if args.importance_tilt is not None:
+            extreme_results = monte_carlo_simulation(risks, external_data, SCENARIOS, workers=args.workers, sampler=args.sampler,
+                                                     importance_tilt=args.importance_tilt)
+            extreme_tail_risk = calculate_tail_risk(extreme_results, confidence_levels=(0.995, 0.999))
         
         # Sensitivity Analysis
         sensitivity_results = {
-            scenario_name: analyze_scenario_sensitivity(risks, scenario, 'carbon_price', 0.2)
+            scenario_name: analyze_scenario_sensitivity(risks, external_data, scenario, 'carbon_price', 0.2)
             for scenario_name, scenario in SCENARIOS.items()
         }
+        global_sensitivity = sobol_indices(risks, external_data, SCENARIOS)
+        parameter_screening = morris_screening(risks, external_data, SCENARIOS)
         
         # Time Series Analysis
         time_series_results = time_series_analysis(risks, external_data)
@@ -83,16 +141,17 @@ def main(args: argparse.Namespace) -> None:
         advanced_analysis = conduct_advanced_risk_analysis(risks, SCENARIOS, company_industry, key_dependencies)
         
         # Compounding Effects Evaluation
-        aggregate_impact = assess_aggregate_impact(risks, interaction_matrix)
-        tipping_points = identify_tipping_points(risks, interaction_matrix)
+        interaction_propagator = InteractionPropagator(interaction_matrix)
+        aggregate_impact = assess_aggregate_impact(risks, interaction_propagator)
+        tipping_points = identify_tipping_points(risks, interaction_propagator, mode=args.tipping_point_mode)
         
         # Enhanced Systemic Risk Analysis
         systemic_risks = analyze_systemic_risks(risks, company_industry, key_dependencies)
         trigger_points = identify_trigger_points(risks, risk_network, external_data)
         resilience_assessment = assess_system_resilience(risks, risk_network, scenario_impacts)
         
-        # Monte Carlo Simulations
-        monte_carlo_results = perform_monte_carlo_simulations(risks, SCENARIOS, num_simulations=10000)
+        # Monte Carlo Simulations (drawn in the engine pass above)
+        monte_carlo_results = engine_results[SENSITIVITY_MODEL_NAME]
         
         # Generate Visualizations
         generate_visualizations(risks, risk_interactions, simulation_results, 
@@ -106,7 +165,9 @@ def main(args: argparse.Namespace) -> None:
                                       scenario_impacts, simulation_results, sensitivity_results, 
                                       time_series_results, impact_trends, critical_periods, cumulative_impact,
                                       SCENARIOS, advanced_analysis, systemic_risks, trigger_points, 
-                                      resilience_assessment, monte_carlo_results, aggregate_impact, tipping_points)
+                                      resilience_assessment, monte_carlo_results, aggregate_impact, tipping_points,
+                                      global_sensitivity=global_sensitivity, parameter_screening=parameter_screening,
+                                      tail_risk=tail_risk, extreme_tail_risk=extreme_tail_risk)
         
         stakeholder_reports = generate_stakeholder_reports(main_report, company_industry)
 
@@ -114,6 +175,7 @@ def main(args: argparse.Namespace) -> None:
         logger.info(f"Main report saved to: {os.path.join(args.output_dir, 'climate_risk_report.json')}")
         logger.info(f"Stakeholder reports saved in: {args.output_dir}")
         logger.info(f"Visualizations saved in: {args.output_dir}")
+        logger.info(f"LLM cache: {llm_cache.stats()}")
 
     except Exception as e:
         logger.error(f"An error occurred during the risk assessment process: {str(e)}")
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import Any, Callable, List, Dict, NamedTuple, Optional, Tuple
 from pydantic import BaseModel, Field, validator
 
 class Risk(BaseModel):
@@ -23,6 +23,21 @@ class Risk(BaseModel):
     def to_dict(self) -> Dict:
         return self.dict()
 
+class Scenario(NamedTuple):
+    name: str
+    temp_increase: float
+    carbon_price: float
+    renewable_energy: float
+    policy_stringency: float
+    biodiversity_loss: float
+    ecosystem_degradation: float
+    financial_stability: float
+    supply_chain_disruption: float
+    biodiversity_index: float  # New parameter
+    ecosystem_health: float  # New parameter
+    financial_system_stability: float  # New parameter
+    global_supply_chain_resilience: float  # New parameter
+
 class ExternalData(BaseModel):
     year: int
     gdp_growth: float
@@ -46,6 +61,28 @@ class SimulationResult:
     scenario: str
     impact_distribution: List[float]
     likelihood_distribution: List[float]
+    # Likelihood-ratio weights of importance-sampled draws; None for plain draws
+    weights: Optional[List[float]] = None
+
+@dataclass
+class SimulationModel:
+    # An impact/likelihood model for the simulation engine: maps (scenarios x params) base parameters,
+    # external data and shared (scenarios x sims x num_dimensions) standard normals to per-draw
+    # (scenarios x sims) impact and likelihood multipliers
+    num_dimensions: int
+    multipliers: Callable[[Any, Any, Any], Tuple[Any, Any]]
+
+@dataclass
+class SimulationSummary:
+    risk_id: int
+    scenario: str
+    num_simulations: int
+    mean_impact: float
+    std_impact: float
+    impact_percentiles: Dict[float, float]
+    mean_likelihood: float
+    std_likelihood: float
+    likelihood_percentiles: Dict[float, float]
 
 class PESTELAnalysis(BaseModel):
     political: List[Dict[str, str]]
@@ -0,0 +1,26 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from src.config import RISK_CHUNK_SIZE
+
+def spawn_scenario_seeds(scenario_names: Sequence[str], seed: Optional[int] = None) -> Dict[str, np.random.SeedSequence]:
+    # One independent stream per scenario. Every risk chunk of a scenario re-creates the same
+    # stream, so all risks see common draws and results do not depend on how work is split.
+    children = np.random.SeedSequence(seed).spawn(len(scenario_names))
+    return dict(zip(scenario_names, children))
+
+def chunk_sequence(items: Sequence[Any], chunk_size: int = RISK_CHUNK_SIZE) -> List[Sequence[Any]]:
+    return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)] or [items[:0]]
+
+def execute_work_units(func: Callable[..., Any], units: List[Tuple], workers: int = 1) -> List[Any]:
+    # Results are returned in unit order regardless of the number of workers
+    return list(iterate_work_units(func, units, workers))
+
+def iterate_work_units(func: Callable[..., Any], units: List[Tuple], workers: int = 1) -> Iterator[Any]:
+    # Lazy variant of execute_work_units for callers that reduce results as they arrive
+    if workers <= 1 or len(units) <= 1:
+        for unit in units:
+            yield func(*unit)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(units))) as executor:
+        yield from executor.map(func, *zip(*units))
@@ -80,6 +80,20 @@ Please provide:
 Structure your response with clear headings for each point.
 """
 
+BLOCK_INTERACTION_ANALYSIS_PROMPT = """
+As an expert in climate risk assessment, score the potential interaction between every row risk and every column risk below.
+
+Row risks:
+{row_table}
+
+Column risks:
+{column_table}
+
+For each pair, assess how the two risks might interact or influence each other and the potential compounding effects if both materialize simultaneously, then give an interaction score on a scale of 0 (no interaction) to 1 (strong interaction).
+
+Respond with JSON only, in the form {{"scores": [[...], ...]}}: a grid with {num_rows} rows in the order of the row risks, each holding {num_columns} scores in the order of the column risks. Use null where a row and column refer to the same risk.
+"""
+
 SYSTEMIC_RISK_PROMPT = """
 As an expert in systemic risk analysis, evaluate the following risk in the context of broader systems:
 
@@ -1,10 +1,11 @@
 import json
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple, Union
 import pandas as pd
 import os
-from src.models import Risk, RiskInteraction, SimulationResult, Scenario
+from src.models import Risk, RiskInteraction, SimulationResult, SimulationSummary, Scenario
 from src.config import OUTPUT_DIR
+from src.risk_analysis.tail_risk import weighted_quantiles
 
 def generate_report(risks: List[Risk], categorized_risks: Dict[str, List[Risk]], 
                     risk_interactions: List[RiskInteraction], scenario_impacts: Dict[str, List[Tuple[Risk, float]]],
@@ -13,7 +14,11 @@ def generate_report(risks: List[Risk], categorized_risks: Dict[str, List[Risk]],
                     time_series_results: Dict[int, List[float]], scenarios: Dict[str, Scenario],
                     advanced_analysis: Dict, systemic_risks: Dict, trigger_points: Dict,
                     resilience_assessment: Dict, monte_carlo_results: Dict,
-                    aggregate_impact: Dict, tipping_points: List[Dict]) -> str:
+                    aggregate_impact: Dict, tipping_points: List[Dict],
+                    global_sensitivity: Optional[Dict[str, Dict[str, Dict[str, float]]]] = None,
+                    parameter_screening: Optional[Dict[str, Dict[str, Dict[str, float]]]] = None,
+                    tail_risk: Optional[Dict[str, Dict[float, Dict]]] = None,
+                    extreme_tail_risk: Optional[Dict[str, Dict[float, Dict]]] = None) -> str:
     report = {
         "executive_summary": generate_executive_summary(risks, scenario_impacts, simulation_results, advanced_analysis, aggregate_impact, tipping_points),
         "risk_overview": {
@@ -37,19 +42,17 @@ def generate_report(risks: List[Risk], categorized_risks: Dict[str, List[Risk]],
         },
         "monte_carlo_results": {
             scenario: {
-                risk_id: {
-                    "mean_impact": np.mean(results.impact_distribution),
-                    "std_impact": np.std(results.impact_distribution),
-                    "5th_percentile_impact": np.percentile(results.impact_distribution, 5),
-                    "95th_percentile_impact": np.percentile(results.impact_distribution, 95),
-                    "mean_likelihood": np.mean(results.likelihood_distribution),
-                    "std_likelihood": np.std(results.likelihood_distribution)
-                } for risk_id, results in scenario_results.items()
+                risk_id: summarize_simulation_result(results) for risk_id, results in scenario_results.items()
             } for scenario, scenario_results in simulation_results.items()
         },
+        "tail_risk": tail_risk,
+        # Importance-sampled VaR/CVaR at extreme levels; None unless the run used --importance_tilt
+        "extreme_tail_risk": extreme_tail_risk,
         "risk_clusters": clustered_risks,
         "risk_entities": risk_entities,
         "sensitivity_analysis": sensitivity_results,
+        "global_sensitivity": global_sensitivity,
+        "parameter_screening": parameter_screening,
         "time_series_projection": {risk_id: projections for risk_id, projections in time_series_results.items()},
         "risk_narratives": advanced_analysis["risk_narratives"],
         "executive_insights": advanced_analysis["executive_insights"],
@@ -57,7 +60,7 @@ def generate_report(risks: List[Risk], categorized_risks: Dict[str, List[Risk]],
         "systemic_risks": systemic_risks,
         "trigger_points": trigger_points,
         "resilience_assessment": resilience_assessment,
-        "aggregate_impact": aggregate_impact,
+        "aggregate_impact": {key: value for key, value in aggregate_impact.items() if key != "distribution"},
         "tipping_points": tipping_points
     }
     
@@ -72,6 +75,41 @@ def generate_report(risks: List[Risk], categorized_risks: Dict[str, List[Risk]],
 
 # Keep existing functions
 
+def summarize_simulation_result(results: Union[SimulationResult, SimulationSummary]) -> Dict[str, float]:
+    # Streaming runs only keep summaries; full runs are reduced here
+    if isinstance(results, SimulationSummary):
+        return {
+            "mean_impact": results.mean_impact,
+            "std_impact": results.std_impact,
+            "5th_percentile_impact": results.impact_percentiles[5],
+            "95th_percentile_impact": results.impact_percentiles[95],
+            "mean_likelihood": results.mean_likelihood,
+            "std_likelihood": results.std_likelihood
+        }
+    if results.weights is not None:
+        # Importance-sampled draws are only representative once reweighted
+        impacts = np.asarray(results.impact_distribution)
+        likelihoods = np.asarray(results.likelihood_distribution)
+        mean_impact = np.average(impacts, weights=results.weights)
+        mean_likelihood = np.average(likelihoods, weights=results.weights)
+        impact_percentiles = weighted_quantiles(impacts, np.asarray(results.weights), [0.05, 0.95])
+        return {
+            "mean_impact": mean_impact,
+            "std_impact": np.sqrt(np.average((impacts - mean_impact) ** 2, weights=results.weights)),
+            "5th_percentile_impact": impact_percentiles[0],
+            "95th_percentile_impact": impact_percentiles[1],
+            "mean_likelihood": mean_likelihood,
+            "std_likelihood": np.sqrt(np.average((likelihoods - mean_likelihood) ** 2, weights=results.weights))
+        }
+    return {
+        "mean_impact": np.mean(results.impact_distribution),
+        "std_impact": np.std(results.impact_distribution),
+        "5th_percentile_impact": np.percentile(results.impact_distribution, 5),
+        "95th_percentile_impact": np.percentile(results.impact_distribution, 95),
+        "mean_likelihood": np.mean(results.likelihood_distribution),
+        "std_likelihood": np.std(results.likelihood_distribution)
+    }
+
 def generate_executive_summary(risks: List[Risk], scenario_impacts: Dict[str, List[Tuple[Risk, float]]], 
                                simulation_results: Dict[str, Dict[int, SimulationResult]],
                                advanced_analysis: Dict, aggregate_impact: Dict, tipping_points: List[Dict]) -> str:
@@ -1,69 +1,128 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, Union
 from src.models import Risk, Scenario, PESTELAnalysis, SystemicRisk
-from src.config import LLM_MODEL, LLM_API_KEY, SCENARIOS
+from src.config import (SCENARIOS, AGGREGATE_IMPACT_CHUNK_SIZE, TIPPING_POINT_MODES, TIPPING_POINT_MODE, TIPPING_POINT_LEVELS,
+                        TIPPING_POINT_COARSE_LEVELS, TIPPING_POINT_RESOLUTION, TIPPING_POINT_BATCH_SIZE)
 from src.prompts import (RISK_NARRATIVE_PROMPT, EXECUTIVE_INSIGHTS_PROMPT, 
-                         SYSTEMIC_RISK_PROMPT, MITIGATION_STRATEGY_PROMPT, 
-                         PESTEL_ANALYSIS_PROMPT)
-import openai
+                         SYSTEMIC_RISK_PROMPT, MITIGATION_STRATEGY_PROMPT)
 import numpy as np
 import re
 from src.risk_analysis.pestel_analysis import perform_pestel_analysis
 from src.risk_analysis.sasb_integration import integrate_sasb_materiality
-from src.risk_analysis.systemic_risk_analysis import analyze_systemic_risks, identify_trigger_points, assess_resilience
-from src.risk_analysis.interaction_analysis import analyze_risk_interactions, build_risk_network, create_risk_interaction_matrix, simulate_risk_interactions
-
-openai.api_key = LLM_API_KEY
+from src.risk_analysis.systemic_risk_analysis import identify_trigger_points
+from src.risk_analysis.interaction_analysis import (create_risk_interaction_matrix, simulate_risk_interactions,
+                                                   InteractionMatrix, InteractionPropagator, as_propagator, propagate_risk_levels)
 
 # Keep existing functions
 
-def assess_aggregate_impact(risks: List[Risk], interaction_matrix: np.ndarray, num_simulations: int = 1000) -> Dict[str, float]:
-    n = len(risks)
-    base_impacts = np.array([risk.impact for risk in risks])
-    
-    aggregate_impacts = []
-    for _ in range(num_simulations):
-        risk_levels = np.random.beta(2, 2, n) * base_impacts
-        for _ in range(10):  # Simulate interactions for 10 time steps
-            influence = interaction_matrix @ risk_levels
-            risk_levels = np.clip(risk_levels + 0.1 * influence, 0, 1)
-        aggregate_impacts.append(np.sum(risk_levels))
-    
+def assess_aggregate_impact(risks: List[Risk], interaction_matrix: Union[InteractionMatrix, InteractionPropagator], num_simulations: int = 1000,
+                            chunk_size: Optional[int] = AGGREGATE_IMPACT_CHUNK_SIZE) -> Dict[str, Any]:
+    # Summary statistics plus the full (num_simulations,) distribution of aggregate impacts. Pass the
+    # InteractionPropagator shared with identify_tipping_points to build the transition powers once.
+    aggregate_impacts = simulate_aggregate_impacts(risks, interaction_matrix, num_simulations, chunk_size)
     return {
-        "mean": np.mean(aggregate_impacts),
-        "median": np.median(aggregate_impacts),
-        "95th_percentile": np.percentile(aggregate_impacts, 95),
-        "max": np.max(aggregate_impacts)
+        "mean": float(np.mean(aggregate_impacts)),
+        "median": float(np.median(aggregate_impacts)),
+        "95th_percentile": float(np.percentile(aggregate_impacts, 95)),
+        "max": float(np.max(aggregate_impacts)),
+        "distribution": aggregate_impacts
     }
 
-def identify_tipping_points(risks: List[Risk], interaction_matrix: np.ndarray) -> List[Dict[str, Any]]:
-    n = len(risks)
+def simulate_aggregate_impacts(risks: List[Risk], interaction_matrix: Union[InteractionMatrix, InteractionPropagator], num_simulations: int = 1000,
+                               chunk_size: Optional[int] = AGGREGATE_IMPACT_CHUNK_SIZE, num_steps: int = 10) -> np.ndarray:
+    # Simulations are stacked as columns of a (risks x chunk_size) block and propagated together, so each
+    # time step is one matrix-matrix product; memory stays O(risks * chunk_size). Starting levels are drawn
+    # chunk by chunk in simulation order, so the draws match one beta(2, 2, n) call per simulation.
     base_impacts = np.array([risk.impact for risk in risks])
-    tipping_points = []
+    propagator = as_propagator(interaction_matrix)
+    chunk_size = chunk_size or num_simulations
+    aggregate_impacts = np.empty(num_simulations)
+    for start in range(0, num_simulations, chunk_size):
+        stop = min(start + chunk_size, num_simulations)
+        risk_levels = (np.random.beta(2, 2, (stop - start, len(risks))) * base_impacts).T
+        aggregate_impacts[start:stop] = propagate_risk_levels(propagator, risk_levels, num_steps).sum(axis=0)
+    return aggregate_impacts
+
+def identify_tipping_points(risks: List[Risk], interaction_matrix: Union[InteractionMatrix, InteractionPropagator], mode: str = TIPPING_POINT_MODE,
+                            num_levels: int = TIPPING_POINT_LEVELS, coarse_levels: int = TIPPING_POINT_COARSE_LEVELS,
+                            resolution: float = TIPPING_POINT_RESOLUTION) -> List[Dict[str, Any]]:
+    # For each risk, the first level of that risk at which the aggregate impact after propagation jumps:
+    # its rate of change exceeds the mean plus two standard deviations of the rates along the scan.
+    # grid evaluates num_levels evenly spaced levels; adaptive scans coarse_levels and bisects the first
+    # flagged interval towards its steepest part until it is at most resolution wide.
+    if mode not in TIPPING_POINT_MODES:
+        raise ValueError(f"Unknown tipping point mode: {mode}. Expected one of {TIPPING_POINT_MODES}")
+    base_impacts = np.array([risk.impact for risk in risks])
+    propagator = as_propagator(interaction_matrix)
+    if mode == 'grid':
+        levels, aggregate_impacts = tipping_point_grid(base_impacts, propagator, num_levels)
+    else:
+        levels, aggregate_impacts = tipping_point_bisection(base_impacts, propagator, coarse_levels, resolution)
+
+    return [
+        {
+            "risk_id": risks[i].id,
+            "risk_description": risks[i].description,
+            "tipping_point_level": float(levels[i]),
+            "aggregate_impact": float(aggregate_impacts[i])
+        }
+        for i in range(len(risks)) if not np.isnan(levels[i])
+    ]
+
+def tipping_point_grid(base_impacts: np.ndarray, propagator: InteractionPropagator, num_levels: int) -> Tuple[np.ndarray, np.ndarray]:
+    # (risks,) tipping levels and aggregate impacts there, NaN where no jump is found; all risk x level
+    # evaluations are propagated as one batch
+    impact_levels = np.linspace(0, 1, num_levels)
+    n = len(base_impacts)
+    aggregate_impacts = aggregate_impacts_at_levels(base_impacts, propagator, np.repeat(np.arange(n), num_levels),
+                                                    np.tile(impact_levels, n)).reshape(n, num_levels)
+    first = first_jump(np.diff(aggregate_impacts, axis=1))
+    found = first >= 0
+    return (np.where(found, impact_levels[np.maximum(first, 0)], np.nan),
+            np.where(found, aggregate_impacts[np.arange(n), np.maximum(first, 0)], np.nan))
+
+def tipping_point_bisection(base_impacts: np.ndarray, propagator: InteractionPropagator, coarse_levels: int,
+                            resolution: float) -> Tuple[np.ndarray, np.ndarray]:
+    # Coarse scan as in tipping_point_grid, then each flagged interval [lower, upper] is halved towards the
+    # side with the larger slope; every halving evaluates one midpoint per risk in a single batch
+    impact_levels = np.linspace(0, 1, coarse_levels)
+    n = len(base_impacts)
+    coarse = aggregate_impacts_at_levels(base_impacts, propagator, np.repeat(np.arange(n), coarse_levels),
+                                         np.tile(impact_levels, n)).reshape(n, coarse_levels)
+    first = first_jump(np.diff(coarse, axis=1))
+    risk_indices = np.flatnonzero(first >= 0)
+    lower, upper = impact_levels[first[risk_indices]], impact_levels[first[risk_indices] + 1]
+    lower_impacts, upper_impacts = coarse[risk_indices, first[risk_indices]], coarse[risk_indices, first[risk_indices] + 1]
+
+    while risk_indices.size and np.max(upper - lower) > resolution:
+        middle = (lower + upper) / 2
+        middle_impacts = aggregate_impacts_at_levels(base_impacts, propagator, risk_indices, middle)
+        upper_half = upper_impacts - middle_impacts > middle_impacts - lower_impacts
+        lower, lower_impacts = np.where(upper_half, middle, lower), np.where(upper_half, middle_impacts, lower_impacts)
+        upper, upper_impacts = np.where(upper_half, upper, middle), np.where(upper_half, upper_impacts, middle_impacts)
+
+    levels = np.full(n, np.nan)
+    aggregate_impacts = np.full(n, np.nan)
+    levels[risk_indices], aggregate_impacts[risk_indices] = lower, lower_impacts
+    return levels, aggregate_impacts
+
+def first_jump(rate_of_change: np.ndarray) -> np.ndarray:
+    # Per row, the first index whose rate of change exceeds the row mean plus two standard deviations; -1 if none.
+    # Rates within rounding noise of each other (a risk that interacts with nothing) never count as a jump.
+    tolerance = 1e-9 * np.abs(rate_of_change).max(axis=1, keepdims=True)
+    threshold = rate_of_change.mean(axis=1, keepdims=True) + 2 * rate_of_change.std(axis=1, keepdims=True) + tolerance
+    jumps = rate_of_change > threshold
+    return np.where(jumps.any(axis=1), jumps.argmax(axis=1), -1)
 
-    for i in range(n):
-        impact_levels = np.linspace(0, 1, 100)
-        aggregate_impacts = []
-        for level in impact_levels:
-            risk_levels = base_impacts.copy()
-            risk_levels[i] = level
-            for _ in range(10):  # Simulate interactions for 10 time steps
-                influence = interaction_matrix @ risk_levels
-                risk_levels = np.clip(risk_levels + 0.1 * influence, 0, 1)
-            aggregate_impacts.append(np.sum(risk_levels))
-        
-        # Detect sudden changes in the rate of change
-        rate_of_change = np.diff(aggregate_impacts)
-        threshold = np.mean(rate_of_change) + 2 * np.std(rate_of_change)
-        tipping_point_indices = np.where(rate_of_change > threshold)[0]
-        
-        if len(tipping_point_indices) > 0:
-            tipping_points.append({
-                "risk_id": risks[i].id,
-                "risk_description": risks[i].description,
-                "tipping_point_level": impact_levels[tipping_point_indices[0]],
-                "aggregate_impact": aggregate_impacts[tipping_point_indices[0]]
-            })
-    
-    return tipping_points
+def aggregate_impacts_at_levels(base_impacts: np.ndarray, propagator: InteractionPropagator, risk_indices: np.ndarray,
+                                levels: np.ndarray, num_steps: int = 10, batch_size: int = TIPPING_POINT_BATCH_SIZE) -> np.ndarray:
+    # Aggregate impact after propagation when risk risk_indices[k] starts at levels[k] and all other risks at
+    # their base impact; evaluations are columns of (risks x batch_size) blocks
+    aggregate_impacts = np.empty(len(levels))
+    for start in range(0, len(levels), batch_size):
+        stop = min(start + batch_size, len(levels))
+        risk_levels = np.repeat(base_impacts[:, None], stop - start, axis=1)
+        risk_levels[risk_indices[start:stop], np.arange(stop - start)] = levels[start:stop]
+        aggregate_impacts[start:stop] = propagate_risk_levels(propagator, risk_levels, num_steps).sum(axis=0)
+    return aggregate_impacts
 
 # Keep existing code below this line
\ No newline at end of file
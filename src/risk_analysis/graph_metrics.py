@@ -0,0 +1,173 @@
+import hashlib
+import math
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg
+from scipy.sparse import csgraph
+from src.config import (GRAPH_METRICS_CACHE_SIZE, GRAPH_EXACT_BETWEENNESS_MAX_NODES, GRAPH_BETWEENNESS_EPSILON,
+                        GRAPH_BETWEENNESS_DELTA, GRAPH_PIVOT_BATCH_SIZE)
+
+# Network metrics of a risk network, computed once per network version. Results are cached under a
+# hash of the nodes and weighted edges, so every stage that asks for the same metric of an unchanged
+# network shares one computation. Heavy metrics run on the weighted adjacency as a SciPy sparse matrix.
+
+def graph_fingerprint(graph: nx.Graph) -> str:
+    # Changes whenever a node, an edge or an edge weight changes
+    digest = hashlib.sha256(repr(graph.is_directed()).encode())
+    digest.update(repr(sorted(map(repr, graph.nodes))).encode())
+    digest.update(repr(sorted(repr((u, v, data.get('weight', 1))) for u, v, data in graph.edges(data=True))).encode())
+    return digest.hexdigest()
+
+def weighted_adjacency(graph: nx.Graph) -> Tuple[List[Hashable], sp.csr_matrix]:
+    nodes = list(graph.nodes)
+    return nodes, sp.csr_matrix(nx.to_scipy_sparse_array(graph, nodelist=nodes, weight='weight', format='csr'))
+
+def betweenness_sample_size(num_nodes: int, epsilon: float, delta: float) -> int:
+    # Pivots needed so that, by Hoeffding's inequality and a union bound over the nodes, every normalised
+    # betweenness estimate is within epsilon of the exact value with probability at least 1 - delta
+    return math.ceil(math.log(2 * num_nodes / delta) / (2 * epsilon ** 2))
+
+def sparse_betweenness(adjacency: sp.csr_matrix, pivots: np.ndarray, directed: bool = False,
+                       batch_size: int = GRAPH_PIVOT_BATCH_SIZE) -> np.ndarray:
+    # Normalised betweenness (as nx.betweenness_centrality, weights are distances) estimated with Brandes'
+    # dependency accumulation from the pivots; exact when every node is a pivot. Distances come from csgraph's
+    # Dijkstra in batches of pivots, and each pivot's shortest-path counts and dependencies are sparse
+    # triangular solves over its shortest-path DAG, so no per-node Python loop is needed.
+    n = adjacency.shape[0]
+    totals = np.zeros(n)
+    if n <= 2 or len(pivots) == 0:
+        return totals
+    # Edges of positive length; the adjacency of an undirected graph is symmetric, so it lists both directions
+    edges = adjacency.tocoo()
+    keep = (edges.row != edges.col) & (edges.data > 0)
+    tails, heads, lengths = edges.row[keep], edges.col[keep], edges.data[keep]
+    for start in range(0, len(pivots), batch_size):
+        batch = pivots[start:start + batch_size]
+        distances = csgraph.dijkstra(adjacency, directed=directed, indices=batch)
+        for pivot, pivot_distances in zip(batch, distances):
+            totals += pivot_dependencies(pivot_distances, pivot, tails, heads, lengths)
+    # Each pivot stands for n / len(pivots) sources; undirected pairs are counted from both ends
+    return totals * (n / len(pivots)) / ((n - 1) * (n - 2))
+
+def pivot_dependencies(distances: np.ndarray, pivot: int, tails: np.ndarray, heads: np.ndarray, lengths: np.ndarray,
+                       rtol: float = 1e-9) -> np.ndarray:
+    # Brandes' dependency of the pivot on every node: delta(v) = sum over DAG successors w of
+    # sigma(v) / sigma(w) * (1 + delta(w)), where sigma counts shortest paths from the pivot. An edge is on a
+    # shortest path when it closes the distance gap up to rtol, so equal-length paths whose float sums differ
+    # in the last bits still share the credit.
+    n = len(distances)
+    on_path = np.isfinite(distances[tails]) & np.isclose(distances[tails] + lengths, distances[heads], rtol=rtol, atol=0)
+    # Nodes in order of distance; DAG edges run from earlier to later nodes, so both systems are triangular
+    order = np.argsort(distances, kind='stable')
+    rank = np.empty(n, dtype=int)
+    rank[order] = np.arange(n)
+    dag = sp.csr_matrix((np.ones(on_path.sum()), (rank[heads[on_path]], rank[tails[on_path]])), shape=(n, n))
+    identity = sp.identity(n, format='csr')
+
+    # sigma = e_pivot + dag sigma, summing the path counts of each node's DAG predecessors
+    sigma = sp.linalg.spsolve_triangular(identity - dag, np.eye(1, n, rank[pivot]).ravel(), lower=True)
+    # With z = (1 + delta) / sigma on reachable nodes: z = 1 / sigma + dag^T z
+    reachable = sigma > 0
+    z = sp.linalg.spsolve_triangular((identity - dag.T).tocsr(), np.divide(1, sigma, out=np.zeros(n), where=reachable), lower=False)
+    dependencies = np.where(reachable, sigma * z - 1, 0)
+    dependencies[rank[pivot]] = 0
+    return dependencies[rank]
+
+class GraphMetrics:
+    # Cached metrics for the most recent max_cached_graphs network versions
+
+    def __init__(self, max_cached_graphs: int = GRAPH_METRICS_CACHE_SIZE):
+        self.max_cached_graphs = max_cached_graphs
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    def _cached(self, graph: nx.Graph, metric: Tuple, compute: Callable[[], Any]) -> Any:
+        fingerprint = graph_fingerprint(graph)
+        graph_cache = self._cache.setdefault(fingerprint, {})
+        self._cache.move_to_end(fingerprint)
+        while len(self._cache) > self.max_cached_graphs:
+            self._cache.popitem(last=False)
+        if metric in graph_cache:
+            self.hits += 1
+        else:
+            self.misses += 1
+            graph_cache[metric] = compute()
+        return graph_cache[metric]
+
+    def adjacency(self, graph: nx.Graph) -> Tuple[List[Hashable], sp.csr_matrix]:
+        return self._cached(graph, ('adjacency',), lambda: weighted_adjacency(graph))
+
+    def betweenness(self, graph: nx.Graph, epsilon: float = GRAPH_BETWEENNESS_EPSILON, delta: float = GRAPH_BETWEENNESS_DELTA,
+                    exact_max_nodes: int = GRAPH_EXACT_BETWEENNESS_MAX_NODES, seed: int = 0) -> Dict[Hashable, float]:
+        # Exact networkx betweenness up to exact_max_nodes nodes; above that, Brandes dependencies from
+        # enough uniformly drawn pivots to meet the (epsilon, delta) bound, or from every node if that is fewer
+        def compute() -> Dict[Hashable, float]:
+            if graph.number_of_nodes() <= exact_max_nodes:
+                return nx.betweenness_centrality(graph, weight='weight')
+            nodes, adjacency = self.adjacency(graph)
+            num_pivots = min(len(nodes), betweenness_sample_size(len(nodes), epsilon, delta))
+            pivots = np.sort(np.random.default_rng(seed).choice(len(nodes), num_pivots, replace=False))
+            return dict(zip(nodes, sparse_betweenness(adjacency, pivots, graph.is_directed()).tolist()))
+        return self._cached(graph, ('betweenness', epsilon, delta, exact_max_nodes, seed), compute)
+
+    def strength(self, graph: nx.Graph) -> Dict[Hashable, float]:
+        # Total weight of each node's edges
+        def compute() -> Dict[Hashable, float]:
+            nodes, adjacency = self.adjacency(graph)
+            return dict(zip(nodes, np.asarray(adjacency.sum(axis=1)).ravel().tolist()))
+        return self._cached(graph, ('strength',), compute)
+
+    def density(self, graph: nx.Graph) -> float:
+        return self._cached(graph, ('density',), lambda: nx.density(graph))
+
+    def average_clustering(self, graph: nx.Graph) -> float:
+        # Weighted clustering as nx.average_clustering(weight='weight') for undirected graphs: the geometric
+        # mean of the normalised weights of each triangle, from one sparse matrix product
+        def compute() -> float:
+            if graph.is_directed():
+                return nx.average_clustering(graph, weight='weight')
+            nodes, adjacency = self.adjacency(graph)
+            if not nodes:
+                raise ZeroDivisionError("average clustering of an empty graph")
+            max_weight = adjacency.max() if adjacency.nnz else 1
+            # Self-loops count towards the largest weight but not towards neighbours or triangles
+            entries = adjacency.tocoo()
+            off_diagonal = entries.row != entries.col
+            neighbours = sp.csr_matrix((entries.data[off_diagonal], (entries.row[off_diagonal], entries.col[off_diagonal])),
+                                       shape=adjacency.shape)
+            scaled = neighbours.multiply(1 / max_weight).power(1 / 3).tocsr()
+            triangles = np.asarray((scaled @ scaled).multiply(scaled).sum(axis=1)).ravel()
+            degrees = np.diff(neighbours.indptr)
+            pairs = degrees * (degrees - 1)
+            return float(np.mean(np.divide(triangles, pairs, out=np.zeros(len(nodes)), where=pairs > 0)))
+        return self._cached(graph, ('average_clustering',), compute)
+
+    def assortativity(self, graph: nx.Graph) -> float:
+        # Weighted degree assortativity as nx.degree_assortativity_coefficient(weight='weight') for undirected
+        # graphs: the correlation of the node strengths at both ends of every edge
+        def compute() -> float:
+            if graph.is_directed():
+                return nx.degree_assortativity_coefficient(graph, weight='weight')
+            nodes, adjacency = self.adjacency(graph)
+            degrees = np.array([degree for _, degree in graph.degree(nodes, weight='weight')], dtype=float)
+            ends = adjacency.tocoo()
+            x, y = degrees[ends.row], degrees[ends.col]
+            x, y = x - x.mean(), y - y.mean()
+            return float(np.sum(x * y) / np.sqrt(np.sum(x * x) * np.sum(y * y)))
+        return self._cached(graph, ('assortativity',), compute)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "cached_graphs": len(self._cache)}
+
+# Process-wide metrics cache shared by the network stages
+_graph_metrics: Optional[GraphMetrics] = None
+
+def get_graph_metrics() -> GraphMetrics:
+    global _graph_metrics
+    if _graph_metrics is None:
+        _graph_metrics = GraphMetrics()
+    return _graph_metrics
@@ -0,0 +1,61 @@
+import numpy as np
+from typing import Dict, Mapping
+from src.models import Scenario
+
+# Impact and likelihood are a risk's base value times a product of factors that depend only on the
+# scenario (and external data), followed by a clip. The kernels below compute that per-draw
+# multiplier once and apply it to every risk as an outer product, so a risks x draws evaluation
+# costs O(draws) for the factors plus O(risks * draws) for a single multiply-and-clip.
+
+SCENARIO_PARAMETERS = tuple(field for field in Scenario._fields if field != 'name')
+
+def scenario_parameter_vector(scenario: Scenario) -> np.ndarray:
+    return np.array([getattr(scenario, param) for param in SCENARIO_PARAMETERS], dtype=float)
+
+def scenario_parameter_matrix(scenarios: Mapping[str, Scenario]) -> np.ndarray:
+    return np.array([scenario_parameter_vector(scenario) for scenario in scenarios.values()], dtype=float)
+
+def _unpack(scenario_params: np.ndarray) -> Dict[str, np.ndarray]:
+    # (..., params) -> {param: (...)}
+    return dict(zip(SCENARIO_PARAMETERS, np.moveaxis(np.asarray(scenario_params), -1, 0)))
+
+def scenario_impact_multiplier(scenario_params: np.ndarray, gdp_growth: np.ndarray) -> np.ndarray:
+    # Factor product of scenario_analysis.calculate_risk_impact
+    params = _unpack(scenario_params)
+    temp_factor = 1 + (params['temp_increase'] - 1.5) * 0.1
+    carbon_price_factor = 1 + (params['carbon_price'] / 100) * 0.05
+    renewable_factor = 1 - params['renewable_energy'] * 0.2
+    biodiversity_factor = 1 + params['biodiversity_loss'] * 0.15
+    ecosystem_factor = 1 + params['ecosystem_degradation'] * 0.25
+    gdp_factor = 1 - gdp_growth * 0.1
+    return temp_factor * carbon_price_factor * renewable_factor * biodiversity_factor * ecosystem_factor * gdp_factor
+
+def scenario_likelihood_multiplier(scenario_params: np.ndarray, population: np.ndarray) -> np.ndarray:
+    # Factor product of scenario_analysis.calculate_risk_likelihood
+    params = _unpack(scenario_params)
+    policy_factor = 1 - params['policy_stringency'] * 0.3
+    ecosystem_factor = 1 + params['ecosystem_degradation'] * 0.4
+    financial_stability_factor = 1 - params['financial_stability'] * 0.2
+    supply_chain_factor = 1 + params['supply_chain_disruption'] * 0.3
+    population_factor = 1 + (population / 1e10) * 0.1
+    return policy_factor * ecosystem_factor * financial_stability_factor * supply_chain_factor * population_factor
+
+def sensitivity_impact_multiplier(scenario_params: np.ndarray) -> np.ndarray:
+    # Factor product of sensitivity_analysis.monte_carlo.calculate_risk_impact
+    params = _unpack(scenario_params)
+    temp_factor = 1 + (params['temp_increase'] - 1.5) * 0.1
+    carbon_price_factor = 1 + (params['carbon_price'] / 100) * 0.05
+    renewable_factor = 1 - params['renewable_energy'] * 0.2
+    return temp_factor * carbon_price_factor * renewable_factor
+
+def sensitivity_likelihood_multiplier(scenario_params: np.ndarray) -> np.ndarray:
+    # Factor product of sensitivity_analysis.monte_carlo.calculate_risk_likelihood
+    params = _unpack(scenario_params)
+    policy_factor = 1 - params['policy_stringency'] * 0.3
+    ecosystem_factor = 1 + params['ecosystem_degradation'] * 0.4
+    return policy_factor * ecosystem_factor
+
+def apply_multiplier(base_values: np.ndarray, multiplier: np.ndarray) -> np.ndarray:
+    # base (risks,) x multiplier (..., draws) -> clipped (..., risks, draws)
+    multiplier = np.asarray(multiplier)
+    return np.clip(multiplier[..., None, :] * base_values[:, None], 0.0, 1.0)
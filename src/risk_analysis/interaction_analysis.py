@@ -1,27 +1,250 @@
-from typing import List, Dict, Tuple
+import hashlib
+import json
+import os
+import re
+from typing import Any, List, Dict, Optional, Tuple, Union
 from src.models import Risk, RiskInteraction
-from src.config import LLM_MODEL, LLM_API_KEY
-from src.prompts import INTERACTION_ANALYSIS_PROMPT
-import openai
+from src.config import (INTERACTION_BLOCK_SIZE, INTERACTION_CANDIDATES_PER_RISK, INTERACTION_SIMILARITY_CHUNK_SIZE,
+                        INTERACTION_MATRIX_PATH, INTERACTION_SPARSE_MAX_DENSITY, INTERACTION_POWER_MAX_RISKS)
+from src.prompts import INTERACTION_ANALYSIS_PROMPT, BLOCK_INTERACTION_ANALYSIS_PROMPT
+from src.llm.client import chat_completion
+from src.llm.async_client import AsyncLLMClient, run_chat_completions
 import networkx as nx
 import numpy as np
+import scipy.sparse as sp
 from scipy.stats import pearsonr
 from sklearn.cluster import KMeans
-
-openai.api_key = LLM_API_KEY
+from sklearn.feature_extraction.text import TfidfVectorizer
 
 # Keep existing functions
 
-def create_risk_interaction_matrix(risks: List[Risk]) -> np.ndarray:
+# Dense ndarray or scipy.sparse matrix; propagation only needs matrix @ vector products
+InteractionMatrix = Union[np.ndarray, sp.spmatrix]
+
+def create_risk_interaction_matrix(risks: List[Risk], client: Optional[AsyncLLMClient] = None,
+                                   block_size: Optional[int] = None) -> InteractionMatrix:
+    # All n(n-1)/2 pair prompts are sent concurrently through the rate-limited async client and the
+    # scores are assembled positionally, so the matrix does not depend on completion order.
+    # With block_size, each prompt scores a block_size x block_size tile of pairs instead.
+    if block_size is not None:
+        scores = score_interaction_tiles(risks, block_size, client)
+        return assemble_interaction_matrix(len(risks), list(scores), list(scores.values()))
+
+    pairs = [(i, j) for i in range(len(risks)) for j in range(i + 1, len(risks))]
+    analyses = run_chat_completions([interaction_request(risks[i], risks[j]) for i, j in pairs], client)
+    scores = [parse_interaction(risks[i], risks[j], analysis).interaction_score for (i, j), analysis in zip(pairs, analyses)]
+    return assemble_interaction_matrix(len(risks), pairs, scores)
+
+def update_interaction_matrix(risks: List[Risk], path: str = INTERACTION_MATRIX_PATH,
+                              client: Optional[AsyncLLMClient] = None) -> InteractionMatrix:
+    # Incremental form of create_risk_interaction_matrix. Scores between two risks whose id and content
+    # hash match the matrix saved at path are reused; only pairs touching new or edited risks are sent to
+    # the LLM, i.e. O(changed * n) calls. Risks no longer in the register are dropped when the new matrix
+    # is saved. The matrix is kept in CSR form throughout and only densified by select_interaction_storage.
     n = len(risks)
-    matrix = np.zeros((n, n))
-    for i, risk1 in enumerate(risks):
-        for j, risk2 in enumerate(risks[i+1:], start=i+1):
-            interaction = analyze_single_interaction(risk1, risk2)
-            matrix[i, j] = matrix[j, i] = interaction.interaction_score
-    return matrix
+    hashes = [risk_content_hash(risk) for risk in risks]
+    reused = np.zeros(n, dtype=bool)
+    rows, cols, scores = [np.empty(0, dtype=int)], [np.empty(0, dtype=int)], [np.empty(0)]
+    previous = load_interaction_matrix(path)
+    if previous is not None:
+        previous_ids, previous_hashes, previous_matrix = previous
+        previous_positions = {(risk_id, risk_hash): k for k, (risk_id, risk_hash) in enumerate(zip(previous_ids, previous_hashes))}
+        positions = np.array([previous_positions.get((risk.id, risk_hash), -1) for risk, risk_hash in zip(risks, hashes)], dtype=int)
+        reused = positions >= 0
+        kept = np.flatnonzero(reused)
+        kept_scores = previous_matrix[positions[kept]][:, positions[kept]].tocoo()
+        rows.append(kept[kept_scores.row])
+        cols.append(kept[kept_scores.col])
+        scores.append(kept_scores.data)
 
-def analyze_single_interaction(risk1: Risk, risk2: Risk) -> RiskInteraction:
+    # Each pair with a new or edited risk once: partners are reused risks or later positions
+    pairs = sorted((min(i, j), max(i, j)) for i in np.flatnonzero(~reused).tolist()
+                   for j in np.flatnonzero(reused | (np.arange(n) > i)).tolist())
+    analyses = run_chat_completions([interaction_request(risks[i], risks[j]) for i, j in pairs], client)
+    new_scores = [parse_interaction(risks[i], risks[j], analysis).interaction_score for (i, j), analysis in zip(pairs, analyses)]
+    new_scores = assemble_sparse_interaction_matrix(n, pairs, new_scores).tocoo()
+    rows.append(new_scores.row)
+    cols.append(new_scores.col)
+    scores.append(new_scores.data)
+
+    matrix = sp.csr_matrix((np.concatenate(scores), (np.concatenate(rows), np.concatenate(cols))), shape=(n, n))
+    matrix.eliminate_zeros()
+    save_interaction_matrix(path, [risk.id for risk in risks], hashes, matrix)
+    return select_interaction_storage(matrix)
+
+def risk_content_hash(risk: Risk) -> str:
+    # Only the fields the interaction prompt is built from; likelihood or impact edits keep the scores
+    payload = json.dumps([risk.description, risk.category, risk.subcategory], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def save_interaction_matrix(path: str, risk_ids: List[int], hashes: List[str], matrix: InteractionMatrix) -> None:
+    # CSR arrays in the sp.save_npz layout, so sp.load_npz reads the matrix, plus the risk ids and content
+    # hashes that key its rows
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    matrix = sp.csr_matrix(matrix)
+    # Written to a temporary file and swapped in, so an interrupted run never leaves a truncated matrix
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as f:
+        np.savez(f, risk_ids=np.array(risk_ids, dtype=np.int64), hashes=np.array(hashes, dtype='U64'),
+                 format=np.array(b'csr'), shape=np.array(matrix.shape), data=matrix.data, indices=matrix.indices, indptr=matrix.indptr)
+    os.replace(temporary_path, path)
+
+def load_interaction_matrix(path: str) -> Optional[Tuple[List[int], List[str], sp.csr_matrix]]:
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        risk_ids, hashes = saved["risk_ids"].tolist(), saved["hashes"].tolist()
+        # Matrices saved before the CSR layout hold a dense array
+        if "matrix" in saved:
+            return risk_ids, hashes, sp.csr_matrix(saved["matrix"])
+    return risk_ids, hashes, sp.load_npz(path).tocsr()
+
+def create_sparse_interaction_matrix(risks: List[Risk], candidates_per_risk: int = INTERACTION_CANDIDATES_PER_RISK,
+                                     client: Optional[AsyncLLMClient] = None) -> sp.csr_matrix:
+    # Two-stage mode for large registers: a local text-similarity index picks each risk's most similar
+    # partners and only those pairs are scored by the LLM, i.e. O(n k) prompts instead of n(n-1)/2.
+    # Pairs that were never scored are structural zeros of the returned symmetric CSR matrix.
+    pairs = candidate_interaction_pairs(risks, candidates_per_risk)
+    analyses = run_chat_completions([interaction_request(risks[i], risks[j]) for i, j in pairs], client)
+    scores = [parse_interaction(risks[i], risks[j], analysis).interaction_score for (i, j), analysis in zip(pairs, analyses)]
+    return assemble_sparse_interaction_matrix(len(risks), pairs, scores)
+
+def candidate_interaction_pairs(risks: List[Risk], candidates_per_risk: int = INTERACTION_CANDIDATES_PER_RISK,
+                                chunk_size: int = INTERACTION_SIMILARITY_CHUNK_SIZE) -> List[Tuple[int, int]]:
+    # Sorted (i, j) positions with i < j such that j is among the candidates_per_risk most similar risks of i
+    # or the other way round. Similarity is the cosine of TF-IDF vectors over word and character n-grams
+    # of each risk's category, subcategory and description; rows are processed chunk_size at a time,
+    # so memory stays O(chunk_size * n) instead of O(n^2).
+    n = len(risks)
+    candidates_per_risk = min(candidates_per_risk, n - 1)
+    if candidates_per_risk <= 0:
+        return []
+    vectors = risk_text_vectors(risks)
+    pairs = set()
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        similarity = (vectors[start:stop] @ vectors.T).toarray()
+        similarity[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        partners = np.argpartition(-similarity, candidates_per_risk - 1, axis=1)[:, :candidates_per_risk]
+        for i, row in zip(range(start, stop), partners):
+            pairs.update((min(i, j), max(i, j)) for j in row.tolist())
+    return sorted(pairs)
+
+def risk_text_vectors(risks: List[Risk]) -> sp.csr_matrix:
+    # L2-normalised (risks x features) TF-IDF matrix; categories are repeated so that they weigh
+    # about as much as a short description
+    texts = [f"{risk.category} {risk.subcategory} {risk.category} {risk.subcategory} {risk.description}" for risk in risks]
+    words = TfidfVectorizer(analyzer='word', ngram_range=(1, 2), sublinear_tf=True).fit_transform(texts)
+    characters = TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 5), sublinear_tf=True).fit_transform(texts)
+    return sp.hstack([words, characters], format='csr') / np.sqrt(2)
+
+def assemble_sparse_interaction_matrix(num_risks: int, pairs: List[Tuple[int, int]], scores: List[float]) -> sp.csr_matrix:
+    rows, cols = np.array(pairs, dtype=int).reshape(-1, 2).T
+    scores = np.asarray(scores, dtype=float)
+    return sp.csr_matrix((np.concatenate([scores, scores]), (np.concatenate([rows, cols]), np.concatenate([cols, rows]))),
+                         shape=(num_risks, num_risks))
+
+def score_interaction_blocks(risks: List[Risk], block_size: int = INTERACTION_BLOCK_SIZE,
+                             client: Optional[AsyncLLMClient] = None) -> List[RiskInteraction]:
+    scores = score_interaction_tiles(risks, block_size, client)
+    return [
+        RiskInteraction(risks[i].id, risks[j].id, score, determine_interaction_type(score))
+        for (i, j), score in scores.items()
+    ]
+
+def score_interaction_tiles(risks: List[Risk], block_size: int = INTERACTION_BLOCK_SIZE,
+                            client: Optional[AsyncLLMClient] = None) -> Dict[Tuple[int, int], float]:
+    # Scores keyed by (i, j) risk positions with i < j. One prompt per tile of the upper triangle, i.e.
+    # ceil(n/k)(ceil(n/k)+1)/2 calls instead of n(n-1)/2, and each description is sent O(n/k) times
+    # instead of O(n). Cells missing from or malformed in a returned grid are re-scored per pair.
+    blocks = [list(range(start, min(start + block_size, len(risks)))) for start in range(0, len(risks), block_size)]
+    tiles = [(a, b) for a in range(len(blocks)) for b in range(a, len(blocks))]
+    analyses = run_chat_completions([
+        block_interaction_request([risks[i] for i in blocks[a]], [risks[j] for j in blocks[b]], same_block=a == b)
+        for a, b in tiles
+    ], client)
+
+    scores = {}
+    fallback_pairs = []
+    for (a, b), analysis in zip(tiles, analyses):
+        grid = parse_interaction_grid(analysis, len(blocks[a]), len(blocks[b]))
+        for r, i in enumerate(blocks[a]):
+            for c, j in enumerate(blocks[b]):
+                if a == b and j <= i:
+                    continue
+                if np.isnan(grid[r, c]):
+                    fallback_pairs.append((i, j))
+                else:
+                    scores[(i, j)] = float(grid[r, c])
+
+    if fallback_pairs:
+        fallback_analyses = run_chat_completions([interaction_request(risks[i], risks[j]) for i, j in fallback_pairs], client)
+        for (i, j), analysis in zip(fallback_pairs, fallback_analyses):
+            scores[(i, j)] = parse_interaction(risks[i], risks[j], analysis).interaction_score
+    return dict(sorted(scores.items()))
+
+def block_interaction_request(row_risks: List[Risk], column_risks: List[Risk], same_block: bool = False) -> Dict[str, Any]:
+    # For a diagonal tile the column table just points back at the row table
+    column_table = "Same as the row risks." if same_block else _risk_table(column_risks, 'C')
+    prompt = BLOCK_INTERACTION_ANALYSIS_PROMPT.format(
+        row_table=_risk_table(row_risks, 'R' if not same_block else ''),
+        column_table=column_table,
+        num_rows=len(row_risks),
+        num_columns=len(column_risks)
+    )
+    return {
+        "messages": [
+            {"role": "system", "content": "You are an expert in climate risk assessment and risk interactions."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 40 + 8 * len(row_risks) * len(column_risks),
+        "template": BLOCK_INTERACTION_ANALYSIS_PROMPT
+    }
+
+def _risk_table(risks: List[Risk], label: str = '') -> str:
+    return "\n".join(f"{label}{k + 1}. [{risk.category}/{risk.subcategory}] {risk.description}" for k, risk in enumerate(risks))
+
+def parse_interaction_grid(analysis: str, num_rows: int, num_columns: int) -> np.ndarray:
+    # (num_rows x num_columns) scores; cells that are missing, non-numeric or outside [0, 1] are NaN
+    grid = np.full((num_rows, num_columns), np.nan)
+    start, end = analysis.find('{'), analysis.rfind('}')
+    try:
+        rows = json.loads(analysis[start:end + 1])["scores"]
+    except (ValueError, KeyError, TypeError):
+        return grid
+    if not isinstance(rows, list):
+        return grid
+    for r, row in enumerate(rows[:num_rows]):
+        if not isinstance(row, list):
+            continue
+        for c, score in enumerate(row[:num_columns]):
+            if isinstance(score, (int, float)) and not isinstance(score, bool) and 0 <= score <= 1:
+                grid[r, c] = score
+    return grid
+
+def assemble_interaction_matrix(num_risks: int, pairs: List[Tuple[int, int]], scores: List[float]) -> InteractionMatrix:
+    # Built from the scored entries, so sparse results never pass through an n x n array
+    return select_interaction_storage(assemble_sparse_interaction_matrix(num_risks, pairs, scores))
+
+def select_interaction_storage(matrix: InteractionMatrix, max_density: float = INTERACTION_SPARSE_MAX_DENSITY) -> InteractionMatrix:
+    # CSR when at most max_density of the entries are non-zero, so memory and matvec cost scale with the
+    # number of interactions; a dense ndarray otherwise
+    num_entries = matrix.shape[0] * matrix.shape[1]
+    if sp.issparse(matrix):
+        matrix = matrix.tocsr()
+        matrix.eliminate_zeros()
+        return matrix if matrix.nnz <= max_density * num_entries else matrix.toarray()
+    matrix = np.asarray(matrix, dtype=float)
+    return sp.csr_matrix(matrix) if np.count_nonzero(matrix) <= max_density * num_entries else matrix
+
+def interaction_operator(matrix: InteractionMatrix) -> InteractionMatrix:
+    # Propagation form of an interaction matrix: CSR for any sparse format, a float ndarray otherwise
+    return matrix.tocsr() if sp.issparse(matrix) else np.asarray(matrix, dtype=float)
+
+def interaction_request(risk1: Risk, risk2: Risk) -> Dict[str, Any]:
+    # Chat request (keyword arguments of chat_completion / AsyncLLMClient.complete) scoring one risk pair
     prompt = INTERACTION_ANALYSIS_PROMPT.format(
         risk1_description=risk1.description,
         risk1_category=risk1.category,
@@ -30,24 +253,92 @@ def analyze_single_interaction(risk1: Risk, risk2: Risk) -> RiskInteraction:
         risk2_category=risk2.category,
         risk2_subcategory=risk2.subcategory
     )
-
-    response = openai.ChatCompletion.create(
-        model=LLM_MODEL,
-        messages=[
+    return {
+        "messages": [
             {"role": "system", "content": "You are an expert in climate risk assessment and risk interactions."},
             {"role": "user", "content": prompt}
         ],
-        temperature=0.7,
-        max_tokens=400
-    )
+        "temperature": 0.7,
+        "max_tokens": 400,
+        "template": INTERACTION_ANALYSIS_PROMPT
+    }
+
+def extract_interaction_score(analysis: str) -> float:
+    # Last number following "score" in the response, clipped to [0, 1]; 0 when the response has none
+    scores = re.findall(r"score\D{0,20}?(\d+(?:\.\d+)?)", analysis, flags=re.IGNORECASE)
+    return min(max(float(scores[-1]), 0.0), 1.0) if scores else 0.0
+
+def determine_interaction_type(interaction_score: float) -> str:
+    if interaction_score >= 0.7:
+        return "Strong"
+    if interaction_score >= 0.4:
+        return "Moderate"
+    return "Weak"
 
-    analysis = response.choices[0].message['content']
+def parse_interaction(risk1: Risk, risk2: Risk, analysis: str) -> RiskInteraction:
     interaction_score = extract_interaction_score(analysis)
     interaction_type = determine_interaction_type(interaction_score)
     return RiskInteraction(risk1.id, risk2.id, interaction_score, interaction_type)
 
-def simulate_risk_interactions(risks: List[Risk], interaction_matrix: np.ndarray, num_steps: int = 10) -> Dict[int, List[float]]:
+def analyze_single_interaction(risk1: Risk, risk2: Risk) -> RiskInteraction:
+    return parse_interaction(risk1, risk2, chat_completion(**interaction_request(risk1, risk2)))
+
+class InteractionPropagator:
+    # Applies num_steps of x <- clip(x + 0.1 A x, 0, 1) to batches of start vectors. For a non-negative A
+    # and start levels in [0, 1] the unclipped iterates only grow, so clipping never triggers exactly when
+    # the closed form (I + 0.1 A)^T x stays at or below one. Those columns take the closed form from a
+    # cached transition power; the others, and matrices where stepping is cheaper, are stepped.
+
+    def __init__(self, interaction_matrix: InteractionMatrix, max_power_risks: int = INTERACTION_POWER_MAX_RISKS):
+        self.matrix = interaction_operator(interaction_matrix)
+        self.num_risks = self.matrix.shape[0]
+        entries = self.matrix.data if sp.issparse(self.matrix) else self.matrix
+        self.nonnegative = bool(np.min(entries, initial=0) >= 0)
+        self.nnz = self.matrix.nnz if sp.issparse(self.matrix) else np.count_nonzero(self.matrix)
+        self.max_power_risks = max_power_risks
+        self._powers = {}
+
+    def uses_closed_form(self, num_steps: int) -> bool:
+        # Applying a dense power costs n^2 per column against num_steps * nnz for stepping
+        return (self.nonnegative and self.num_risks <= self.max_power_risks
+                and self.num_risks ** 2 < num_steps * self.nnz)
+
+    def transition_power(self, num_steps: int) -> np.ndarray:
+        # (I + 0.1 A)^num_steps by repeated squaring, computed once per step count
+        if num_steps not in self._powers:
+            transition = np.eye(self.num_risks) + 0.1 * (self.matrix.toarray() if sp.issparse(self.matrix) else self.matrix)
+            self._powers[num_steps] = np.linalg.matrix_power(transition, num_steps)
+        return self._powers[num_steps]
+
+    def step(self, risk_levels: np.ndarray, num_steps: int) -> np.ndarray:
+        for _ in range(num_steps):
+            risk_levels = np.clip(risk_levels + 0.1 * (self.matrix @ risk_levels), 0, 1)
+        return risk_levels
+
+    def propagate(self, risk_levels: np.ndarray, num_steps: int = 10) -> np.ndarray:
+        risk_levels = np.asarray(risk_levels, dtype=float)
+        if not self.uses_closed_form(num_steps):
+            return self.step(risk_levels, num_steps)
+        columns = risk_levels.reshape(self.num_risks, -1)
+        final_levels = self.transition_power(num_steps) @ columns
+        unclipped = ((columns >= 0) & (columns <= 1)).all(axis=0) & (final_levels <= 1).all(axis=0)
+        if not unclipped.all():
+            final_levels[:, ~unclipped] = self.step(columns[:, ~unclipped], num_steps)
+        return final_levels.reshape(risk_levels.shape)
+
+def propagate_risk_levels(interaction_matrix: Union[InteractionMatrix, InteractionPropagator], risk_levels: np.ndarray,
+                          num_steps: int = 10) -> np.ndarray:
+    # risk_levels is (risks,) or (risks x paths); each column is an independent path, so a step is one
+    # matrix-matrix product plus clip for all paths. Pass an InteractionPropagator to reuse its cached powers.
+    return as_propagator(interaction_matrix).propagate(risk_levels, num_steps)
+
+def as_propagator(interaction_matrix: Union[InteractionMatrix, InteractionPropagator]) -> InteractionPropagator:
+    # Callers that propagate the same matrix several times build one propagator and pass it in
+    return interaction_matrix if isinstance(interaction_matrix, InteractionPropagator) else InteractionPropagator(interaction_matrix)
+
+def simulate_risk_interactions(risks: List[Risk], interaction_matrix: InteractionMatrix, num_steps: int = 10) -> Dict[int, List[float]]:
     n = len(risks)
+    interaction_matrix = interaction_operator(interaction_matrix)
     risk_levels = np.array([risk.impact for risk in risks])
     risk_progression = {risk.id: [risk.impact] for risk in risks}
 
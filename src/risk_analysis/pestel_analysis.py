@@ -1,5 +1,6 @@
 from typing import List, Dict
 from src.models import Risk, ExternalData
+from src.external_data import latest_external_data
 
 def perform_pestel_analysis(risks: List[Risk], external_data: Dict[str, ExternalData]) -> Dict[str, List[Dict[str, str]]]:
     pestel_categories = {
@@ -44,7 +45,7 @@ def categorize_risk_pestel(risk: Risk) -> str:
 
 def enrich_pestel_with_external_data(pestel_categories: Dict[str, List[Dict[str, str]]], external_data: Dict[str, ExternalData]):
     # Add relevant external data to each PESTEL category
-    latest_data = list(external_data.values())[-1]  # Assuming the last entry is the most recent
+    latest_data = latest_external_data(external_data)
     
     pestel_categories["Economic"].append({
         "factor": "GDP Growth",
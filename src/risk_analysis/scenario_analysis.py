@@ -1,38 +1,257 @@
-from typing import List, Dict, Tuple
-from src.models import Risk, ExternalData, Scenario, SimulationResult
-from src.config import NUM_SIMULATIONS, LLM_MODEL, LLM_API_KEY
+from typing import Any, List, Dict, Tuple, Optional, Sequence
+from src.models import Risk, ExternalData, Scenario, SimulationModel, SimulationResult, SimulationSummary
+from src.config import (NUM_SIMULATIONS, STREAMING_BATCH_SIZE, STREAMING_BLOCK_SIZE,
+                        STREAMING_PERCENTILES, ADAPTIVE_BATCH_SIZE, ADAPTIVE_MAX_SIMULATIONS, ADAPTIVE_TOLERANCE)
 from src.prompts import RISK_ASSESSMENT_PROMPT
-import openai
+from src.external_data import latest_external_data
+from src.parallel_execution import spawn_scenario_seeds, chunk_sequence, execute_work_units, iterate_work_units
+from src.sensitivity_analysis.streaming_stats import StreamingAccumulator
+from src.sensitivity_analysis.sampling import standard_normal_draws, SAMPLERS
+from src.sensitivity_analysis.simulation_engine import run_simulation_engine
+from src.sensitivity_analysis.simulation_engine import adverse_directions as engine_adverse_directions
+from src.risk_analysis.tail_risk import stack_distributions, stack_weights, tail_statistics
+from src.risk_analysis.impact_kernels import (SCENARIO_PARAMETERS, scenario_parameter_vector, scenario_parameter_matrix,
+                                              scenario_impact_multiplier, scenario_likelihood_multiplier, apply_multiplier)
+from src.llm.async_client import AsyncLLMClient, run_chat_completions
 import numpy as np
 from scipy.stats import norm
 
-openai.api_key = LLM_API_KEY
+EXTERNAL_PERTURBATION_FIELDS = ('gdp_growth', 'population')
+
+# Fixed stress applied by perform_stress_testing; share-like parameters are capped at 1
+DEFAULT_STRESS_MULTIPLIERS = {
+    'temp_increase': 1.5,
+    'carbon_price': 2,
+    'renewable_energy': 0.5,
+    'policy_stringency': 0.5,
+    'biodiversity_loss': 1.5,
+    'ecosystem_degradation': 1.5,
+    'financial_stability': 0.5,
+    'supply_chain_disruption': 2
+}
+STRESS_CAPPED_PARAMETERS = ('biodiversity_loss', 'ecosystem_degradation', 'supply_chain_disruption')
 
 def simulate_scenario_impact(risks: List[Risk], external_data: Dict[str, ExternalData], scenario: Scenario) -> List[Tuple[Risk, float]]:
-    impacts = []
-    for risk in risks:
-        impact = calculate_risk_impact(risk, external_data, scenario)
-        impacts.append((risk, impact))
-    return impacts
+    # The scenario multiplier is shared by every risk, so it is computed once and applied as one outer product
+    multiplier = scenario_impact_multiplier(scenario_parameter_vector(scenario), np.float64(latest_external_data(external_data).gdp_growth))
+    impacts = apply_multiplier(np.array([risk.impact for risk in risks], dtype=float), multiplier[None])[:, 0]
+    return [(risk, float(impact)) for risk, impact in zip(risks, impacts)]
 
-def monte_carlo_simulation(risks: List[Risk], external_data: Dict[str, ExternalData], scenarios: Dict[str, Scenario]) -> Dict[str, Dict[int, SimulationResult]]:
-    results = {}
+def simulate_scenario_impacts(risks: List[Risk], external_data: Dict[str, ExternalData], scenarios: Dict[str, Scenario],
+                              workers: int = 1) -> Dict[str, List[Tuple[Risk, float]]]:
+    units = [(risks, external_data, scenario) for scenario in scenarios.values()]
+    return dict(zip(scenarios.keys(), execute_work_units(simulate_scenario_impact, units, workers)))
+
+def monte_carlo_simulation(risks: List[Risk], external_data: Dict[str, ExternalData], scenarios: Dict[str, Scenario],
+                           num_simulations: int = NUM_SIMULATIONS, seed: Optional[int] = None, workers: int = 1,
+                           store_path: Optional[str] = None, sampler: str = 'plain',
+                           importance_tilt: Optional[float] = None) -> Dict[str, Dict[int, SimulationResult]]:
+    # Runs the shared simulation engine with this module's model; the output is bit-identical for
+    # any number of workers. With store_path the draws are written into a memory-mapped
+    # DistributionStore and the returned SimulationResults are views over it. sampler selects plain,
+    # antithetic, Latin hypercube or scrambled Sobol draws (see sensitivity_analysis.sampling).
+    # importance_tilt shifts the perturbations by that many standard deviations towards adverse
+    # outcomes and attaches likelihood-ratio weights to the results, for extreme-tail VaR/CVaR
+    # (a shift near norm.ppf(confidence_level) puts about half of the draws in that tail).
+    results = run_simulation_engine(risks, external_data, scenarios, {SCENARIO_MODEL_NAME: SCENARIO_MODEL}, num_simulations,
+                                    seed=seed, workers=workers, sampler=sampler, importance_tilt=importance_tilt,
+                                    store_paths=None if store_path is None else {SCENARIO_MODEL_NAME: store_path})
+    return results[SCENARIO_MODEL_NAME]
+
+def streaming_monte_carlo_simulation(risks: List[Risk], external_data: Dict[str, ExternalData], scenarios: Dict[str, Scenario],
+                                     num_simulations: int = NUM_SIMULATIONS, seed: Optional[int] = None,
+                                     workers: int = 1, sampler: str = 'plain') -> Dict[str, Dict[int, SimulationSummary]]:
+    # Constant-memory variant of monte_carlo_simulation: draws are split into independently seeded
+    # blocks, each block is reduced to running moments and a quantile sketch, and the per-block
+    # accumulators are merged exactly in block order.
+    scenario_seeds = spawn_scenario_seeds(list(scenarios.keys()), seed)
+    block_sizes = [min(STREAMING_BLOCK_SIZE, num_simulations - start) for start in range(0, num_simulations, STREAMING_BLOCK_SIZE)]
+    risk_chunks = chunk_sequence(risks)
+    units = []
     for scenario_name, scenario in scenarios.items():
-        scenario_results = {}
-        for risk in risks:
-            impact_distribution = []
-            likelihood_distribution = []
-            for _ in range(NUM_SIMULATIONS):
-                perturbed_scenario = perturb_scenario(scenario)
-                perturbed_external_data = perturb_external_data(external_data)
-                impact = calculate_risk_impact(risk, perturbed_external_data, perturbed_scenario)
-                likelihood = calculate_risk_likelihood(risk, perturbed_external_data, perturbed_scenario)
-                impact_distribution.append(impact)
-                likelihood_distribution.append(likelihood)
-            scenario_results[risk.id] = SimulationResult(risk.id, scenario_name, impact_distribution, likelihood_distribution)
-        results[scenario_name] = scenario_results
+        base_params = scenario_parameter_matrix({scenario_name: scenario})
+        block_seeds = scenario_seeds[scenario_name].spawn(len(block_sizes))
+        for chunk_index, risk_chunk in enumerate(risk_chunks):
+            for block_size, block_seed in zip(block_sizes, block_seeds):
+                units.append((scenario_name, chunk_index, base_params, external_data, risk_chunk, block_size, block_seed, sampler))
+
+    merged = {}
+    for scenario_name, chunk_index, impact_acc, likelihood_acc in iterate_work_units(_accumulate_risk_chunk, units, workers):
+        key = (scenario_name, chunk_index)
+        if key in merged:
+            merged[key][0].merge(impact_acc)
+            merged[key][1].merge(likelihood_acc)
+        else:
+            merged[key] = (impact_acc, likelihood_acc)
+
+    results = {scenario_name: {} for scenario_name in scenarios}
+    for (scenario_name, chunk_index), (impact_acc, likelihood_acc) in merged.items():
+        results[scenario_name].update(summarize_accumulators(scenario_name, risk_chunks[chunk_index], impact_acc, likelihood_acc))
+    return results
+
+def _accumulate_risk_chunk(scenario_name: str, chunk_index: int, base_params: np.ndarray, external_data: Dict[str, ExternalData],
+                           risks: List[Risk], num_simulations: int, seed_sequence: np.random.SeedSequence,
+                           sampler: str) -> Tuple[str, int, StreamingAccumulator, StreamingAccumulator]:
+    rng = np.random.default_rng(seed_sequence)
+    base_impacts = np.array([risk.impact for risk in risks], dtype=float)
+    base_likelihoods = np.array([risk.likelihood for risk in risks], dtype=float)
+    impact_acc = StreamingAccumulator(len(risks))
+    likelihood_acc = StreamingAccumulator(len(risks))
+
+    for start in range(0, num_simulations, STREAMING_BATCH_SIZE):
+        batch_size = min(STREAMING_BATCH_SIZE, num_simulations - start)
+        perturbed_params, perturbed_external = draw_perturbations(base_params, external_data, batch_size, rng=rng, sampler=sampler)
+        impact_acc.update(calculate_risk_impact_array(base_impacts, perturbed_params, perturbed_external['gdp_growth'])[0])
+        likelihood_acc.update(calculate_risk_likelihood_array(base_likelihoods, perturbed_params, perturbed_external['population'])[0])
+
+    return scenario_name, chunk_index, impact_acc, likelihood_acc
+
+def adaptive_monte_carlo_simulation(risks: List[Risk], external_data: Dict[str, ExternalData], scenarios: Dict[str, Scenario],
+                                    tolerance: float = ADAPTIVE_TOLERANCE, percentiles: Tuple[float, ...] = STREAMING_PERCENTILES,
+                                    confidence_level: float = 0.95, max_simulations: int = ADAPTIVE_MAX_SIMULATIONS,
+                                    seed: Optional[int] = None, workers: int = 1,
+                                    sampler: str = 'plain') -> Dict[str, Dict[int, SimulationSummary]]:
+    # Target-precision mode: draws are simulated in batches and each risk/scenario cell is retired
+    # once the confidence-interval half-widths of its impact and likelihood means and percentiles
+    # are all below tolerance. SimulationSummary.num_simulations reports the draws each cell used.
+    scenario_seeds = spawn_scenario_seeds(list(scenarios.keys()), seed)
+    units = [
+        (scenario_name, scenario_parameter_matrix({scenario_name: scenario}), external_data, risk_chunk, tolerance,
+         percentiles, confidence_level, max_simulations, scenario_seeds[scenario_name], sampler)
+        for scenario_name, scenario in scenarios.items()
+        for risk_chunk in chunk_sequence(risks)
+    ]
+
+    results = {scenario_name: {} for scenario_name in scenarios}
+    for scenario_name, chunk_results in execute_work_units(_adaptive_risk_chunk, units, workers):
+        results[scenario_name].update(chunk_results)
     return results
 
+def _adaptive_risk_chunk(scenario_name: str, base_params: np.ndarray, external_data: Dict[str, ExternalData], risks: List[Risk],
+                         tolerance: float, percentiles: Tuple[float, ...], confidence_level: float, max_simulations: int,
+                         seed_sequence: np.random.SeedSequence, sampler: str) -> Tuple[str, Dict[int, SimulationSummary]]:
+    rng = np.random.default_rng(seed_sequence)
+    z = norm.ppf(0.5 + confidence_level / 2)
+    base_impacts = np.array([risk.impact for risk in risks], dtype=float)
+    base_likelihoods = np.array([risk.likelihood for risk in risks], dtype=float)
+    impact_acc = StreamingAccumulator(len(risks))
+    likelihood_acc = StreamingAccumulator(len(risks))
+    active = np.arange(len(risks))
+    summaries = {}
+
+    while active.size:
+        batch_size = min(ADAPTIVE_BATCH_SIZE, max_simulations - impact_acc.count)
+        perturbed_params, perturbed_external = draw_perturbations(base_params, external_data, batch_size, rng=rng, sampler=sampler)
+        impact_acc.update(calculate_risk_impact_array(base_impacts[active], perturbed_params, perturbed_external['gdp_growth'])[0])
+        likelihood_acc.update(calculate_risk_likelihood_array(base_likelihoods[active], perturbed_params, perturbed_external['population'])[0])
+
+        converged = ((impact_acc.confidence_half_widths(percentiles, z) <= tolerance) &
+                     (likelihood_acc.confidence_half_widths(percentiles, z) <= tolerance))
+        if impact_acc.count >= max_simulations:
+            converged[:] = True
+        if converged.any():
+            done = np.flatnonzero(converged)
+            summaries.update(summarize_accumulators(scenario_name, [risks[i] for i in active[done]],
+                                                    impact_acc.subset(done), likelihood_acc.subset(done)))
+            remaining = np.flatnonzero(~converged)
+            active = active[remaining]
+            impact_acc = impact_acc.subset(remaining)
+            likelihood_acc = likelihood_acc.subset(remaining)
+
+    return scenario_name, {risk.id: summaries[risk.id] for risk in risks}
+
+def summarize_accumulators(scenario_name: str, risks: List[Risk], impact_acc: StreamingAccumulator,
+                           likelihood_acc: StreamingAccumulator) -> Dict[int, SimulationSummary]:
+    impact_percentiles = impact_acc.percentiles(STREAMING_PERCENTILES)
+    likelihood_percentiles = likelihood_acc.percentiles(STREAMING_PERCENTILES)
+    return {
+        risk.id: SimulationSummary(
+            risk_id=risk.id,
+            scenario=scenario_name,
+            num_simulations=impact_acc.count,
+            mean_impact=float(impact_acc.moments.mean[r]),
+            std_impact=float(impact_acc.moments.std[r]),
+            impact_percentiles={q: float(values[r]) for q, values in impact_percentiles.items()},
+            mean_likelihood=float(likelihood_acc.moments.mean[r]),
+            std_likelihood=float(likelihood_acc.moments.std[r]),
+            likelihood_percentiles={q: float(values[r]) for q, values in likelihood_percentiles.items()}
+        )
+        for r, risk in enumerate(risks)
+    }
+
+def compare_sampler_convergence(risks: List[Risk], external_data: Dict[str, ExternalData], scenario: Scenario,
+                                sample_sizes: Tuple[int, ...] = (256, 1024, 4096), percentile: float = 95,
+                                num_replicates: int = 20, reference_size: int = 2 ** 16,
+                                seed: Optional[int] = None) -> Dict[str, Dict[int, float]]:
+    # Root-mean-square error of each risk's impact percentile, averaged over risks, for every
+    # sampler and sample size, measured against a large scrambled-Sobol reference run.
+    rng = np.random.default_rng(seed)
+    base_params = scenario_parameter_matrix({scenario.name: scenario})
+    base_impacts = np.array([risk.impact for risk in risks], dtype=float)
+
+    def impact_percentiles(num_simulations: int, sampler: str) -> np.ndarray:
+        perturbed_params, perturbed_external = draw_perturbations(base_params, external_data, num_simulations, rng=rng, sampler=sampler)
+        impacts = calculate_risk_impact_array(base_impacts, perturbed_params, perturbed_external['gdp_growth'])[0]
+        return np.percentile(impacts, percentile, axis=1)
+
+    reference = impact_percentiles(reference_size, 'sobol')
+    convergence = {}
+    for sampler in SAMPLERS:
+        convergence[sampler] = {}
+        for num_simulations in sample_sizes:
+            errors = np.array([impact_percentiles(num_simulations, sampler) - reference for _ in range(num_replicates)])
+            convergence[sampler][num_simulations] = float(np.sqrt(np.mean(np.square(errors))))
+    return convergence
+
+def draw_perturbations(base_params: np.ndarray, external_data: Dict[str, ExternalData], num_simulations: int,
+                       rng: Optional[np.random.Generator] = None, sampler: str = 'plain', scenario_scale: float = 0.1,
+                       external_scale: float = 0.05) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    # Array counterpart of perturb_scenario/perturb_external_data: (scenarios x params) ->
+    # (scenarios x sims x params) plus (scenarios x sims) external fields. Scenario parameters and
+    # external fields are drawn jointly so low-discrepancy samplers cover the whole space.
+    rng = rng if rng is not None else np.random.default_rng()
+    normals = np.stack([
+        standard_normal_draws(num_simulations, base_params.shape[1] + len(EXTERNAL_PERTURBATION_FIELDS), sampler, rng)
+        for _ in range(base_params.shape[0])
+    ])
+    return _perturb_from_normals(base_params, external_data, normals, scenario_scale, external_scale)
+
+def _perturb_from_normals(base_params: np.ndarray, external_data: Dict[str, ExternalData], normals: np.ndarray,
+                          scenario_scale: float, external_scale: float) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    num_params = base_params.shape[1]
+    perturbed_params = np.maximum(0, base_params[:, None, :] * (1 + scenario_scale * normals[..., :num_params]))
+
+    # Only the latest year enters the impact/likelihood formulas, so only its fields are drawn
+    latest = latest_external_data(external_data)
+    perturbed_external = {
+        attr: np.maximum(0, getattr(latest, attr) * (1 + external_scale * normals[..., num_params + i]))
+        for i, attr in enumerate(EXTERNAL_PERTURBATION_FIELDS)
+    }
+    return perturbed_params, perturbed_external
+
+def scenario_model_multipliers(base_params: np.ndarray, external_data: Dict[str, ExternalData],
+                                normals: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # SimulationModel form of calculate_risk_impact/calculate_risk_likelihood on shared standard normals
+    perturbed_params, perturbed_external = _perturb_from_normals(base_params, external_data, normals, 0.1, 0.05)
+    return (scenario_impact_multiplier(perturbed_params, perturbed_external['gdp_growth']),
+            scenario_likelihood_multiplier(perturbed_params, perturbed_external['population']))
+
+SCENARIO_MODEL_NAME = 'scenario_analysis'
+SCENARIO_MODEL = SimulationModel(len(SCENARIO_PARAMETERS) + len(EXTERNAL_PERTURBATION_FIELDS), scenario_model_multipliers)
+
+def adverse_directions(base_params: np.ndarray, external_data: Dict[str, ExternalData], step: float = 1e-3) -> np.ndarray:
+    # Unit vectors in the perturbation's standard-normal space along which the impact multiplier grows
+    # fastest (higher temp_increase, lower renewable_energy, lower gdp_growth, ...)
+    return engine_adverse_directions(SCENARIO_MODEL, base_params, external_data, step=step)
+
+def calculate_risk_impact_array(base_impacts: np.ndarray, scenario_params: np.ndarray, gdp_growth: np.ndarray) -> np.ndarray:
+    # Broadcast form of calculate_risk_impact: params (..., sims, P), gdp_growth (..., sims) -> (..., risks, sims)
+    return apply_multiplier(base_impacts, scenario_impact_multiplier(scenario_params, gdp_growth))
+
+def calculate_risk_likelihood_array(base_likelihoods: np.ndarray, scenario_params: np.ndarray, population: np.ndarray) -> np.ndarray:
+    # Broadcast form of calculate_risk_likelihood, same shape conventions as calculate_risk_impact_array
+    return apply_multiplier(base_likelihoods, scenario_likelihood_multiplier(scenario_params, population))
+
 def calculate_risk_impact(risk: Risk, external_data: Dict[str, ExternalData], scenario: Scenario) -> float:
     base_impact = risk.impact
     temp_factor = 1 + (scenario.temp_increase - 1.5) * 0.1  # 10% increase per degree above 1.5°C
@@ -42,8 +261,7 @@ def calculate_risk_impact(risk: Risk, external_data: Dict[str, ExternalData], sc
     ecosystem_factor = 1 + scenario.ecosystem_degradation * 0.25  # 25% increase for complete ecosystem degradation
     
     # Consider external data
-    latest_year = max(external_data.keys())
-    gdp_growth = external_data[latest_year].gdp_growth
+    gdp_growth = latest_external_data(external_data).gdp_growth
     gdp_factor = 1 - gdp_growth * 0.1  # Higher GDP growth slightly reduces impact
     
     impact = (base_impact * temp_factor * carbon_price_factor * renewable_factor * 
@@ -58,8 +276,7 @@ def calculate_risk_likelihood(risk: Risk, external_data: Dict[str, ExternalData]
     supply_chain_factor = 1 + scenario.supply_chain_disruption * 0.3  # Supply chain disruption increases likelihood
     
     # Consider external data
-    latest_year = max(external_data.keys())
-    population = external_data[latest_year].population
+    population = latest_external_data(external_data).population
     population_factor = 1 + (population / 1e10) * 0.1  # Population growth slightly increases likelihood
     
     likelihood = (base_likelihood * policy_factor * ecosystem_factor * 
@@ -83,14 +300,16 @@ def perturb_external_data(external_data: Dict[str, ExternalData], perturbation_s
         perturbed_data[year] = ExternalData(**perturbed_values)
     return perturbed_data
 
-def analyze_scenario_sensitivity(risks: List[Risk], base_scenario: Scenario, variable: str, range_pct: float) -> Dict[str, float]:
-    base_impact = sum(calculate_risk_impact(risk, {}, base_scenario) for risk in risks)
+def analyze_scenario_sensitivity(risks: List[Risk], external_data: Dict[str, ExternalData], base_scenario: Scenario,
+                                 variable: str, range_pct: float) -> Dict[str, float]:
+    base_impact = sum(calculate_risk_impact(risk, external_data, base_scenario) for risk in risks)
     
-    high_scenario = perturb_scenario(base_scenario, {variable: range_pct})
-    low_scenario = perturb_scenario(base_scenario, {variable: -range_pct})
+    base_value = getattr(base_scenario, variable)
+    high_scenario = base_scenario._replace(**{variable: base_value * (1 + range_pct)})
+    low_scenario = base_scenario._replace(**{variable: base_value * (1 - range_pct)})
     
-    high_impact = sum(calculate_risk_impact(risk, {}, high_scenario) for risk in risks)
-    low_impact = sum(calculate_risk_impact(risk, {}, low_scenario) for risk in risks)
+    high_impact = sum(calculate_risk_impact(risk, external_data, high_scenario) for risk in risks)
+    low_impact = sum(calculate_risk_impact(risk, external_data, low_scenario) for risk in risks)
     
     sensitivity = (high_impact - low_impact) / (2 * range_pct * getattr(base_scenario, variable))
     
@@ -103,42 +322,84 @@ def analyze_scenario_sensitivity(risks: List[Risk], base_scenario: Scenario, var
     }
 
 def calculate_var_cvar(simulation_results: Dict[str, Dict[int, SimulationResult]], confidence_level: float = 0.95) -> Dict[str, Dict[int, Dict[str, float]]]:
-    var_cvar_results = {}
-    for scenario, risks in simulation_results.items():
-        var_cvar_results[scenario] = {}
-        for risk_id, result in risks.items():
-            impacts = np.array(result.impact_distribution)
-            var = np.percentile(impacts, (1 - confidence_level) * 100)
-            cvar = np.mean(impacts[impacts > var])
-            var_cvar_results[scenario][risk_id] = {
-                "VaR": var,
-                "CVaR": cvar
-            }
-    return var_cvar_results
+    # Per-risk figures from the stacked selection engine; keeps the original (1 - confidence) quantile convention.
+    # Importance-sampled results are evaluated with their likelihood-ratio weights. Scenarios are evaluated one
+    # at a time, so a store-backed buffer is only read into memory a scenario at a time.
+    scenario_names, risk_ids, impacts = stack_distributions(simulation_results)
+    weights = stack_weights(simulation_results)
+    var_cvar = {}
+    for s, scenario in enumerate(scenario_names):
+        var, cvar = tail_statistics(np.asarray(impacts[s], dtype=float), [1 - confidence_level],
+                                    None if weights is None else np.asarray(weights[s], dtype=float))
+        var_cvar[scenario] = {risk_id: {"VaR": float(var[0, r]), "CVaR": float(cvar[0, r])} for r, risk_id in enumerate(risk_ids)}
+    return var_cvar
 
 def perform_stress_testing(risks: List[Risk], scenarios: Dict[str, Scenario], external_data: Dict[str, ExternalData]) -> Dict[str, List[Tuple[Risk, float]]]:
     stress_test_results = {}
     for scenario_name, scenario in scenarios.items():
-        # Create a stressed scenario
-        stressed_scenario = Scenario(
-            name=f"Stressed_{scenario_name}",
-            temp_increase=scenario.temp_increase * 1.5,
-            carbon_price=scenario.carbon_price * 2,
-            renewable_energy=scenario.renewable_energy * 0.5,
-            policy_stringency=scenario.policy_stringency * 0.5,
-            biodiversity_loss=min(1.0, scenario.biodiversity_loss * 1.5),
-            ecosystem_degradation=min(1.0, scenario.ecosystem_degradation * 1.5),
-            financial_stability=scenario.financial_stability * 0.5,
-            supply_chain_disruption=min(1.0, scenario.supply_chain_disruption * 2)
-        )
+        # Create a stressed scenario; _replace keeps every other Scenario field
+        stressed_scenario = apply_stress_multipliers(scenario, DEFAULT_STRESS_MULTIPLIERS)._replace(name=f"Stressed_{scenario_name}")
         
         # Simulate impacts under stressed conditions
         stress_test_results[scenario_name] = simulate_scenario_impact(risks, external_data, stressed_scenario)
     
     return stress_test_results
 
-def generate_scenario_narratives(scenarios: Dict[str, Scenario]) -> Dict[str, str]:
-    narratives = {}
+def apply_stress_multipliers(scenario: Scenario, multipliers: Dict[str, float]) -> Scenario:
+    stressed = {param: getattr(scenario, param) * multiplier for param, multiplier in multipliers.items()}
+    for param in STRESS_CAPPED_PARAMETERS:
+        if param in stressed:
+            stressed[param] = min(1.0, stressed[param])
+    return scenario._replace(**stressed)
+
+def perform_stress_grid(risks: List[Risk], scenarios: Dict[str, Scenario], external_data: Dict[str, ExternalData],
+                        multiplier_ranges: Dict[str, Sequence[float]]) -> Dict[str, Dict[str, Any]]:
+    # Evaluates the full Cartesian grid of stress multipliers (e.g. 10 severities for each of 5
+    # parameters = 100,000 stressed scenarios) against all risks in one vectorized pass per scenario.
+    parameters = list(multiplier_ranges.keys())
+    unknown = set(parameters) - set(SCENARIO_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown scenario parameters for stress grid: {sorted(unknown)}")
+    grid = np.stack(np.meshgrid(*[np.asarray(multiplier_ranges[param], dtype=float) for param in parameters], indexing='ij'),
+                    axis=-1).reshape(-1, len(parameters))
+    columns = [SCENARIO_PARAMETERS.index(param) for param in parameters]
+    capped = [i for i, param in enumerate(parameters) if param in STRESS_CAPPED_PARAMETERS]
+    base_impacts = np.array([risk.impact for risk in risks], dtype=float)
+    gdp_growth = np.full(len(grid), latest_external_data(external_data).gdp_growth)
+
+    results = {}
+    for scenario_name, scenario in scenarios.items():
+        stressed_params = np.repeat(scenario_parameter_vector(scenario)[None], len(grid), axis=0)
+        stressed_params[:, columns] *= grid
+        stressed_params[:, [columns[i] for i in capped]] = np.minimum(1.0, stressed_params[:, [columns[i] for i in capped]])
+
+        # (risks x grid) from the kernel, stored as dense (grid x risks)
+        impacts = np.ascontiguousarray(calculate_risk_impact_array(base_impacts, stressed_params, gdp_growth).T)
+        portfolio_impact = impacts.sum(axis=1)
+        worst = int(np.argmax(portfolio_impact))
+        results[scenario_name] = {
+            "parameters": parameters,
+            "multipliers": grid,
+            "impacts": impacts,
+            "summary": {
+                "portfolio_impact": portfolio_impact,
+                "max_risk_impact": impacts.max(axis=1),
+                "worst_case": {
+                    "multipliers": dict(zip(parameters, grid[worst].tolist())),
+                    "portfolio_impact": float(portfolio_impact[worst])
+                },
+                "risk_worst_case": {risk.id: float(impacts[:, r].max()) for r, risk in enumerate(risks)},
+                "parameter_level_means": {
+                    param: {float(level): float(portfolio_impact[grid[:, i] == level].mean()) for level in np.unique(grid[:, i])}
+                    for i, param in enumerate(parameters)
+                }
+            }
+        }
+    return results
+
+def generate_scenario_narratives(scenarios: Dict[str, Scenario], client: Optional[AsyncLLMClient] = None) -> Dict[str, str]:
+    # One request per scenario, sent concurrently through the rate-limited async client
+    requests = []
     for scenario_name, scenario in scenarios.items():
         prompt = f"""
         Generate a detailed narrative for the following climate scenario:
@@ -156,16 +417,13 @@ def generate_scenario_narratives(scenarios: Dict[str, Scenario]) -> Dict[str, st
         Provide a compelling narrative that describes the overall state of the world in this scenario, including key challenges and opportunities for businesses, major societal and environmental changes, potential technological advancements or setbacks, and the general economic landscape.
         """
 
-        response = openai.ChatCompletion.create(
-            model=LLM_MODEL,
-            messages=[
+        requests.append({
+            "messages": [
                 {"role": "system", "content": "You are an expert in climate scenario analysis and futurism."},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.7,
-            max_tokens=1000
-        )
-
-        narratives[scenario_name] = response.choices[0].message['content']
+            "temperature": 0.7,
+            "max_tokens": 1000
+        })
     
-    return narratives
\ No newline at end of file
+    return dict(zip(scenarios.keys(), run_chat_completions(requests, client)))
\ No newline at end of file
@@ -1,18 +1,24 @@
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import networkx as nx
 import numpy as np
 from src.models import Risk, ExternalData, SimulationResult
+from src.risk_analysis.graph_metrics import GraphMetrics, get_graph_metrics
 
 # Keep existing functions
 
-def identify_trigger_points(risks: List[Risk], risk_network: nx.Graph, external_data: Dict[str, ExternalData]) -> Dict[int, Dict]:
+def identify_trigger_points(risks: List[Risk], risk_network: nx.Graph, external_data: Dict[str, ExternalData],
+                            metrics: Optional[GraphMetrics] = None) -> Dict[int, Dict]:
+    # Centrality comes from the shared metrics cache: exact for small networks, pivot-sampled for large ones
+    metrics = metrics or get_graph_metrics()
     trigger_points = {}
-    centrality = nx.betweenness_centrality(risk_network, weight='weight')
+    centrality = metrics.betweenness(risk_network)
+    strength = metrics.strength(risk_network)
+    mean_centrality = np.mean(list(centrality.values()))
     
     for risk in risks:
-        if centrality[risk.id] > np.mean(list(centrality.values())):
+        if centrality[risk.id] > mean_centrality:
             neighbors = list(risk_network.neighbors(risk.id))
-            total_weight = sum(risk_network[risk.id][neighbor]['weight'] for neighbor in neighbors)
+            total_weight = strength[risk.id]
             
             if total_weight > 0.5 * len(neighbors):  # More than half of max possible weight
                 trigger_points[risk.id] = {
@@ -25,13 +31,15 @@ def identify_trigger_points(risks: List[Risk], risk_network: nx.Graph, external_
     
     return trigger_points
 
-def assess_system_resilience(risks: List[Risk], risk_network: nx.Graph, scenario_impacts: Dict[str, List[Tuple[Risk, float]]]) -> Dict[str, float]:
+def assess_system_resilience(risks: List[Risk], risk_network: nx.Graph, scenario_impacts: Dict[str, List[Tuple[Risk, float]]],
+                             metrics: Optional[GraphMetrics] = None) -> Dict[str, float]:
+    metrics = metrics or get_graph_metrics()
     resilience_metrics = {}
     
     # Network-based resilience metrics
-    resilience_metrics["network_density"] = nx.density(risk_network)
-    resilience_metrics["average_clustering"] = nx.average_clustering(risk_network, weight='weight')
-    resilience_metrics["assortativity"] = nx.degree_assortativity_coefficient(risk_network, weight='weight')
+    resilience_metrics["network_density"] = metrics.density(risk_network)
+    resilience_metrics["average_clustering"] = metrics.average_clustering(risk_network)
+    resilience_metrics["assortativity"] = metrics.assortativity(risk_network)
     
     # Impact-based resilience metrics
     for scenario, impacts in scenario_impacts.items():
@@ -0,0 +1,205 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.models import SimulationResult
+
+DEFAULT_CONFIDENCE_LEVELS = (0.95, 0.99)
+
+def shared_buffer(rows: Sequence, shape: Tuple[int, ...]) -> Optional[np.ndarray]:
+    # The array whose [i, j, ...] rows over the leading shape are exactly `rows` in order, when every row is a view
+    # of one buffer, as for DistributionStore.results(); None for independently allocated rows
+    base = getattr(rows[0], 'base', None) if rows else None
+    if not isinstance(base, np.ndarray) or base.shape[:-1] != shape:
+        return None
+    start = base.__array_interface__['data'][0]
+    for index, row in zip(np.ndindex(*shape), rows):
+        if not (isinstance(row, np.ndarray) and row.base is base and row.shape == base.shape[-1:]
+                and row.strides == base.strides[-1:]
+                and row.__array_interface__['data'][0] == start + int(np.dot(index, base.strides[:-1]))):
+            return None
+    return base
+
+def stack_distributions(simulation_results: Dict[str, Dict[int, SimulationResult]]) -> Tuple[List[str], List[int], np.ndarray]:
+    # One (scenarios x risks x sims) array; every scenario must cover the same risks and draw count.
+    # Results backed by a memory-mapped DistributionStore are returned as the mapped buffer without copying.
+    scenario_names = list(simulation_results)
+    risk_ids = list(simulation_results[scenario_names[0]]) if scenario_names else []
+    for scenario_name in scenario_names:
+        if list(simulation_results[scenario_name]) != risk_ids:
+            raise ValueError(f"Scenario {scenario_name} does not cover the same risks as {scenario_names[0]}")
+    if not risk_ids:
+        return scenario_names, risk_ids, np.empty((len(scenario_names), 0, 0))
+    rows = [simulation_results[scenario_name][risk_id].impact_distribution for scenario_name in scenario_names for risk_id in risk_ids]
+    impacts = shared_buffer(rows, (len(scenario_names), len(risk_ids)))
+    if impacts is None:
+        impacts = np.stack([np.asarray(row, dtype=float) for row in rows]).reshape(len(scenario_names), len(risk_ids), -1)
+    return scenario_names, risk_ids, impacts
+
+def stack_weights(simulation_results: Dict[str, Dict[int, SimulationResult]]) -> Optional[np.ndarray]:
+    # (scenarios x sims) likelihood-ratio weights; draws of a scenario share their weights across risks
+    first_results = [next(iter(scenario_results.values()), None) for scenario_results in simulation_results.values()]
+    if not first_results or any(result is None or result.weights is None for result in first_results):
+        return None
+    rows = [result.weights for result in first_results]
+    weights = shared_buffer(rows, (len(rows),))
+    return weights if weights is not None else np.stack([np.asarray(row, dtype=float) for row in rows])
+
+def quantile_points(num_draws: int, levels: Sequence[float]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Lower and upper order statistics each level interpolates between, like np.percentile
+    positions = np.asarray(levels, dtype=float) * (num_draws - 1)
+    lower = np.floor(positions).astype(int)
+    return lower, np.ceil(positions).astype(int), positions - lower
+
+def partition_quantiles(values: np.ndarray, levels: Sequence[float], num_draws: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Quantiles along the last axis by selection instead of a full sort. values may hold only the largest
+    # draws of num_draws, as long as they include every order statistic the levels interpolate between.
+    # Returns the partitioned values, each level's upper order statistic within them and the quantiles (levels, ...)
+    num_draws = values.shape[-1] if num_draws is None else num_draws
+    lower, upper, fraction = quantile_points(num_draws, levels)
+    lower, upper = lower - (num_draws - values.shape[-1]), upper - (num_draws - values.shape[-1])
+    partitioned = np.partition(values, np.unique(np.concatenate([lower, upper])), axis=-1)
+    below = np.moveaxis(partitioned[..., lower], -1, 0)
+    above = np.moveaxis(partitioned[..., upper], -1, 0)
+    fraction = fraction.reshape((-1,) + (1,) * (values.ndim - 1))
+    return partitioned, upper, below + fraction * (above - below)
+
+def select_quantiles(values: np.ndarray, levels: Sequence[float]) -> np.ndarray:
+    # Quantiles along the last axis; interpolates like np.percentile
+    return partition_quantiles(values, levels)[2]
+
+def tail_mean(tail: np.ndarray, threshold: np.ndarray) -> np.ndarray:
+    # Mean of the draws strictly above the threshold; falls back to the threshold when the tail is empty
+    above = tail > threshold[..., None]
+    counts = above.sum(axis=-1)
+    sums = np.where(above, tail, 0).sum(axis=-1)
+    return np.where(counts > 0, sums / np.maximum(counts, 1), threshold)
+
+def var_cvar_array(values: np.ndarray, levels: Sequence[float], num_draws: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    # VaR at level a is the a-quantile of the impact draws, CVaR the mean impact beyond it; shape (levels, ...).
+    # One partition serves every level: the draws above a level's VaR all sit at or past its upper order
+    # statistic, so each tail mean only scans that slice of the partitioned draws.
+    partitioned, upper, var = partition_quantiles(values, levels, num_draws)
+    cvar = np.stack([tail_mean(partitioned[..., u:], var[l]) for l, u in enumerate(upper)]) if len(upper) else var
+    return var, cvar
+
+def suffix_sums(values: np.ndarray) -> np.ndarray:
+    # Sums of values[..., j:] for every j along the last axis, with a trailing zero
+    sums = np.cumsum(values[..., ::-1], axis=-1)[..., ::-1]
+    return np.concatenate([sums, np.zeros(values.shape[:-1] + (1,))], axis=-1)
+
+def weighted_sort(values: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Draws sorted along the last axis, with their weights broadcast against them
+    weights = np.broadcast_to(weights, values.shape)
+    order = np.argsort(values, axis=-1)
+    return np.take_along_axis(values, order, axis=-1), np.take_along_axis(weights, order, axis=-1)
+
+def weighted_quantile_indices(sorted_weights: np.ndarray, levels: Sequence[float], num_draws: int) -> np.ndarray:
+    # Position of each level's quantile among the sorted draws; shape (levels, ...). The exceedance mass above
+    # each draw is estimated as sum(weights above) / num_draws rather than self-normalised, so the noisy weights
+    # of the body do not leak into tail quantiles. Exceedance only falls along the sorted draws, so the
+    # position is the number of draws whose exceedance is still above 1 - a.
+    exceedance = suffix_sums(sorted_weights)[..., 1:] / num_draws
+    indices = np.stack([(exceedance > 1 - level).sum(axis=-1) for level in levels])
+    return np.minimum(indices, sorted_weights.shape[-1] - 1)
+
+def weighted_quantiles(values: np.ndarray, weights: np.ndarray, levels: Sequence[float],
+                       num_draws: Optional[int] = None) -> np.ndarray:
+    # Quantiles of importance-sampled draws; weights are likelihood ratios (mean one) broadcast against values.
+    # values may hold only the largest draws of num_draws. Unlike select_quantiles this needs a full sort.
+    # Shape (levels, ...)
+    sorted_values, sorted_weights = weighted_sort(values, weights)
+    indices = weighted_quantile_indices(sorted_weights, levels, values.shape[-1] if num_draws is None else num_draws)
+    return np.take_along_axis(sorted_values[None], indices[..., None], axis=-1)[..., 0]
+
+def weighted_var_cvar_array(values: np.ndarray, weights: np.ndarray, levels: Sequence[float],
+                            num_draws: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    # Weighted counterpart of var_cvar_array for importance-sampled draws. The tail of each level is the
+    # sorted suffix past its VaR, so its weight and weighted total are read off suffix sums of one sort.
+    sorted_values, sorted_weights = weighted_sort(values, weights)
+    indices = weighted_quantile_indices(sorted_weights, levels, values.shape[-1] if num_draws is None else num_draws)
+    var = np.take_along_axis(sorted_values[None], indices[..., None], axis=-1)[..., 0]
+    tail_weights = suffix_sums(sorted_weights)
+    tail_sums = suffix_sums(sorted_weights * sorted_values)
+    cvar = np.empty_like(var)
+    for l in range(len(var)):
+        starts = (sorted_values <= var[l][..., None]).sum(axis=-1)[..., None]
+        level_weights = np.take_along_axis(tail_weights, starts, axis=-1)[..., 0]
+        level_sums = np.take_along_axis(tail_sums, starts, axis=-1)[..., 0]
+        cvar[l] = np.where(level_weights > 0, level_sums / np.where(level_weights > 0, level_weights, 1), var[l])
+    return var, cvar
+
+def tail_statistics(values: np.ndarray, levels: Sequence[float], weights: Optional[np.ndarray] = None,
+                    num_draws: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    # VaR and CVaR of plain or importance-weighted draws
+    if weights is None:
+        return var_cvar_array(values, levels, num_draws)
+    return weighted_var_cvar_array(values, weights, levels, num_draws)
+
+def scenario_tail_risk(impacts: np.ndarray, levels: Sequence[float],
+                       weights: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    # Tail statistics of one scenario's (risks x sims) impacts; risk arrays are (levels x risks)
+    num_risks, num_draws = impacts.shape
+    draw_weights = np.ones(num_draws) if weights is None else weights
+    portfolio = impacts.sum(axis=0)
+    risk_var, risk_cvar = tail_statistics(impacts, levels, weights)
+    portfolio_var, portfolio_cvar = tail_statistics(portfolio, levels, weights)
+
+    # Component CVaR (Euler allocation): each risk's mean impact over the draws in the portfolio tail;
+    # sums to portfolio CVaR
+    mean_impacts = impacts @ draw_weights / draw_weights.sum()
+    component_cvar = np.empty((len(levels), num_risks))
+    for l in range(len(levels)):
+        tail = np.flatnonzero(portfolio > portfolio_var[l])
+        tail_weight = draw_weights[tail].sum()
+        component_cvar[l] = impacts[:, tail] @ draw_weights[tail] / tail_weight if tail_weight > 0 else mean_impacts
+
+    # Marginal CVaR: how much portfolio CVaR drops when the risk is removed from the portfolio. The lowest
+    # level's statistics only read the portfolio draws from `support` up (the order statistics it interpolates
+    # between and above, or the weighted VaR and above). That set is at least as large, or as heavy, as the
+    # tail the portfolio without a risk needs, so all of that tail lies at or above its minimum over the set
+    # and only those draws are evaluated, one risk at a time.
+    lowest = int(np.argmin(levels))
+    if weights is None:
+        lower = int(quantile_points(num_draws, [levels[lowest]])[0][0])
+        support = portfolio >= np.partition(portfolio, lower)[lower]
+    else:
+        support = portfolio >= portfolio_var[lowest]
+    marginal_cvar = np.empty((len(levels), num_risks))
+    for r in range(num_risks):
+        without_risk = portfolio - impacts[r]
+        in_tail = without_risk >= without_risk[support].min()
+        _, without_risk_cvar = tail_statistics(without_risk[in_tail], levels, None if weights is None else weights[in_tail], num_draws)
+        marginal_cvar[:, r] = portfolio_cvar - without_risk_cvar
+
+    return {"portfolio_var": portfolio_var, "portfolio_cvar": portfolio_cvar, "risk_var": risk_var, "risk_cvar": risk_cvar,
+            "component_cvar": component_cvar, "marginal_cvar": marginal_cvar}
+
+def tail_risk_from_array(scenario_names: Sequence[str], risk_ids: Sequence[int], impacts: np.ndarray,
+                         confidence_levels: Sequence[float] = DEFAULT_CONFIDENCE_LEVELS,
+                         weights: Optional[np.ndarray] = None) -> Dict[str, Dict[float, Dict]]:
+    # impacts is (scenarios x risks x sims), e.g. a memory-mapped DistributionStore buffer, and is read one
+    # scenario at a time. Draws of the same simulation index share their scenario perturbation, so the
+    # portfolio total keeps the correlation between risks.
+    # weights are optional (scenarios x sims) likelihood ratios from importance sampling.
+    tail_risk_results = {}
+    for s, scenario_name in enumerate(scenario_names):
+        stats = scenario_tail_risk(np.asarray(impacts[s], dtype=float), confidence_levels,
+                                   None if weights is None else np.asarray(weights[s], dtype=float))
+        tail_risk_results[scenario_name] = {}
+        for l, level in enumerate(confidence_levels):
+            tail_risk_results[scenario_name][level] = {
+                "portfolio": {"VaR": float(stats["portfolio_var"][l]), "CVaR": float(stats["portfolio_cvar"][l])},
+                "risks": {
+                    risk_id: {
+                        "VaR": float(stats["risk_var"][l, r]),
+                        "CVaR": float(stats["risk_cvar"][l, r]),
+                        "component_CVaR": float(stats["component_cvar"][l, r]),
+                        "marginal_CVaR": float(stats["marginal_cvar"][l, r])
+                    } for r, risk_id in enumerate(risk_ids)
+                }
+            }
+    return tail_risk_results
+
+def calculate_tail_risk(simulation_results: Dict[str, Dict[int, SimulationResult]],
+                        confidence_levels: Sequence[float] = DEFAULT_CONFIDENCE_LEVELS) -> Dict[str, Dict[float, Dict]]:
+    scenario_names, risk_ids, impacts = stack_distributions(simulation_results)
+    return tail_risk_from_array(scenario_names, risk_ids, impacts, confidence_levels, stack_weights(simulation_results))
@@ -0,0 +1,88 @@
+import json
+import os
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+from src.models import SimulationResult
+
+INDEX_FILE = 'index.json'
+IMPACT_FILE = 'impact_distribution.npy'
+LIKELIHOOD_FILE = 'likelihood_distribution.npy'
+WEIGHTS_FILE = 'weights.npy'
+
+def default_store_path(output_dir: str, run_name: str) -> str:
+    return os.path.join(output_dir, 'monte_carlo', run_name)
+
+class DistributionStore:
+    # Memory-mapped (scenarios x risks x sims) .npy buffers for raw Monte Carlo draws. Distributions
+    # can exceed RAM, are written in place by parallel workers and can be re-opened by later jobs.
+
+    def __init__(self, path: str, scenario_names: List[str], risk_ids: List[int], impacts: np.memmap, likelihoods: np.memmap,
+                 weights: Optional[np.memmap] = None):
+        self.path = path
+        self.scenario_names = scenario_names
+        self.risk_ids = risk_ids
+        self.impacts = impacts
+        self.likelihoods = likelihoods
+        # (scenarios x sims) likelihood-ratio weights of importance-sampled runs
+        self.weights = weights
+        self._scenario_index = {name: i for i, name in enumerate(scenario_names)}
+
+    @classmethod
+    def create(cls, path: str, scenario_names: Sequence[str], risk_ids: Sequence[int], num_simulations: int,
+               dtype: np.dtype = np.float64, weighted: bool = False) -> 'DistributionStore':
+        os.makedirs(path, exist_ok=True)
+        shape = (len(scenario_names), len(risk_ids), num_simulations)
+        impacts = np.lib.format.open_memmap(os.path.join(path, IMPACT_FILE), mode='w+', dtype=dtype, shape=shape)
+        likelihoods = np.lib.format.open_memmap(os.path.join(path, LIKELIHOOD_FILE), mode='w+', dtype=dtype, shape=shape)
+        weights = None
+        if weighted:
+            weights = np.lib.format.open_memmap(os.path.join(path, WEIGHTS_FILE), mode='w+', dtype=np.float64,
+                                                shape=(len(scenario_names), num_simulations))
+        elif os.path.exists(os.path.join(path, WEIGHTS_FILE)):
+            os.remove(os.path.join(path, WEIGHTS_FILE))
+        with open(os.path.join(path, INDEX_FILE), 'w') as f:
+            json.dump({"scenarios": list(scenario_names), "risk_ids": [int(risk_id) for risk_id in risk_ids]}, f)
+        return cls(path, list(scenario_names), [int(risk_id) for risk_id in risk_ids], impacts, likelihoods, weights)
+
+    @classmethod
+    def open(cls, path: str, mode: str = 'r') -> 'DistributionStore':
+        index_path = os.path.join(path, INDEX_FILE)
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"Distribution store not found: {path}")
+        with open(index_path) as f:
+            index = json.load(f)
+        impacts = np.load(os.path.join(path, IMPACT_FILE), mmap_mode=mode)
+        likelihoods = np.load(os.path.join(path, LIKELIHOOD_FILE), mmap_mode=mode)
+        weights_path = os.path.join(path, WEIGHTS_FILE)
+        weights = np.load(weights_path, mmap_mode=mode) if os.path.exists(weights_path) else None
+        return cls(path, index["scenarios"], index["risk_ids"], impacts, likelihoods, weights)
+
+    @property
+    def num_simulations(self) -> int:
+        return self.impacts.shape[2]
+
+    def write(self, scenario_name: str, risk_offset: int, impacts: np.ndarray, likelihoods: np.ndarray,
+              weights: Optional[np.ndarray] = None) -> None:
+        s = self._scenario_index[scenario_name]
+        self.impacts[s, risk_offset:risk_offset + impacts.shape[0]] = impacts
+        self.likelihoods[s, risk_offset:risk_offset + likelihoods.shape[0]] = likelihoods
+        # Every risk chunk of a scenario carries the same weights; the first chunk writes them
+        if weights is not None and risk_offset == 0:
+            self.weights[s] = weights
+
+    def flush(self) -> None:
+        self.impacts.flush()
+        self.likelihoods.flush()
+        if self.weights is not None:
+            self.weights.flush()
+
+    def results(self) -> Dict[str, Dict[int, SimulationResult]]:
+        # SimulationResult objects whose distributions are zero-copy row views of the mapped buffers
+        return {
+            scenario_name: {
+                risk_id: SimulationResult(risk_id, scenario_name, self.impacts[s, r], self.likelihoods[s, r],
+                                          None if self.weights is None else self.weights[s])
+                for r, risk_id in enumerate(self.risk_ids)
+            }
+            for s, scenario_name in enumerate(self.scenario_names)
+        }
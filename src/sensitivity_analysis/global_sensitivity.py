@@ -0,0 +1,86 @@
+import numpy as np
+from typing import Dict, List, Mapping, Optional
+from src.models import Risk, ExternalData, Scenario
+from src.external_data import latest_external_data
+from src.sensitivity_analysis.sampling import standard_normal_draws
+from src.risk_analysis.impact_kernels import (SCENARIO_PARAMETERS, scenario_parameter_matrix, scenario_impact_multiplier,
+                                              apply_multiplier)
+
+# Variance-based (Saltelli/Sobol) and elementary-effects (Morris) sensitivity of portfolio impact,
+# the sum of all risk impacts, to the scenario parameters. Every sample matrix for every scenario
+# is stacked into one array and evaluated with a single call of the impact kernel.
+
+def portfolio_impact(risks: List[Risk], external_data: Mapping[str, ExternalData], scenario_params: np.ndarray) -> np.ndarray:
+    # (..., samples, params) -> (..., samples)
+    base_impacts = np.array([risk.impact for risk in risks], dtype=float)
+    gdp_growth = np.full(scenario_params.shape[:-1], latest_external_data(external_data).gdp_growth)
+    return apply_multiplier(base_impacts, scenario_impact_multiplier(scenario_params, gdp_growth)).sum(axis=-2)
+
+def sobol_indices(risks: List[Risk], external_data: Mapping[str, ExternalData], scenarios: Dict[str, Scenario],
+                  num_samples: int = 1024, perturbation_scale: float = 0.1,
+                  seed: Optional[int] = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+    # First-order and total-order indices with the Saltelli (2010) estimators. Parameters are
+    # perturbed as in perturb_scenario: max(0, value * (1 + scale * z)) with z ~ N(0, 1).
+    rng = np.random.default_rng(seed)
+    num_params = len(SCENARIO_PARAMETERS)
+    normals = standard_normal_draws(num_samples, 2 * num_params, 'sobol', rng)
+    a, b = normals[:, :num_params], normals[:, num_params:]
+    ab = np.repeat(a[None], num_params, axis=0)
+    ab[np.arange(num_params), :, np.arange(num_params)] = b.T
+    # A, B, AB_1..AB_P stacked as ((P + 2) * N, P)
+    design = np.concatenate([a[None], b[None], ab]).reshape(-1, num_params)
+
+    base_params = scenario_parameter_matrix(scenarios)
+    scenario_params = np.maximum(0, base_params[:, None, :] * (1 + perturbation_scale * design[None]))
+    outputs = portfolio_impact(risks, external_data, scenario_params).reshape(len(scenarios), num_params + 2, num_samples)
+
+    results = {}
+    for s, scenario_name in enumerate(scenarios):
+        f_a, f_b, f_ab = outputs[s, 0], outputs[s, 1], outputs[s, 2:]
+        variance = np.var(np.concatenate([f_a, f_b]))
+        if variance == 0:
+            first_order = total_order = np.zeros(num_params)
+        else:
+            first_order = np.mean(f_b * (f_ab - f_a), axis=1) / variance
+            total_order = 0.5 * np.mean(np.square(f_a - f_ab), axis=1) / variance
+        results[scenario_name] = {
+            param: {"first_order": float(first_order[i]), "total_order": float(total_order[i])}
+            for i, param in enumerate(SCENARIO_PARAMETERS)
+        }
+    return results
+
+def morris_screening(risks: List[Risk], external_data: Mapping[str, ExternalData], scenarios: Dict[str, Scenario],
+                     num_trajectories: int = 50, num_levels: int = 4, perturbation_scale: float = 0.1,
+                     seed: Optional[int] = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+    # Elementary effects on the unit hypercube, where u in [0, 1] maps to
+    # max(0, value * (1 + scale * (4u - 2))), i.e. +/- two standard deviations of perturb_scenario.
+    rng = np.random.default_rng(seed)
+    num_params = len(SCENARIO_PARAMETERS)
+    delta = num_levels / (2 * (num_levels - 1))
+    start_levels = np.arange(num_levels // 2) / (num_levels - 1)
+
+    # Each trajectory moves one randomly ordered parameter by +delta per step: (T, P + 1, P)
+    starts = rng.choice(start_levels, size=(num_trajectories, num_params))
+    orders = np.argsort(rng.random((num_trajectories, num_params)), axis=1)
+    steps = np.zeros((num_trajectories, num_params + 1, num_params))
+    steps[np.arange(num_trajectories)[:, None], np.arange(1, num_params + 1)[None], orders] = delta
+    trajectories = starts[:, None, :] + np.cumsum(steps, axis=1)
+
+    base_params = scenario_parameter_matrix(scenarios)
+    design = trajectories.reshape(-1, num_params)
+    scenario_params = np.maximum(0, base_params[:, None, :] * (1 + perturbation_scale * (4 * design[None] - 2)))
+    outputs = portfolio_impact(risks, external_data, scenario_params).reshape(len(scenarios), num_trajectories, num_params + 1)
+
+    results = {}
+    for s, scenario_name in enumerate(scenarios):
+        effects = np.empty((num_trajectories, num_params))
+        effects[np.arange(num_trajectories)[:, None], orders] = np.diff(outputs[s], axis=1) / delta
+        results[scenario_name] = {
+            param: {
+                "mu": float(np.mean(effects[:, i])),
+                "mu_star": float(np.mean(np.abs(effects[:, i]))),
+                "sigma": float(np.std(effects[:, i]))
+            }
+            for i, param in enumerate(SCENARIO_PARAMETERS)
+        }
+    return results
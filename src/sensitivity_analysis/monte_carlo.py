@@ -1,23 +1,37 @@
 import numpy as np
-from typing import List, Dict
-from src.models import Risk, Scenario, SimulationResult
-
-def perform_monte_carlo_simulations(risks: List[Risk], scenarios: Dict[str, Scenario], num_simulations: int = 10000) -> Dict[str, Dict[int, SimulationResult]]:
-    results = {}
-    for scenario_name, scenario in scenarios.items():
-        scenario_results = {}
-        for risk in risks:
-            impact_distribution = []
-            likelihood_distribution = []
-            for _ in range(num_simulations):
-                perturbed_scenario = perturb_scenario(scenario)
-                impact = calculate_risk_impact(risk, perturbed_scenario)
-                likelihood = calculate_risk_likelihood(risk, perturbed_scenario)
-                impact_distribution.append(impact)
-                likelihood_distribution.append(likelihood)
-            scenario_results[risk.id] = SimulationResult(risk.id, scenario_name, impact_distribution, likelihood_distribution)
-        results[scenario_name] = scenario_results
-    return results
+from typing import List, Dict, Optional, Tuple
+from src.models import Risk, ExternalData, Scenario, SimulationModel, SimulationResult
+from src.sensitivity_analysis.simulation_engine import run_simulation_engine
+from src.risk_analysis.impact_kernels import (SCENARIO_PARAMETERS, sensitivity_impact_multiplier,
+                                              sensitivity_likelihood_multiplier, apply_multiplier)
+
+
+def perform_monte_carlo_simulations(risks: List[Risk], scenarios: Dict[str, Scenario], num_simulations: int = 10000,
+                                    dtype: np.dtype = np.float64, seed: Optional[int] = None, workers: int = 1,
+                                    sampler: str = 'plain') -> Dict[str, Dict[int, SimulationResult]]:
+    # Runs the shared simulation engine with this module's model; all risks of a scenario are evaluated
+    # at once and distributions are contiguous ndarray rows of the requested dtype (float32 halves memory)
+    results = run_simulation_engine(risks, {}, scenarios, {SENSITIVITY_MODEL_NAME: SENSITIVITY_MODEL}, num_simulations,
+                                    seed=seed, workers=workers, sampler=sampler, dtype=dtype)
+    return results[SENSITIVITY_MODEL_NAME]
+
+def sensitivity_model_multipliers(base_params: np.ndarray, external_data: Dict[str, ExternalData],
+                                  normals: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # SimulationModel form of calculate_risk_impact/calculate_risk_likelihood: 10% standard deviation
+    # multipliers on the scenario parameters; external data does not enter this model
+    perturbed_params = base_params[:, None, :] * (1 + 0.1 * normals)
+    return sensitivity_impact_multiplier(perturbed_params), sensitivity_likelihood_multiplier(perturbed_params)
+
+SENSITIVITY_MODEL_NAME = 'sensitivity'
+SENSITIVITY_MODEL = SimulationModel(len(SCENARIO_PARAMETERS), sensitivity_model_multipliers)
+
+def calculate_risk_impact_array(base_impacts: np.ndarray, perturbed_params: np.ndarray) -> np.ndarray:
+    # Broadcast form of calculate_risk_impact: (sims x params) -> (risks x sims)
+    return apply_multiplier(base_impacts, sensitivity_impact_multiplier(perturbed_params).astype(base_impacts.dtype, copy=False))
+
+def calculate_risk_likelihood_array(base_likelihoods: np.ndarray, perturbed_params: np.ndarray) -> np.ndarray:
+    # Broadcast form of calculate_risk_likelihood: (sims x params) -> (risks x sims)
+    return apply_multiplier(base_likelihoods, sensitivity_likelihood_multiplier(perturbed_params).astype(base_likelihoods.dtype, copy=False))
 
 def perturb_scenario(scenario: Scenario) -> Scenario:
     perturbed_values = vars(scenario).copy()
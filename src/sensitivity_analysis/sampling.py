@@ -0,0 +1,28 @@
+import warnings
+import numpy as np
+from typing import Optional
+from scipy.stats import norm, qmc
+
+SAMPLERS = ('plain', 'antithetic', 'latin_hypercube', 'sobol')
+
+def standard_normal_draws(num_samples: int, dimension: int, sampler: str = 'plain',
+                          rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    # (samples x dimension) standard normal draws. The low-discrepancy samplers map their
+    # uniform points through the normal inverse CDF, so each column stays N(0, 1).
+    rng = rng if rng is not None else np.random.default_rng()
+    if sampler == 'plain':
+        return rng.standard_normal((num_samples, dimension))
+    if sampler == 'antithetic':
+        half = rng.standard_normal(((num_samples + 1) // 2, dimension))
+        return np.concatenate([half, -half])[:num_samples]
+    if sampler == 'latin_hypercube':
+        uniforms = qmc.LatinHypercube(d=dimension, seed=rng).random(num_samples)
+    elif sampler == 'sobol':
+        with warnings.catch_warnings():
+            # Sobol balance is best at powers of two, but any sample size is still valid
+            warnings.simplefilter('ignore', UserWarning)
+            uniforms = qmc.Sobol(d=dimension, scramble=True, seed=rng).random(num_samples)
+    else:
+        raise ValueError(f"Unknown sampler '{sampler}', expected one of {SAMPLERS}")
+    eps = np.finfo(float).eps
+    return norm.ppf(np.clip(uniforms, eps, 1 - eps))
@@ -0,0 +1,95 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from src.models import Risk, ExternalData, Scenario, SimulationModel, SimulationResult
+from src.config import NUM_SIMULATIONS
+from src.parallel_execution import spawn_scenario_seeds, chunk_sequence, execute_work_units
+from src.sensitivity_analysis.sampling import standard_normal_draws
+from src.sensitivity_analysis.distribution_store import DistributionStore
+from src.risk_analysis.impact_kernels import scenario_parameter_matrix, apply_multiplier
+
+# One Monte Carlo pass for any number of impact/likelihood models. Each scenario's standard normals
+# are drawn once and every model is evaluated on the same draws (common random numbers), so model
+# outputs are directly comparable and the perturbation cost is paid once.
+
+def run_simulation_engine(risks: List[Risk], external_data: Dict[str, ExternalData], scenarios: Dict[str, Scenario],
+                          models: Dict[str, SimulationModel], num_simulations: int = NUM_SIMULATIONS,
+                          seed: Optional[int] = None, workers: int = 1, sampler: str = 'plain',
+                          importance_tilt: Optional[float] = None, dtype: np.dtype = np.float64,
+                          store_paths: Optional[Dict[str, str]] = None) -> Dict[str, Dict[str, Dict[int, SimulationResult]]]:
+    # Returns {model_name: {scenario_name: {risk_id: SimulationResult}}}. Work is split into
+    # scenario x risk-chunk units that each re-create their scenario's seeded stream, so the output
+    # is bit-identical for any number of workers. Models listed in store_paths write their draws to
+    # a memory-mapped DistributionStore instead of returning them. importance_tilt shifts the draws
+    # towards adverse outcomes of the first model and attaches likelihood-ratio weights.
+    store_paths = store_paths or {}
+    scenario_seeds = spawn_scenario_seeds(list(scenarios.keys()), seed)
+    risk_chunks = chunk_sequence(risks)
+    risk_offsets = np.cumsum([0] + [len(risk_chunk) for risk_chunk in risk_chunks])[:-1]
+    for model_name, store_path in store_paths.items():
+        DistributionStore.create(store_path, list(scenarios.keys()), [risk.id for risk in risks], num_simulations,
+                                 dtype=dtype, weighted=importance_tilt is not None)
+
+    units = [
+        (scenario_name, scenario_parameter_matrix({scenario_name: scenario}), external_data, risk_chunk, int(risk_offset),
+         num_simulations, scenario_seeds[scenario_name], sampler, models, importance_tilt, np.dtype(dtype), store_paths)
+        for scenario_name, scenario in scenarios.items()
+        for risk_chunk, risk_offset in zip(risk_chunks, risk_offsets)
+    ]
+
+    results = {model_name: {scenario_name: {} for scenario_name in scenarios} for model_name in models}
+    for scenario_name, chunk_results in execute_work_units(_simulate_risk_chunk, units, workers):
+        for model_name, model_results in chunk_results.items():
+            results[model_name][scenario_name].update(model_results)
+    for model_name, store_path in store_paths.items():
+        results[model_name] = DistributionStore.open(store_path).results()
+    return results
+
+def _simulate_risk_chunk(scenario_name: str, base_params: np.ndarray, external_data: Dict[str, ExternalData], risks: List[Risk],
+                         risk_offset: int, num_simulations: int, seed_sequence: np.random.SeedSequence, sampler: str,
+                         models: Dict[str, SimulationModel], importance_tilt: Optional[float], dtype: np.dtype,
+                         store_paths: Dict[str, str]) -> Tuple[str, Dict[str, Dict[int, SimulationResult]]]:
+    rng = np.random.default_rng(seed_sequence)
+    num_dimensions = max(model.num_dimensions for model in models.values())
+
+    # The scenario's perturbations are drawn once as a (1 x sims x dims) block shared by all models
+    normals = standard_normal_draws(num_simulations, num_dimensions, sampler, rng)[None]
+    weights = None
+    if importance_tilt is not None:
+        mean_shift = importance_tilt * adverse_directions(next(iter(models.values())), base_params, external_data, num_dimensions)
+        normals = normals + mean_shift[:, None, :]
+        weights = likelihood_ratio_weights(normals, mean_shift)[0]
+
+    chunk_results = {}
+    for model_name, model in models.items():
+        impact_multiplier, likelihood_multiplier = model.multipliers(base_params, external_data, normals[..., :model.num_dimensions])
+        # (risks x sims), so each risk's distribution is a contiguous row
+        impacts = apply_multiplier(np.array([risk.impact for risk in risks], dtype=dtype), impact_multiplier.astype(dtype, copy=False))[0]
+        likelihoods = apply_multiplier(np.array([risk.likelihood for risk in risks], dtype=dtype), likelihood_multiplier.astype(dtype, copy=False))[0]
+
+        if model_name in store_paths:
+            # Written in the worker, so no draws are sent back
+            store = DistributionStore.open(store_paths[model_name], mode='r+')
+            store.write(scenario_name, risk_offset, impacts, likelihoods, weights)
+            store.flush()
+            continue
+        chunk_results[model_name] = {
+            risk.id: SimulationResult(risk.id, scenario_name, impacts[r], likelihoods[r], weights)
+            for r, risk in enumerate(risks)
+        }
+    return scenario_name, chunk_results
+
+def likelihood_ratio_weights(normals: np.ndarray, mean_shift: np.ndarray) -> np.ndarray:
+    # phi(z) / phi(z - mean_shift) for draws z of the shifted (scenarios x sims x dims) normals
+    return np.exp(0.5 * np.sum(mean_shift ** 2, axis=1)[:, None] - normals @ mean_shift[..., None])[..., 0]
+
+def adverse_directions(model: SimulationModel, base_params: np.ndarray, external_data: Dict[str, ExternalData],
+                       num_dimensions: Optional[int] = None, step: float = 1e-3) -> np.ndarray:
+    # (scenarios x num_dimensions) unit vectors in standard-normal space along which the model's impact
+    # multiplier grows fastest, by central differences; dimensions the model does not use stay zero
+    num_dimensions = num_dimensions or model.num_dimensions
+    offsets = np.concatenate([np.eye(model.num_dimensions), -np.eye(model.num_dimensions)]) * step
+    multipliers, _ = model.multipliers(base_params, external_data, np.broadcast_to(offsets, (base_params.shape[0],) + offsets.shape))
+    gradient = np.zeros((base_params.shape[0], num_dimensions))
+    gradient[:, :model.num_dimensions] = (multipliers[:, :model.num_dimensions] - multipliers[:, model.num_dimensions:]) / (2 * step)
+    norms = np.linalg.norm(gradient, axis=1, keepdims=True)
+    return np.divide(gradient, norms, out=np.zeros_like(gradient), where=norms > 0)
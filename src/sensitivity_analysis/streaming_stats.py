@@ -0,0 +1,127 @@
+import numpy as np
+from typing import Dict, Sequence, Tuple
+from src.config import STREAMING_HISTOGRAM_BINS
+
+class RunningMoments:
+    # Welford/Chan running mean and M2 for a vector of streams that all receive the same number of draws.
+    # Merging two accumulators gives the same result as updating one accumulator with both streams.
+
+    def __init__(self, size: int):
+        self.count = 0
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+
+    def update(self, batch: np.ndarray) -> None:
+        # batch has shape (streams x draws)
+        if batch.shape[1] == 0:
+            return
+        batch_mean = batch.mean(axis=1)
+        batch_m2 = np.square(batch - batch_mean[:, None]).sum(axis=1)
+        self._combine(batch.shape[1], batch_mean, batch_m2)
+
+    def merge(self, other: 'RunningMoments') -> None:
+        self._combine(other.count, other.mean, other.m2)
+
+    def subset(self, indices: np.ndarray) -> 'RunningMoments':
+        selected = RunningMoments(len(indices))
+        selected.count, selected.mean, selected.m2 = self.count, self.mean[indices], self.m2[indices]
+        return selected
+
+    def _combine(self, count: int, mean: np.ndarray, m2: np.ndarray) -> None:
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / total)
+        self.m2 = self.m2 + m2 + np.square(delta) * (self.count * count / total)
+        self.count = total
+
+    @property
+    def variance(self) -> np.ndarray:
+        # Population variance, matching np.var/np.std defaults
+        return self.m2 / self.count if self.count else np.full_like(self.mean, np.nan)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+class HistogramSketch:
+    # Fixed-bin quantile sketch over a bounded range. Bin counts add, so sketches built from
+    # parallel chunks merge exactly; percentile error is at most one bin width.
+
+    def __init__(self, size: int, num_bins: int = STREAMING_HISTOGRAM_BINS, value_range: Tuple[float, float] = (0.0, 1.0)):
+        self.num_bins = num_bins
+        self.value_range = value_range
+        self.counts = np.zeros((size, num_bins), dtype=np.int64)
+
+    def update(self, batch: np.ndarray) -> None:
+        low, high = self.value_range
+        size = self.counts.shape[0]
+        bins = np.clip(((batch - low) * (self.num_bins / (high - low))).astype(np.int64), 0, self.num_bins - 1)
+        flat = (bins + np.arange(size)[:, None] * self.num_bins).ravel()
+        self.counts += np.bincount(flat, minlength=size * self.num_bins).reshape(size, self.num_bins)
+
+    def merge(self, other: 'HistogramSketch') -> None:
+        if other.num_bins != self.num_bins or other.value_range != self.value_range:
+            raise ValueError("Cannot merge histogram sketches with different binning")
+        self.counts += other.counts
+
+    def subset(self, indices: np.ndarray) -> 'HistogramSketch':
+        selected = HistogramSketch(0, self.num_bins, self.value_range)
+        selected.counts = self.counts[indices]
+        return selected
+
+    def percentile(self, q: float) -> np.ndarray:
+        low, high = self.value_range
+        width = (high - low) / self.num_bins
+        cumulative = np.cumsum(self.counts, axis=1)
+        target = (q / 100) * cumulative[:, -1]
+        # First bin whose cumulative count reaches the target, then interpolate inside it
+        bins = np.minimum((cumulative < target[:, None]).sum(axis=1), self.num_bins - 1)
+        rows = np.arange(self.counts.shape[0])
+        below = cumulative[rows, bins] - self.counts[rows, bins]
+        in_bin = np.maximum(self.counts[rows, bins], 1)
+        fraction = np.clip((target - below) / in_bin, 0.0, 1.0)
+        return low + (bins + fraction) * width
+
+class StreamingAccumulator:
+    # Constant-memory summary of many draws for a block of streams (one stream per risk)
+
+    def __init__(self, size: int, num_bins: int = STREAMING_HISTOGRAM_BINS):
+        self.moments = RunningMoments(size)
+        self.sketch = HistogramSketch(size, num_bins)
+
+    def update(self, batch: np.ndarray) -> None:
+        self.moments.update(batch)
+        self.sketch.update(batch)
+
+    def merge(self, other: 'StreamingAccumulator') -> None:
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+
+    def subset(self, indices: np.ndarray) -> 'StreamingAccumulator':
+        selected = StreamingAccumulator(0, self.sketch.num_bins)
+        selected.moments = self.moments.subset(indices)
+        selected.sketch = self.sketch.subset(indices)
+        return selected
+
+    @property
+    def count(self) -> int:
+        return self.moments.count
+
+    def confidence_half_widths(self, qs: Sequence[float], z: float) -> np.ndarray:
+        # Largest confidence-interval half-width over the mean and the requested percentiles.
+        # Percentile intervals are distribution-free: the rank band p +/- z*sqrt(p(1-p)/n)
+        # is mapped back through the sketch.
+        n = max(self.count, 1)
+        half_widths = z * self.moments.std / np.sqrt(n)
+        for q in qs:
+            p = q / 100
+            delta = z * np.sqrt(p * (1 - p) / n)
+            upper = self.sketch.percentile(100 * min(1.0, p + delta))
+            lower = self.sketch.percentile(100 * max(0.0, p - delta))
+            half_widths = np.maximum(half_widths, (upper - lower) / 2)
+        return half_widths
+
+    def percentiles(self, qs: Sequence[float]) -> Dict[float, np.ndarray]:
+        return {q: self.sketch.percentile(q) for q in qs}
@@ -1,12 +1,14 @@
 import matplotlib.pyplot as plt
 import seaborn as sns
-from typing import List, Dict
+from typing import Any, List, Dict
 import pandas as pd
 import numpy as np
 import networkx as nx
 import os
+import scipy.sparse as sp
 from src.models import Risk, RiskInteraction, SimulationResult
 from src.config import OUTPUT_DIR, VIZ_DPI, HEATMAP_CMAP, TIME_SERIES_HORIZON
+from src.risk_analysis.interaction_analysis import InteractionMatrix
 
 def generate_visualizations(risks: List[Risk], risk_interactions: List[RiskInteraction], 
                             simulation_results: Dict[str, Dict[int, SimulationResult]],
@@ -15,9 +17,9 @@ def generate_visualizations(risks: List[Risk], risk_interactions: List[RiskInter
                             risk_network: nx.Graph,
                             risk_clusters: Dict[int, int],
                             cumulative_impact: List[float],
-                            interaction_matrix: np.ndarray,
+                            interaction_matrix: InteractionMatrix,
                             risk_progression: Dict[int, List[float]],
-                            aggregate_impact: Dict[str, float]):
+                            aggregate_impact: Dict[str, Any]):
     risk_matrix(risks)
     interaction_heatmap(risks, risk_interactions)
     interaction_network(risks, risk_interactions, risk_network, risk_clusters)
@@ -31,13 +33,28 @@ def generate_visualizations(risks: List[Risk], risk_interactions: List[RiskInter
 
 # Keep existing functions
 
-def interaction_matrix_heatmap(risks: List[Risk], interaction_matrix: np.ndarray):
+def interaction_matrix_heatmap(risks: List[Risk], interaction_matrix: InteractionMatrix):
     plt.figure(figsize=(12, 10))
-    sns.heatmap(interaction_matrix, annot=True, cmap=HEATMAP_CMAP, xticklabels=[r.id for r in risks], yticklabels=[r.id for r in risks])
+    if sp.issparse(interaction_matrix):
+        sparse_matrix_heatmap(risks, interaction_matrix)
+    else:
+        sns.heatmap(interaction_matrix, annot=True, cmap=HEATMAP_CMAP, xticklabels=[r.id for r in risks], yticklabels=[r.id for r in risks])
     plt.title('Risk Interaction Matrix')
     plt.savefig(os.path.join(OUTPUT_DIR, 'interaction_matrix_heatmap.png'), dpi=VIZ_DPI)
     plt.close()
 
+def sparse_matrix_heatmap(risks: List[Risk], interaction_matrix: sp.spmatrix, max_labelled_risks: int = 50):
+    # Draws only the stored entries as square markers, so large registers are never densified
+    n = len(risks)
+    entries = interaction_matrix.tocoo()
+    plt.scatter(entries.col, entries.row, c=entries.data, cmap=HEATMAP_CMAP, marker='s', s=(600 / max(n, 1)) ** 2, linewidths=0)
+    plt.colorbar()
+    plt.xlim(-0.5, n - 0.5)
+    plt.ylim(n - 0.5, -0.5)
+    if n <= max_labelled_risks:
+        plt.xticks(range(n), [r.id for r in risks], rotation=90)
+        plt.yticks(range(n), [r.id for r in risks])
+
 def risk_progression_plot(risks: List[Risk], risk_progression: Dict[int, List[float]]):
     plt.figure(figsize=(12, 8))
     for risk_id, progression in risk_progression.items():
@@ -50,10 +67,9 @@ def risk_progression_plot(risks: List[Risk], risk_progression: Dict[int, List[fl
     plt.savefig(os.path.join(OUTPUT_DIR, 'risk_progression.png'), dpi=VIZ_DPI)
     plt.close()
 
-def aggregate_impact_distribution(aggregate_impact: Dict[str, float]):
+def aggregate_impact_distribution(aggregate_impact: Dict[str, Any]):
     plt.figure(figsize=(10, 6))
-    impact_values = list(aggregate_impact.values())
-    sns.histplot(impact_values, kde=True)
+    sns.histplot(aggregate_impact['distribution'], kde=True)
     plt.axvline(aggregate_impact['mean'], color='r', linestyle='--', label='Mean')
     plt.axvline(aggregate_impact['95th_percentile'], color='g', linestyle='--', label='95th Percentile')
     plt.xlabel('Aggregate Impact')
@@ -0,0 +1,67 @@
+import pytest
+import numpy as np
+import pandas as pd
+from src.data_loader import load_external_data, load_external_data_table
+from src.external_data import ExternalDataTable, EXTERNAL_DATA_FIELDS, latest_external_data
+from src.models import ExternalData
+
+@pytest.fixture
+def sample_table():
+    return load_external_data_table('data/external_data.csv')
+
+def test_table_behaves_like_external_data_dict(sample_table):
+    records = {str(int(data.year)): data for data in load_external_data('data/external_data.csv').values()}
+
+    assert list(sample_table.keys()) == list(records.keys())
+    assert isinstance(sample_table['2020'], ExternalData)
+    assert sample_table['2020'].gdp_growth == records['2020'].gdp_growth
+    assert sample_table['2020'].population == records['2020'].population
+    assert latest_external_data(sample_table).gdp_growth == latest_external_data(records).gdp_growth
+
+def test_table_lookups(sample_table):
+    assert sample_table.latest_year == 2024
+    assert sample_table.latest().gdp_growth == 3.0
+    assert list(sample_table.year_range(2021, 2022).keys()) == ['2021', '2022']
+    assert sample_table.interpolate(2020.5)['gdp_growth'] == pytest.approx((2.3 + 5.7) / 2)
+    with pytest.raises(KeyError):
+        sample_table['1999']
+
+def test_table_rejects_fractional_and_non_numeric_years(sample_table):
+    assert sample_table[2020].year == sample_table['2020'].year == 2020
+    for key in ['2020.5', 2020.5, 'latest', None]:
+        with pytest.raises(KeyError):
+            sample_table[key]
+        assert key not in sample_table
+        assert sample_table.get(key) is None
+
+def test_empty_table_is_rejected():
+    with pytest.raises(ValueError):
+        ExternalDataTable([], {field: [] for field in EXTERNAL_DATA_FIELDS})
+    with pytest.raises(ValueError):
+        ExternalDataTable.from_dataframe(pd.DataFrame(columns=['year', *EXTERNAL_DATA_FIELDS]))
+
+def test_table_sorts_unordered_records():
+    records = {
+        "2022": ExternalData(year=2022, gdp_growth=3.1, population=7953952567, energy_demand=180123, carbon_price=0, renewable_energy_share=0, biodiversity_index=0, deforestation_rate=0),
+        "2020": ExternalData(year=2020, gdp_growth=2.3, population=7794798739, energy_demand=173340, carbon_price=0, renewable_energy_share=0, biodiversity_index=0, deforestation_rate=0),
+    }
+    table = ExternalDataTable.from_records(records)
+
+    assert list(table.keys()) == ['2020', '2022']
+    assert table.latest().year == 2022
+
+def test_from_dataframe_rejects_missing_columns():
+    df = pd.DataFrame({"year": [2020], "gdp_growth": [2.3], "population": [7794798739]})
+    with pytest.raises(ValueError, match="energy_demand, carbon_price"):
+        ExternalDataTable.from_dataframe(df)
+
+    df["energy_demand"] = 173340
+    table = ExternalDataTable.from_dataframe(df, {"carbon_price": 50, "renewable_energy_share": 0, "biodiversity_index": 0, "deforestation_rate": 0})
+    assert table["2020"].carbon_price == 50
+
+def test_table_perturb(sample_table):
+    draws = sample_table.perturb(500, rng=np.random.default_rng(0))
+
+    assert draws.shape == (500, len(sample_table), len(EXTERNAL_DATA_FIELDS))
+    assert np.all(draws >= 0)
+    np.testing.assert_allclose(draws.mean(axis=0), sample_table.values, rtol=0.02)
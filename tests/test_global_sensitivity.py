@@ -0,0 +1,38 @@
+import pytest
+from src.sensitivity_analysis.global_sensitivity import sobol_indices, morris_screening
+from src.risk_analysis.impact_kernels import SCENARIO_PARAMETERS
+from src.models import Risk, ExternalData
+from src.config import SCENARIOS
+
+@pytest.fixture
+def sample_risks():
+    return [
+        Risk(id=1, description="Physical Risk 1", category="Physical", likelihood=0.7, impact=0.5, subcategory="Acute", tertiary_category="", time_horizon="Short-term", industry_specific=False, sasb_category=""),
+        Risk(id=2, description="Transition Risk 1", category="Transition", likelihood=0.6, impact=0.4, subcategory="Policy", tertiary_category="", time_horizon="Medium-term", industry_specific=True, sasb_category="Energy"),
+    ]
+
+@pytest.fixture
+def sample_external_data():
+    return {
+        "2021": ExternalData(year=2021, gdp_growth=2.0, population=7874965732, energy_demand=176431, carbon_price=40, renewable_energy_share=0.31, biodiversity_index=0.68, deforestation_rate=0.48),
+    }
+
+def test_sobol_indices(sample_risks, sample_external_data):
+    indices = sobol_indices(sample_risks, sample_external_data, SCENARIOS, num_samples=512, seed=0)
+
+    assert set(indices) == set(SCENARIOS)
+    for scenario_indices in indices.values():
+        assert set(scenario_indices) == set(SCENARIO_PARAMETERS)
+        # Parameters that do not enter the impact formula have no influence
+        assert scenario_indices["policy_stringency"]["total_order"] == 0
+        assert scenario_indices["temp_increase"]["total_order"] > scenario_indices["carbon_price"]["total_order"]
+        assert sum(index["first_order"] for index in scenario_indices.values()) == pytest.approx(1, abs=0.15)
+
+def test_morris_screening(sample_risks, sample_external_data):
+    screening = morris_screening(sample_risks, sample_external_data, SCENARIOS, num_trajectories=20, seed=0)
+
+    for scenario_screening in screening.values():
+        assert scenario_screening["financial_stability"]["mu_star"] == 0
+        assert scenario_screening["temp_increase"]["mu"] > 0
+        assert scenario_screening["renewable_energy"]["mu"] < 0
+        assert all(effects["mu_star"] >= abs(effects["mu"]) for effects in scenario_screening.values())
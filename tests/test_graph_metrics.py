@@ -0,0 +1,77 @@
+import networkx as nx
+import numpy as np
+import pytest
+from src.risk_analysis.graph_metrics import (GraphMetrics, graph_fingerprint, weighted_adjacency, sparse_betweenness,
+                                             betweenness_sample_size)
+from src.risk_analysis.systemic_risk_analysis import assess_system_resilience
+
+def weighted_graph(num_nodes, edge_probability, seed=0):
+    graph = nx.gnp_random_graph(num_nodes, edge_probability, seed=seed)
+    rng = np.random.default_rng(seed)
+    for u, v in graph.edges:
+        graph[u][v]['weight'] = float(rng.uniform(0.05, 1))
+    return graph
+
+@pytest.fixture
+def graph():
+    return weighted_graph(120, 0.06)
+
+def test_sparse_betweenness_with_every_pivot_is_exact(graph):
+    nodes, adjacency = weighted_adjacency(graph)
+    expected = nx.betweenness_centrality(graph, weight='weight')
+    estimated = sparse_betweenness(adjacency, np.arange(len(nodes)), batch_size=50)
+    np.testing.assert_allclose(estimated, [expected[node] for node in nodes], atol=1e-12)
+
+def test_sparse_betweenness_splits_credit_between_equal_paths():
+    # A weighted grid has many shortest paths of equal length; every one of them must share the credit
+    graph = nx.convert_node_labels_to_integers(nx.grid_2d_graph(6, 7))
+    for u, v in graph.edges:
+        graph[u][v]['weight'] = 0.25 * (1 + (u + v) % 2)
+    nodes, adjacency = weighted_adjacency(graph)
+    expected = nx.betweenness_centrality(graph, weight='weight')
+    estimated = sparse_betweenness(adjacency, np.arange(len(nodes)))
+    np.testing.assert_allclose(estimated, [expected[node] for node in nodes], atol=1e-12)
+
+    directed = nx.DiGraph(graph)
+    nodes, adjacency = weighted_adjacency(directed)
+    expected = nx.betweenness_centrality(directed, weight='weight')
+    estimated = sparse_betweenness(adjacency, np.arange(len(nodes)), directed=True)
+    np.testing.assert_allclose(estimated, [expected[node] for node in nodes], atol=1e-12)
+
+def test_sampled_betweenness_within_error_bound():
+    graph = weighted_graph(600, 0.01, seed=1)
+    exact = nx.betweenness_centrality(graph, weight='weight')
+    assert betweenness_sample_size(600, 0.1, 0.1) < 600
+    sampled = GraphMetrics().betweenness(graph, epsilon=0.1, delta=0.1, exact_max_nodes=100)
+    assert max(abs(sampled[node] - exact[node]) for node in graph) < 0.1
+    # Small networks keep the exact networkx result
+    small = GraphMetrics().betweenness(graph)
+    assert all(small[node] == pytest.approx(exact[node], abs=1e-12) for node in graph)
+
+def test_clustering_and_assortativity_match_networkx(graph):
+    graph.add_edge(3, 3, weight=2.0)
+    metrics = GraphMetrics()
+    assert metrics.average_clustering(graph) == pytest.approx(nx.average_clustering(graph, weight='weight'))
+    assert metrics.assortativity(graph) == pytest.approx(nx.degree_assortativity_coefficient(graph, weight='weight'))
+    assert metrics.strength(graph)[5] == pytest.approx(graph.degree(5, weight='weight'))
+
+def test_metrics_are_cached_per_network_version(graph):
+    metrics = GraphMetrics(max_cached_graphs=1)
+    first = metrics.density(graph)
+    assert metrics.density(graph) == first
+    assert metrics.stats()["hits"] == 1 and metrics.stats()["misses"] == 1
+
+    fingerprint = graph_fingerprint(graph)
+    graph[0][next(iter(graph[0]))]['weight'] = 0.5
+    assert graph_fingerprint(graph) != fingerprint
+    metrics.density(graph)
+    assert metrics.stats()["misses"] == 2 and metrics.stats()["cached_graphs"] == 1
+
+def test_assess_system_resilience_network_metrics(graph):
+    metrics = GraphMetrics()
+    resilience = assess_system_resilience([], graph, {}, metrics)
+    assert resilience["network_density"] == pytest.approx(nx.density(graph))
+    assert resilience["average_clustering"] == pytest.approx(nx.average_clustering(graph, weight='weight'))
+    assert resilience["assortativity"] == pytest.approx(nx.degree_assortativity_coefficient(graph, weight='weight'))
+    assess_system_resilience([], graph, {}, metrics)
+    assert metrics.stats()["hits"] >= 3
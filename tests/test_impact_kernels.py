@@ -0,0 +1,26 @@
+import pytest
+import numpy as np
+from src.risk_analysis.impact_kernels import (
+    scenario_parameter_matrix, scenario_impact_multiplier, scenario_likelihood_multiplier, apply_multiplier
+)
+from src.config import SCENARIOS
+
+def test_apply_multiplier_is_clipped_outer_product():
+    base = np.array([0.2, 0.5, 0.9])
+    multiplier = np.array([[0.5, 1.0, 2.0]])
+
+    result = apply_multiplier(base, multiplier)
+
+    assert result.shape == (1, 3, 3)
+    np.testing.assert_allclose(result[0], np.clip(np.outer(base, multiplier[0]), 0, 1))
+
+def test_scenario_multipliers_broadcast_over_draws():
+    params = scenario_parameter_matrix(SCENARIOS)
+    draws = np.repeat(params[:, None, :], 4, axis=1)
+
+    impact = scenario_impact_multiplier(draws, np.full((len(SCENARIOS), 4), 2.0))
+    likelihood = scenario_likelihood_multiplier(draws, np.full((len(SCENARIOS), 4), 8e9))
+
+    assert impact.shape == likelihood.shape == (len(SCENARIOS), 4)
+    np.testing.assert_allclose(impact[:, 0], scenario_impact_multiplier(params, np.full(len(SCENARIOS), 2.0)))
+    assert impact[list(SCENARIOS).index("Systemic Crisis"), 0] > impact[list(SCENARIOS).index("Net Zero 2050"), 0]
@@ -0,0 +1,174 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from src.models import Risk
+from src.risk_analysis.interaction_analysis import (simulate_risk_interactions, select_interaction_storage, assemble_interaction_matrix,
+                                                    InteractionPropagator)
+from src.risk_analysis.advanced_analysis import assess_aggregate_impact, identify_tipping_points, simulate_aggregate_impacts
+
+def make_risks(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        Risk(id=i + 1, description=f"Risk {i}", category="Physical", likelihood=0.5, impact=float(impact), subcategory="Acute",
+             tertiary_category="", time_horizon="Short-term", industry_specific=False, sasb_category="")
+        for i, impact in enumerate(rng.uniform(0.05, 0.4, n))
+    ]
+
+def sparse_interactions(n, density, seed=0):
+    # Symmetric random interaction graph with zero diagonal
+    upper = sp.triu(sp.random(n, n, density=density / 2, random_state=seed), k=1)
+    return (upper + upper.T).tocsr() * 0.3
+
+@pytest.fixture
+def risks():
+    return make_risks(30)
+
+@pytest.fixture
+def interactions(risks):
+    return sparse_interactions(len(risks), 0.1)
+
+def test_select_interaction_storage():
+    sparse = sparse_interactions(200, 0.02)
+    selected = select_interaction_storage(sparse.toarray())
+    assert sp.issparse(selected) and selected.format == 'csr' and selected.nnz == sparse.nnz
+    dense = select_interaction_storage(sparse_interactions(20, 0.5))
+    assert isinstance(dense, np.ndarray)
+    assert isinstance(assemble_interaction_matrix(3, [(0, 1), (0, 2), (1, 2)], [0.2, 0.3, 0.4]), np.ndarray)
+    assert sp.issparse(assemble_interaction_matrix(100, [(0, 1)], [0.2]))
+
+def test_simulate_risk_interactions_sparse_matches_dense(risks, interactions):
+    dense = simulate_risk_interactions(risks, interactions.toarray())
+    sparse = simulate_risk_interactions(risks, interactions)
+    coo = simulate_risk_interactions(risks, interactions.tocoo())
+    for risk in risks:
+        np.testing.assert_allclose(sparse[risk.id], dense[risk.id])
+        np.testing.assert_allclose(coo[risk.id], dense[risk.id])
+
+def test_assess_aggregate_impact_sparse_matches_dense(risks, interactions):
+    np.random.seed(7)
+    dense = assess_aggregate_impact(risks, interactions.toarray(), num_simulations=50)
+    np.random.seed(7)
+    sparse = assess_aggregate_impact(risks, interactions, num_simulations=50)
+    for key in dense:
+        assert sparse[key] == pytest.approx(dense[key])
+
+def test_identify_tipping_points_sparse_matches_dense(risks, interactions):
+    assert identify_tipping_points(risks, interactions) == identify_tipping_points(risks, interactions.toarray())
+
+def legacy_aggregate_impacts(risks, interaction_matrix, num_simulations):
+    # One simulation at a time, as assess_aggregate_impact used to run
+    base_impacts = np.array([risk.impact for risk in risks])
+    aggregate_impacts = []
+    for _ in range(num_simulations):
+        risk_levels = np.random.beta(2, 2, len(risks)) * base_impacts
+        for _ in range(10):
+            risk_levels = np.clip(risk_levels + 0.1 * (interaction_matrix @ risk_levels), 0, 1)
+        aggregate_impacts.append(np.sum(risk_levels))
+    return np.array(aggregate_impacts)
+
+@pytest.mark.parametrize("chunk_size", [None, 64, 1000])
+def test_simulate_aggregate_impacts_matches_sequential_loop(risks, interactions, chunk_size):
+    dense = interactions.toarray()
+    np.random.seed(11)
+    expected = legacy_aggregate_impacts(risks, dense, 300)
+    np.random.seed(11)
+    np.testing.assert_allclose(simulate_aggregate_impacts(risks, dense, 300, chunk_size), expected, rtol=1e-12)
+
+def test_assess_aggregate_impact_returns_distribution(risks, interactions):
+    np.random.seed(3)
+    aggregate_impact = assess_aggregate_impact(risks, interactions, num_simulations=200, chunk_size=50)
+    distribution = aggregate_impact["distribution"]
+    assert distribution.shape == (200,)
+    assert aggregate_impact["mean"] == pytest.approx(distribution.mean())
+    assert aggregate_impact["max"] == distribution.max()
+    assert aggregate_impact["median"] <= aggregate_impact["95th_percentile"] <= aggregate_impact["max"]
+
+def legacy_tipping_points(risks, interaction_matrix):
+    # The 100-level scan run one level at a time, as identify_tipping_points used to
+    base_impacts = np.array([risk.impact for risk in risks])
+    tipping_points = []
+    for i in range(len(risks)):
+        impact_levels = np.linspace(0, 1, 100)
+        aggregate_impacts = []
+        for level in impact_levels:
+            risk_levels = base_impacts.copy()
+            risk_levels[i] = level
+            for _ in range(10):
+                risk_levels = np.clip(risk_levels + 0.1 * (interaction_matrix @ risk_levels), 0, 1)
+            aggregate_impacts.append(np.sum(risk_levels))
+        rate_of_change = np.diff(aggregate_impacts)
+        indices = np.where(rate_of_change > np.mean(rate_of_change) + 2 * np.std(rate_of_change))[0]
+        if len(indices) > 0:
+            tipping_points.append((risks[i].id, impact_levels[indices[0]], aggregate_impacts[indices[0]]))
+    return tipping_points
+
+@pytest.fixture
+def strong_interactions(risks):
+    # Strong enough for propagation to saturate, so most risks have a tipping point
+    return sparse_interactions(len(risks), 0.3) * 3
+
+def test_identify_tipping_points_grid_matches_level_scan(risks, strong_interactions):
+    tipping_points = identify_tipping_points(risks, strong_interactions)
+    expected = legacy_tipping_points(risks, strong_interactions.toarray())
+    assert len(tipping_points) == len(expected) > 0
+    for tipping_point, (risk_id, level, aggregate_impact) in zip(tipping_points, expected):
+        assert tipping_point["risk_id"] == risk_id
+        assert tipping_point["risk_description"] == f"Risk {risk_id - 1}"
+        assert tipping_point["tipping_point_level"] == pytest.approx(level)
+        assert tipping_point["aggregate_impact"] == pytest.approx(aggregate_impact)
+
+def test_identify_tipping_points_adaptive_brackets_grid_result(risks, strong_interactions):
+    grid = {point["risk_id"]: point["tipping_point_level"] for point in identify_tipping_points(risks, strong_interactions)}
+    adaptive = identify_tipping_points(risks, strong_interactions, mode='adaptive', coarse_levels=17, resolution=0.005)
+    assert len(adaptive) >= 0.7 * len(grid)
+    for point in adaptive:
+        assert point["risk_id"] in grid
+        # The coarse scan fixes the break to one interval of width 1/16
+        assert abs(point["tipping_point_level"] - grid[point["risk_id"]]) <= 1 / 16
+    with pytest.raises(ValueError):
+        identify_tipping_points(risks, strong_interactions, mode='exhaustive')
+
+def test_identify_tipping_points_ignores_isolated_risks(risks):
+    # Without interactions the aggregate impact is linear in each risk's level, so there is no tipping point
+    assert identify_tipping_points(risks, sp.csr_matrix((len(risks), len(risks)))) == []
+    assert identify_tipping_points(risks, np.zeros((len(risks), len(risks))), mode='adaptive') == []
+
+@pytest.mark.parametrize("num_steps", [10, 200])
+def test_propagator_closed_form_matches_stepping(num_steps):
+    # Weak interactions: low starting levels stay unclipped, high ones saturate and fall back to stepping
+    interactions = sparse_interactions(40, 0.5, seed=2).toarray() * 0.05
+    start_levels = np.random.default_rng(0).uniform(0, 1, (40, 300)) * np.linspace(0.01, 1, 300)
+    propagator = InteractionPropagator(interactions)
+    assert propagator.uses_closed_form(num_steps)
+    stepped = propagator.step(start_levels, num_steps)
+    assert 0 < np.sum(stepped.max(axis=0) >= 1) < 300
+    np.testing.assert_allclose(propagator.propagate(start_levels, num_steps), stepped, rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(propagator.propagate(start_levels[:, 0], num_steps), stepped[:, 0], rtol=1e-10)
+    assert list(propagator._powers) == [num_steps]
+
+def test_propagator_steps_when_closed_form_does_not_apply():
+    # Negative interactions break the monotonicity the clip check relies on
+    interactions = sparse_interactions(20, 0.5).toarray()
+    interactions[0, 1] = -0.5
+    assert not InteractionPropagator(interactions).uses_closed_form(10)
+    # A very sparse matrix is cheaper to step than to apply a dense power
+    assert not InteractionPropagator(sparse_interactions(500, 0.002)).uses_closed_form(10)
+    assert not InteractionPropagator(sparse_interactions(20, 0.5), max_power_risks=10).uses_closed_form(10)
+
+def test_shared_propagator_matches_matrix_and_reuses_powers(risks, monkeypatch):
+    # Dense enough for the closed form, so the propagator caches a transition power
+    dense = sparse_interactions(len(risks), 0.5).toarray() * 0.2
+    propagator = InteractionPropagator(dense)
+    np.random.seed(3)
+    expected = assess_aggregate_impact(risks, dense, num_simulations=50)
+    np.random.seed(3)
+    shared = assess_aggregate_impact(risks, propagator, num_simulations=50)
+    np.testing.assert_allclose(shared["distribution"], expected["distribution"])
+    assert identify_tipping_points(risks, propagator) == identify_tipping_points(risks, dense)
+
+    # The transition power built for the aggregate impact is reused by the tipping point scan
+    built = list(propagator._powers)
+    assert built
+    monkeypatch.setattr(np.linalg, "matrix_power", lambda *args: pytest.fail("transition power rebuilt"))
+    identify_tipping_points(risks, propagator)
+    assert list(propagator._powers) == built
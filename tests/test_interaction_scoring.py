@@ -0,0 +1,149 @@
+import asyncio
+import json
+import re
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from src.models import Risk
+from src.llm.async_client import AsyncLLMClient
+from src.llm.cache import LLMCache
+from src.llm.backends import StubBackend
+from src.risk_analysis.interaction_analysis import (create_risk_interaction_matrix, score_interaction_tiles,
+                                                    block_interaction_request, parse_interaction_grid,
+                                                    candidate_interaction_pairs, create_sparse_interaction_matrix,
+                                                    update_interaction_matrix, load_interaction_matrix, risk_content_hash)
+
+class FakeGridServer:
+    # Answers block prompts with a JSON grid of the requested shape; score depends on the prompt size only
+    def __init__(self):
+        self.calls = 0
+        self.prompt_chars = 0
+
+    async def send(self, model, messages, temperature, max_tokens):
+        self.calls += 1
+        prompt = messages[-1]["content"]
+        self.prompt_chars += len(prompt)
+        num_rows, num_columns = map(int, re.search(r"a grid with (\d+) rows .* holding (\d+) scores", prompt).groups())
+        await asyncio.sleep(0)
+        return "Here you go:\n" + json.dumps({"scores": [[0.25] * num_columns for _ in range(num_rows)]})
+
+@pytest.fixture
+def risks():
+    return [
+        Risk(id=100 + i, description=f"Risk number {i}", category="Physical", likelihood=0.5, impact=0.5, subcategory="Acute",
+             tertiary_category="", time_horizon="Short-term", industry_specific=False, sasb_category="")
+        for i in range(10)
+    ]
+
+@pytest.fixture
+def client_factory(tmp_path):
+    def make(server):
+        return AsyncLLMClient(server.send, cache=LLMCache(str(tmp_path / "llm.sqlite"), mode='off'))
+    return make
+
+def test_score_interaction_tiles_call_count(risks, client_factory):
+    server = FakeGridServer()
+    scores = score_interaction_tiles(risks, block_size=4, client=client_factory(server))
+    # Blocks of 4, 4 and 2 risks give 3 diagonal and 3 off-diagonal tiles instead of 45 pair prompts
+    assert server.calls == 6
+    assert list(scores) == [(i, j) for i in range(10) for j in range(i + 1, 10)]
+    assert all(score == 0.25 for score in scores.values())
+
+def test_create_risk_interaction_matrix_block_mode(risks, client_factory):
+    matrix = create_risk_interaction_matrix(risks, client=client_factory(FakeGridServer()), block_size=3)
+    expected = np.full((10, 10), 0.25)
+    np.fill_diagonal(expected, 0)
+    np.testing.assert_array_equal(matrix, expected)
+
+def test_block_interaction_request(risks):
+    request = block_interaction_request(risks[:3], risks[3:5])
+    prompt = request["messages"][-1]["content"]
+    assert "R1. [Physical/Acute] Risk number 0" in prompt
+    assert "C2. [Physical/Acute] Risk number 4" in prompt
+    assert "3 rows" in prompt and "2 scores" in prompt
+    diagonal = block_interaction_request(risks[:3], risks[:3], same_block=True)["messages"][-1]["content"]
+    assert diagonal.count("Risk number 0") == 1
+
+def test_parse_interaction_grid_marks_malformed_cells():
+    analysis = 'Scores: {"scores": [[null, 0.4, "high"], [0.4, null, 1.7], [0.1]]}'
+    grid = parse_interaction_grid(analysis, 3, 3)
+    assert grid[0, 1] == 0.4 and grid[1, 0] == 0.4 and grid[2, 0] == 0.1
+    assert np.isnan(grid[0, 2]) and np.isnan(grid[1, 2]) and np.isnan(grid[2, 1])
+    assert np.isnan(parse_interaction_grid("no json here", 2, 2)).all()
+    assert np.isnan(parse_interaction_grid('{"scores": 3}', 2, 2)).all()
+
+def make_risk(risk_id, description, category="Physical", subcategory="Acute"):
+    return Risk(id=risk_id, description=description, category=category, likelihood=0.5, impact=0.5, subcategory=subcategory,
+                tertiary_category="", time_horizon="Short-term", industry_specific=False, sasb_category="")
+
+@pytest.fixture
+def themed_risks():
+    return [
+        make_risk(1, "Coastal flooding damages port facilities"),
+        make_risk(2, "Flooding of coastal warehouses and port assets"),
+        make_risk(3, "Carbon tax raises operating costs", "Transition", "Policy"),
+        make_risk(4, "Higher carbon pricing increases operating costs", "Transition", "Policy"),
+        make_risk(5, "Drought reduces water supply for cooling", "Physical", "Chronic"),
+        make_risk(6, "Water stress limits cooling water supply", "Physical", "Chronic"),
+    ]
+
+def test_candidate_interaction_pairs_finds_similar_risks(themed_risks):
+    assert candidate_interaction_pairs(themed_risks, candidates_per_risk=1) == [(0, 1), (2, 3), (4, 5)]
+    # Chunking the similarity rows does not change the candidates
+    assert candidate_interaction_pairs(themed_risks, 2, chunk_size=4) == candidate_interaction_pairs(themed_risks, 2)
+    # Asking for every partner degrades to the full upper triangle
+    assert len(candidate_interaction_pairs(themed_risks, 10)) == 15
+    assert candidate_interaction_pairs(themed_risks[:1], 3) == []
+
+def test_create_sparse_interaction_matrix(themed_risks, client_factory):
+    class PairServer(FakeGridServer):
+        async def send(self, model, messages, temperature, max_tokens):
+            self.calls += 1
+            return "Interaction score: 0.6"
+    server = PairServer()
+    matrix = create_sparse_interaction_matrix(themed_risks, candidates_per_risk=1, client=client_factory(server))
+    assert sp.issparse(matrix) and matrix.format == 'csr'
+    assert server.calls == 3 and matrix.nnz == 6
+    assert (matrix != matrix.T).nnz == 0
+    assert matrix[0, 1] == 0.6 and matrix[0, 2] == 0
+
+def test_update_interaction_matrix_rescores_only_changed_pairs(themed_risks, tmp_path):
+    path = str(tmp_path / "matrices" / "interaction_matrix.npz")
+    cache = LLMCache(str(tmp_path / "llm.sqlite"), mode='off')
+    backend = StubBackend()
+    first = update_interaction_matrix(themed_risks[:5], path, AsyncLLMClient(backend=backend, cache=cache))
+    assert backend.calls == 10
+
+    # Risk 2 edited, risk 5 dropped, risk 6 added, risk 3 only re-rated: 3 of 10 pairs are reused
+    edited = themed_risks[1].copy(update={"description": "Storm surge floods coastal warehouses"})
+    rerated = themed_risks[2].copy(update={"likelihood": 0.9})
+    register = [themed_risks[0], edited, rerated, themed_risks[3], themed_risks[5]]
+    backend = StubBackend()
+    updated = update_interaction_matrix(register, path, AsyncLLMClient(backend=backend, cache=cache))
+    assert backend.calls == 7
+
+    full = create_risk_interaction_matrix(register, AsyncLLMClient(backend=StubBackend(), cache=cache))
+    np.testing.assert_array_equal(updated, full)
+    np.testing.assert_array_equal(updated[np.ix_([0, 2, 3], [0, 2, 3])], first[np.ix_([0, 2, 3], [0, 2, 3])])
+    risk_ids, hashes, saved = load_interaction_matrix(path)
+    assert risk_ids == [1, 2, 3, 4, 6]
+    assert hashes[2] == risk_content_hash(themed_risks[2])
+    assert sp.issparse(saved)
+    np.testing.assert_array_equal(saved.toarray(), updated)
+
+def test_update_interaction_matrix_keeps_sparse_registers_sparse(tmp_path):
+    # One interacting pair in a register of twelve, so the matrix is stored, reused and returned as CSR
+    risks = [make_risk(risk_id, f"Risk number {risk_id} description") for risk_id in range(1, 13)]
+    def responder(messages):
+        content = messages[-1]["content"]
+        return "Interaction score: 0.80" if "number 1 " in content and "number 2 " in content else "Interaction score: 0"
+    path = str(tmp_path / "interaction_matrix.npz")
+    cache = LLMCache(str(tmp_path / "llm.sqlite"), mode='off')
+    first = update_interaction_matrix(risks, path, AsyncLLMClient(backend=StubBackend(responder=responder), cache=cache))
+    assert sp.issparse(first) and first.nnz == 2 and first[0, 1] == pytest.approx(0.8)
+    assert sp.load_npz(path).nnz == 2
+
+    backend = StubBackend(responder=responder)
+    again = update_interaction_matrix(risks, path, AsyncLLMClient(backend=backend, cache=cache))
+    assert backend.calls == 0
+    assert sp.issparse(again) and (again != first).nnz == 0
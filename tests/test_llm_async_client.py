@@ -0,0 +1,115 @@
+import asyncio
+import time
+import pytest
+from src.llm.async_client import AsyncLLMClient, TokenBucket, run_chat_completions
+from src.llm.cache import LLMCache
+from src.risk_analysis.interaction_analysis import assemble_interaction_matrix, interaction_request
+from src.risk_analysis.scenario_analysis import generate_scenario_narratives
+from src.models import Risk
+from src.config import SCENARIOS
+
+class FakeResponseError(Exception):
+    def __init__(self, http_status):
+        super().__init__(f"HTTP {http_status}")
+        self.http_status = http_status
+
+class FakeLLMServer:
+    # In-process stand-in for the chat endpoint with configurable latency and failure responses
+    def __init__(self, latency=0.05, failures=None):
+        self.latency = latency
+        self.failures = list(failures or [])
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def send(self, model, messages, temperature, max_tokens):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.failures:
+                raise FakeResponseError(self.failures.pop(0))
+            return f"echo: {messages[-1]['content']}"
+        finally:
+            self.in_flight -= 1
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(str(tmp_path / "llm.sqlite"), mode='off')
+
+def _requests(n):
+    return [{"messages": [{"role": "user", "content": f"prompt {i}"}]} for i in range(n)]
+
+def test_concurrent_requests_are_ordered_and_bounded(cache):
+    server = FakeLLMServer(latency=0.05)
+    client = AsyncLLMClient(server.send, max_concurrency=10, cache=cache)
+
+    start = time.perf_counter()
+    results = run_chat_completions(_requests(40), client)
+    elapsed = time.perf_counter() - start
+
+    assert results == [f"echo: prompt {i}" for i in range(40)]
+    assert server.max_in_flight == 10
+    # 40 sequential round trips would take 2s
+    assert elapsed < 0.6
+
+def test_retries_rate_limits_and_server_errors(cache):
+    server = FakeLLMServer(latency=0.0, failures=[429, 503])
+    client = AsyncLLMClient(server.send, max_concurrency=1, backoff_base=0.01, cache=cache)
+    assert run_chat_completions(_requests(1), client) == ["echo: prompt 0"]
+    assert server.calls == 3
+    assert client.retries == 2
+
+def test_gives_up_after_max_retries(cache):
+    server = FakeLLMServer(latency=0.0, failures=[429] * 3)
+    client = AsyncLLMClient(server.send, max_retries=2, backoff_base=0.01, cache=cache)
+    with pytest.raises(FakeResponseError):
+        run_chat_completions(_requests(1), client)
+    assert server.calls == 3
+
+def test_client_errors_are_not_retried(cache):
+    server = FakeLLMServer(latency=0.0, failures=[400])
+    client = AsyncLLMClient(server.send, backoff_base=0.01, cache=cache)
+    with pytest.raises(FakeResponseError):
+        run_chat_completions(_requests(1), client)
+    assert server.calls == 1
+
+def test_responses_are_cached(tmp_path):
+    server = FakeLLMServer(latency=0.0)
+    client = AsyncLLMClient(server.send, cache=LLMCache(str(tmp_path / "llm.sqlite")))
+    first = run_chat_completions(_requests(5), client)
+    second = run_chat_completions(_requests(5), client)
+    assert first == second
+    assert server.calls == 5
+
+def test_token_bucket_limits_rate():
+    async def acquire_all():
+        bucket = TokenBucket(rate_per_minute=6000, capacity=5)
+        start = time.perf_counter()
+        for _ in range(25):
+            await bucket.acquire()
+        return time.perf_counter() - start
+    # 5 units of burst, then 20 more at 100 per second
+    assert asyncio.run(acquire_all()) >= 0.18
+
+def test_assemble_interaction_matrix():
+    pairs = [(0, 1), (0, 2), (1, 2)]
+    matrix = assemble_interaction_matrix(3, pairs, [0.1, 0.2, 0.3])
+    assert (matrix == matrix.T).all()
+    assert matrix[0, 2] == 0.2 and matrix[2, 1] == 0.3 and matrix[1, 1] == 0
+
+def test_interaction_request_uses_template():
+    risk1 = Risk(id=1, description="Flooding", category="Physical", likelihood=0.7, impact=0.8, subcategory="Acute", tertiary_category="", time_horizon="Short-term", industry_specific=False, sasb_category="")
+    risk2 = Risk(id=2, description="Carbon tax", category="Transition", likelihood=0.6, impact=0.7, subcategory="Policy", tertiary_category="", time_horizon="Medium-term", industry_specific=True, sasb_category="Energy")
+    request = interaction_request(risk1, risk2)
+    assert "Flooding" in request["messages"][-1]["content"] and "Carbon tax" in request["messages"][-1]["content"]
+    assert request["template"] is not None
+
+def test_generate_scenario_narratives_concurrently(cache):
+    server = FakeLLMServer(latency=0.05)
+    narratives = generate_scenario_narratives(SCENARIOS, AsyncLLMClient(server.send, cache=cache))
+    assert list(narratives) == list(SCENARIOS)
+    for scenario_name, narrative in narratives.items():
+        assert scenario_name in narrative
+    assert server.max_in_flight == len(SCENARIOS)
@@ -0,0 +1,73 @@
+import json
+import sys
+import time
+import types
+import pytest
+from src.llm.backends import StubBackend, RecordingBackend, ReplayBackend, create_llm_backend, stub_response
+from src.llm.async_client import AsyncLLMClient, run_chat_completions
+from src.llm.cache import LLMCache
+
+MESSAGES = [{"role": "system", "content": "You are an expert."}, {"role": "user", "content": "Score these risks."}]
+
+@pytest.fixture
+def transcript_path(tmp_path):
+    return str(tmp_path / "transcripts" / "llm.jsonl")
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(str(tmp_path / "llm.sqlite"), mode='off')
+
+def test_stub_backend_is_deterministic():
+    backend = StubBackend()
+    assert backend.complete("gpt-4", MESSAGES, 0.7, 400) == backend.complete("gpt-4", MESSAGES, 0.7, 400)
+    assert stub_response(MESSAGES) != stub_response(MESSAGES[:1])
+    assert backend.calls == 2
+
+def test_stub_backend_latency_and_jitter():
+    delays = [StubBackend(latency=0.1, jitter=0.05, seed=3)._delay() for _ in range(2)]
+    assert delays[0] == delays[1]
+    backend = StubBackend(latency=0.1, jitter=0.05, seed=3)
+    assert all(0.05 <= backend._delay() <= 0.15 for _ in range(100))
+    assert StubBackend(latency=0.01, jitter=0.05)._delay() >= 0
+
+def test_async_client_overlaps_stub_latency(cache):
+    backend = StubBackend(latency=0.05)
+    client = AsyncLLMClient(backend=backend, max_concurrency=10, cache=cache)
+    requests = [{"messages": [{"role": "user", "content": f"prompt {i}"}]} for i in range(10)]
+    started_at = time.perf_counter()
+    responses = run_chat_completions(requests, client)
+    assert time.perf_counter() - started_at < 0.4
+    assert responses == [stub_response(request["messages"]) for request in requests]
+    assert backend.calls == 10
+
+def test_record_then_replay(transcript_path, cache):
+    recorder = RecordingBackend(StubBackend(latency=0.01), transcript_path)
+    recorded = recorder.complete("gpt-4", MESSAGES, 0.7, 400)
+    requests = [{"messages": [{"role": "user", "content": f"prompt {i}"}], "max_tokens": 50} for i in range(3)]
+    recorded_async = run_chat_completions(requests, AsyncLLMClient(backend=recorder, cache=cache))
+
+    with open(transcript_path) as f:
+        entries = [json.loads(line) for line in f]
+    assert len(entries) == 4
+    assert entries[0]["messages"] == MESSAGES and entries[0]["latency"] >= 0.01
+
+    replay = ReplayBackend(transcript_path)
+    assert replay.complete("gpt-4", MESSAGES, 0.7, 400) == recorded
+    assert run_chat_completions(requests, AsyncLLMClient(backend=replay, cache=cache)) == recorded_async
+    with pytest.raises(KeyError):
+        replay.complete("gpt-4", MESSAGES, 0.2, 400)
+
+def test_create_llm_backend(transcript_path, monkeypatch):
+    assert isinstance(create_llm_backend('stub', latency=0.2), StubBackend)
+    # The record backend wraps OpenAI, which only needs the package to be importable until a request is sent
+    monkeypatch.setitem(sys.modules, 'openai', types.ModuleType('openai'))
+    recorder = create_llm_backend('record', transcript_path)
+    assert isinstance(recorder, RecordingBackend)
+    assert recorder.path == transcript_path
+    RecordingBackend(StubBackend(), transcript_path).complete("gpt-4", MESSAGES, 0.7, 400)
+    replay = create_llm_backend('replay', transcript_path)
+    assert isinstance(replay, ReplayBackend)
+    assert not replay.replay_latency
+    assert create_llm_backend('replay', transcript_path, replay_latency=True).replay_latency
+    with pytest.raises(ValueError):
+        create_llm_backend('carrier-pigeon')
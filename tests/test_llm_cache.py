@@ -0,0 +1,87 @@
+import time
+import pytest
+from src.llm.cache import LLMCache, cache_key
+from src.llm.backends import StubBackend
+from src.llm import client
+
+MESSAGES = [{"role": "system", "content": "You are an expert."}, {"role": "user", "content": "Score these risks."}]
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache" / "llm.sqlite")
+
+@pytest.fixture
+def fake_completion(monkeypatch):
+    calls = []
+    def respond(messages):
+        calls.append(messages)
+        return f"response {len(calls)}"
+    monkeypatch.setattr(client, "_llm_backend", StubBackend(responder=respond))
+    monkeypatch.setattr(client, "_llm_cache", None)
+    return calls
+
+def test_cache_key_covers_request_fields():
+    key = cache_key("gpt-4", MESSAGES, 0.7, 400, "template")
+    assert key == cache_key("gpt-4", [dict(m) for m in MESSAGES], 0.7, 400, "template")
+    assert key != cache_key("gpt-3.5-turbo", MESSAGES, 0.7, 400, "template")
+    assert key != cache_key("gpt-4", MESSAGES, 0.2, 400, "template")
+    assert key != cache_key("gpt-4", MESSAGES, 0.7, 1000, "template")
+    assert key != cache_key("gpt-4", MESSAGES, 0.7, 400, "edited template")
+    assert key != cache_key("gpt-4", MESSAGES[:1], 0.7, 400, "template")
+
+def test_cache_persists_and_counts(cache_path):
+    cache = LLMCache(cache_path)
+    assert cache.get("a") is None
+    cache.put("a", "answer")
+    assert cache.get("a") == "answer"
+    cache.close()
+
+    reopened = LLMCache(cache_path)
+    assert reopened.get("a") == "answer"
+    stats = reopened.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 0 and stats["entries"] == 1
+
+def test_cache_ttl_expiry(cache_path):
+    cache = LLMCache(cache_path, ttl_seconds=0.05)
+    cache.put("a", "answer")
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    cache.put("b", "other")
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 1
+
+def test_cache_size_eviction_is_least_recently_used(cache_path):
+    cache = LLMCache(cache_path, max_bytes=25)
+    cache.put("a", "x" * 10)
+    cache.put("b", "y" * 10)
+    assert cache.get("a") == "x" * 10
+    cache.put("c", "z" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 10
+    assert cache.get("c") == "z" * 10
+
+def test_cache_read_only_and_off_modes(cache_path):
+    LLMCache(cache_path).put("a", "answer")
+    read_only = LLMCache(cache_path, mode='read-only')
+    assert read_only.get("a") == "answer"
+    read_only.put("b", "ignored")
+    assert read_only.get("b") is None
+    assert read_only.stats()["writes"] == 0
+
+    off = LLMCache(cache_path, mode='off')
+    assert off.get("a") is None
+    assert off.stats()["entries"] == 0
+    with pytest.raises(ValueError):
+        LLMCache(cache_path, mode='write-only')
+
+def test_chat_completion_uses_cache(cache_path, fake_completion):
+    client.configure_llm_cache('read-write', cache_path)
+    first = client.chat_completion(MESSAGES, template="template")
+    second = client.chat_completion(MESSAGES, template="template")
+    assert first == second == "response 1"
+    assert len(fake_completion) == 1
+    assert client.get_llm_cache().stats()["hits"] == 1
+
+    client.configure_llm_cache('off', cache_path)
+    assert client.chat_completion(MESSAGES, template="template") == "response 2"
+    assert len(fake_completion) == 2
@@ -0,0 +1,43 @@
+import pytest
+import numpy as np
+from src.sensitivity_analysis.monte_carlo import (
+    perform_monte_carlo_simulations, calculate_risk_impact, calculate_risk_likelihood,
+    calculate_risk_impact_array, calculate_risk_likelihood_array, SCENARIO_PARAMETERS
+)
+from src.models import Risk, SimulationResult
+from src.config import SCENARIOS
+
+@pytest.fixture
+def sample_risks():
+    return [
+        Risk(id=1, description="Physical Risk 1", category="Physical", likelihood=0.7, impact=0.8, subcategory="Acute", tertiary_category="", time_horizon="Short-term", industry_specific=False, sasb_category=""),
+        Risk(id=2, description="Transition Risk 1", category="Transition", likelihood=0.6, impact=0.7, subcategory="Policy", tertiary_category="", time_horizon="Medium-term", industry_specific=True, sasb_category="Energy"),
+        Risk(id=3, description="Market Risk 1", category="Market", likelihood=0.5, impact=0.6, subcategory="Demand", tertiary_category="", time_horizon="Long-term", industry_specific=False, sasb_category=""),
+    ]
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_perform_monte_carlo_simulations(sample_risks, dtype):
+    results = perform_monte_carlo_simulations(sample_risks, SCENARIOS, num_simulations=500, dtype=dtype, seed=0)
+
+    assert set(results) == set(SCENARIOS)
+    for scenario_results in results.values():
+        assert len(scenario_results) == len(sample_risks)
+        for sim_result in scenario_results.values():
+            assert isinstance(sim_result, SimulationResult)
+            assert isinstance(sim_result.impact_distribution, np.ndarray)
+            assert sim_result.impact_distribution.dtype == dtype
+            assert sim_result.impact_distribution.flags.c_contiguous
+            assert sim_result.impact_distribution.shape == (500,)
+            assert np.all((sim_result.impact_distribution >= 0) & (sim_result.impact_distribution <= 1))
+            assert np.all((sim_result.likelihood_distribution >= 0) & (sim_result.likelihood_distribution <= 1))
+
+def test_array_kernels_match_scalar_formulas(sample_risks):
+    scenario = SCENARIOS["Delayed Transition"]
+    params = np.array([[getattr(scenario, param) for param in SCENARIO_PARAMETERS]])
+
+    impacts = calculate_risk_impact_array(np.array([r.impact for r in sample_risks]), params)
+    likelihoods = calculate_risk_likelihood_array(np.array([r.likelihood for r in sample_risks]), params)
+
+    for r, risk in enumerate(sample_risks):
+        assert impacts[r, 0] == pytest.approx(calculate_risk_impact(risk, scenario))
+        assert likelihoods[r, 0] == pytest.approx(calculate_risk_likelihood(risk, scenario))
@@ -0,0 +1,26 @@
+import pytest
+import numpy as np
+from src.sensitivity_analysis.sampling import standard_normal_draws, SAMPLERS
+
+@pytest.mark.parametrize("sampler", SAMPLERS)
+def test_standard_normal_draws_shape_and_moments(sampler):
+    draws = standard_normal_draws(4096, 5, sampler, np.random.default_rng(0))
+
+    assert draws.shape == (4096, 5)
+    assert np.all(np.isfinite(draws))
+    np.testing.assert_allclose(draws.mean(axis=0), 0, atol=0.05)
+    np.testing.assert_allclose(draws.std(axis=0), 1, atol=0.05)
+
+def test_antithetic_draws_are_mirrored():
+    draws = standard_normal_draws(10, 3, 'antithetic', np.random.default_rng(1))
+    np.testing.assert_allclose(draws[:5], -draws[5:])
+
+def test_latin_hypercube_stratifies_each_dimension():
+    from scipy.stats import norm
+    uniforms = norm.cdf(standard_normal_draws(100, 4, 'latin_hypercube', np.random.default_rng(2)))
+    for column in uniforms.T:
+        assert sorted(np.floor(column * 100).astype(int)) == list(range(100))
+
+def test_unknown_sampler_raises():
+    with pytest.raises(ValueError):
+        standard_normal_draws(10, 2, 'halton')
@@ -2,9 +2,16 @@ import pytest
 import numpy as np
 from src.risk_analysis.scenario_analysis import (
     simulate_scenario_impact, monte_carlo_simulation, analyze_scenario_sensitivity,
-    calculate_var_cvar, perform_stress_testing, generate_scenario_narratives
+    calculate_var_cvar, perform_stress_testing, generate_scenario_narratives,
+    calculate_risk_impact, calculate_risk_likelihood, calculate_risk_impact_array,
+    calculate_risk_likelihood_array, scenario_parameter_matrix, streaming_monte_carlo_simulation,
+    compare_sampler_convergence, adaptive_monte_carlo_simulation, perform_stress_grid,
+    adverse_directions, SCENARIO_PARAMETERS, EXTERNAL_PERTURBATION_FIELDS
 )
-from src.models import Risk, ExternalData, Scenario, SimulationResult
+from src.models import Risk, ExternalData, Scenario, SimulationResult, SimulationSummary
+from src.sensitivity_analysis.distribution_store import DistributionStore
+from src.risk_analysis.tail_risk import calculate_tail_risk
+from src.config import SCENARIOS
 
 @pytest.fixture
 def sample_risks():
@@ -23,10 +30,7 @@ def sample_external_data():
 
 @pytest.fixture
 def sample_scenarios():
-    return {
-        "Net Zero 2050": Scenario(name="Net Zero 2050", temp_increase=1.5, carbon_price=250, renewable_energy=0.75, policy_stringency=0.9, biodiversity_loss=0.1, ecosystem_degradation=0.2, financial_stability=0.8, supply_chain_disruption=0.3),
-        "Delayed Transition": Scenario(name="Delayed Transition", temp_increase=2.5, carbon_price=125, renewable_energy=0.55, policy_stringency=0.6, biodiversity_loss=0.3, ecosystem_degradation=0.4, financial_stability=0.6, supply_chain_disruption=0.5),
-    }
+    return {name: SCENARIOS[name] for name in ("Net Zero 2050", "Delayed Transition")}
 
 def test_simulate_scenario_impact(sample_risks, sample_external_data, sample_scenarios):
     scenario = sample_scenarios["Net Zero 2050"]
@@ -59,9 +63,9 @@ def test_monte_carlo_simulation(sample_risks, sample_external_data, sample_scena
     delayed_transition_impacts = np.mean([np.mean(sim.impact_distribution) for sim in results["Delayed Transition"].values()])
     assert net_zero_impacts < delayed_transition_impacts
 
-def test_analyze_scenario_sensitivity(sample_risks, sample_scenarios):
+def test_analyze_scenario_sensitivity(sample_risks, sample_external_data, sample_scenarios):
     scenario = sample_scenarios["Net Zero 2050"]
-    sensitivity_result = analyze_scenario_sensitivity(sample_risks, scenario, "carbon_price", 0.2)
+    sensitivity_result = analyze_scenario_sensitivity(sample_risks, sample_external_data, scenario, "carbon_price", 0.2)
     
     assert "variable" in sensitivity_result
     assert "base_impact" in sensitivity_result
@@ -154,4 +158,150 @@ def test_monte_carlo_simulation_consistency(sample_risks, sample_external_data,
                 np.mean(results1[scenario][risk.id].impact_distribution),
                 np.mean(results2[scenario][risk.id].impact_distribution),
                 rtol=0.1  # Allow for some variation due to randomness
-            )
\ No newline at end of file
+            )
+
+def test_vectorized_kernels_match_scalar_formulas(sample_risks, sample_external_data, sample_scenarios):
+    params = scenario_parameter_matrix(sample_scenarios)[:, None, :]
+    latest = sample_external_data["2021"]
+    gdp_growth = np.full((len(sample_scenarios), 1), latest.gdp_growth)
+    population = np.full((len(sample_scenarios), 1), float(latest.population))
+
+    impacts = calculate_risk_impact_array(np.array([r.impact for r in sample_risks]), params, gdp_growth)
+    likelihoods = calculate_risk_likelihood_array(np.array([r.likelihood for r in sample_risks]), params, population)
+
+    for s, scenario in enumerate(sample_scenarios.values()):
+        for r, risk in enumerate(sample_risks):
+            assert impacts[s, r, 0] == pytest.approx(calculate_risk_impact(risk, sample_external_data, scenario))
+            assert likelihoods[s, r, 0] == pytest.approx(calculate_risk_likelihood(risk, sample_external_data, scenario))
+
+def test_monte_carlo_simulation_independent_of_workers(sample_risks, sample_external_data, sample_scenarios):
+    results1 = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=200, seed=7)
+    results2 = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=200, seed=7, workers=2)
+
+    for scenario in sample_scenarios:
+        for risk in sample_risks:
+            assert len(results1[scenario][risk.id].impact_distribution) == 200
+            np.testing.assert_array_equal(results1[scenario][risk.id].impact_distribution,
+                                          results2[scenario][risk.id].impact_distribution)
+
+def test_streaming_monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios):
+    summaries = streaming_monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=5000, seed=11)
+    full = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=5000, seed=11)
+
+    for scenario in sample_scenarios:
+        for risk in sample_risks:
+            summary = summaries[scenario][risk.id]
+            assert isinstance(summary, SimulationSummary)
+            assert summary.num_simulations == 5000
+            distribution = full[scenario][risk.id].impact_distribution
+            assert summary.mean_impact == pytest.approx(np.mean(distribution), abs=0.01)
+            assert summary.impact_percentiles[95] == pytest.approx(np.percentile(distribution, 95), abs=0.02)
+
+def test_monte_carlo_simulation_memory_mapped_store(sample_risks, sample_external_data, sample_scenarios, tmp_path):
+    store_path = str(tmp_path / "run")
+    stored = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=300, seed=5, store_path=store_path)
+    in_memory = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=300, seed=5)
+
+    for scenario in sample_scenarios:
+        for risk in sample_risks:
+            assert isinstance(stored[scenario][risk.id].impact_distribution, np.memmap)
+            np.testing.assert_array_equal(stored[scenario][risk.id].impact_distribution, in_memory[scenario][risk.id].impact_distribution)
+
+    reopened = DistributionStore.open(store_path)
+    assert reopened.num_simulations == 300
+    assert reopened.risk_ids == [risk.id for risk in sample_risks]
+    var_cvar = calculate_var_cvar(reopened.results())
+    assert set(var_cvar) == set(sample_scenarios)
+
+@pytest.mark.parametrize("sampler", ["antithetic", "latin_hypercube", "sobol"])
+def test_monte_carlo_simulation_samplers(sample_risks, sample_external_data, sample_scenarios, sampler):
+    plain = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=2048, seed=3)
+    results = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=2048, seed=3, sampler=sampler)
+
+    for scenario in sample_scenarios:
+        for risk in sample_risks:
+            assert len(results[scenario][risk.id].impact_distribution) == 2048
+            assert np.mean(results[scenario][risk.id].impact_distribution) == pytest.approx(
+                np.mean(plain[scenario][risk.id].impact_distribution), abs=0.01)
+
+def test_compare_sampler_convergence(sample_risks, sample_external_data, sample_scenarios):
+    convergence = compare_sampler_convergence(sample_risks, sample_external_data, sample_scenarios["Delayed Transition"],
+                                              sample_sizes=(256, 2048), num_replicates=5, reference_size=2 ** 14, seed=0)
+
+    assert set(convergence) == {"plain", "antithetic", "latin_hypercube", "sobol"}
+    for errors in convergence.values():
+        assert set(errors) == {256, 2048}
+        assert all(error >= 0 for error in errors.values())
+    assert convergence["sobol"][2048] < convergence["plain"][256]
+
+def test_adaptive_monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios):
+    results = adaptive_monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, tolerance=0.01,
+                                              max_simulations=20000, seed=4)
+    capped = adaptive_monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, tolerance=1e-6,
+                                             max_simulations=3000, seed=4)
+
+    for scenario in sample_scenarios:
+        assert set(results[scenario]) == {risk.id for risk in sample_risks}
+        for risk in sample_risks:
+            summary = results[scenario][risk.id]
+            assert 0 < summary.num_simulations <= 20000
+            assert 0 <= summary.mean_impact <= 1
+            assert capped[scenario][risk.id].num_simulations == 3000
+
+def test_perform_stress_grid(sample_risks, sample_external_data, sample_scenarios):
+    multiplier_ranges = {
+        "temp_increase": np.linspace(1.0, 2.0, 5),
+        "carbon_price": [1.0, 2.0],
+        "supply_chain_disruption": [1.0, 3.0, 5.0],
+    }
+    results = perform_stress_grid(sample_risks, sample_scenarios, sample_external_data, multiplier_ranges)
+
+    for scenario_name, result in results.items():
+        assert result["impacts"].shape == (30, len(sample_risks))
+        assert result["multipliers"].shape == (30, 3)
+        assert np.all((result["impacts"] >= 0) & (result["impacts"] <= 1))
+        # The unit multiplier grid point reproduces the unstressed scenario
+        unstressed = np.flatnonzero(np.all(result["multipliers"] == 1.0, axis=1))[0]
+        expected = [impact for _, impact in simulate_scenario_impact(sample_risks, sample_external_data, sample_scenarios[scenario_name])]
+        np.testing.assert_allclose(result["impacts"][unstressed], expected)
+        assert result["summary"]["worst_case"]["multipliers"]["temp_increase"] == 2.0
+        assert set(result["summary"]["parameter_level_means"]["carbon_price"]) == {1.0, 2.0}
+
+def test_perform_stress_grid_rejects_unknown_parameter(sample_risks, sample_external_data, sample_scenarios):
+    with pytest.raises(ValueError):
+        perform_stress_grid(sample_risks, sample_scenarios, sample_external_data, {"sea_level": [1.0, 2.0]})
+
+def test_adverse_directions(sample_external_data, sample_scenarios):
+    directions = adverse_directions(scenario_parameter_matrix(sample_scenarios), sample_external_data)
+    dimensions = list(SCENARIO_PARAMETERS) + list(EXTERNAL_PERTURBATION_FIELDS)
+    np.testing.assert_allclose(np.linalg.norm(directions, axis=1), 1.0)
+    assert np.all(directions[:, dimensions.index('temp_increase')] > 0)
+    assert np.all(directions[:, dimensions.index('renewable_energy')] < 0)
+    assert np.all(directions[:, dimensions.index('gdp_growth')] < 0)
+    assert np.all(directions[:, dimensions.index('population')] == 0)
+
+def test_monte_carlo_simulation_importance_sampling(sample_risks, sample_external_data, sample_scenarios):
+    risks = [risk.copy(update={"impact": risk.impact / 4}) for risk in sample_risks]
+    reference = calculate_tail_risk(monte_carlo_simulation(risks, sample_external_data, sample_scenarios, num_simulations=400000, seed=1), [0.995])
+    tilted = monte_carlo_simulation(risks, sample_external_data, sample_scenarios, num_simulations=4000, seed=2, importance_tilt=2.5)
+
+    for scenario in sample_scenarios:
+        weights = tilted[scenario][risks[0].id].weights
+        assert weights.shape == (4000,)
+        assert all(tilted[scenario][risk.id].weights is weights for risk in risks)
+    estimate = calculate_tail_risk(tilted, [0.995])
+    for scenario in sample_scenarios:
+        assert estimate[scenario][0.995]["portfolio"]["CVaR"] == pytest.approx(reference[scenario][0.995]["portfolio"]["CVaR"], rel=0.01)
+
+    var_cvar = calculate_var_cvar(tilted, confidence_level=0.005)
+    for scenario in sample_scenarios:
+        assert var_cvar[scenario][risks[0].id]["CVaR"] >= var_cvar[scenario][risks[0].id]["VaR"]
+
+def test_monte_carlo_simulation_importance_sampling_store(sample_risks, sample_external_data, sample_scenarios, tmp_path):
+    store_path = str(tmp_path / "tilted")
+    stored = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=200, seed=4, store_path=store_path, importance_tilt=2.0)
+    in_memory = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=200, seed=4, importance_tilt=2.0)
+    for scenario in sample_scenarios:
+        for risk in sample_risks:
+            np.testing.assert_array_equal(stored[scenario][risk.id].weights, in_memory[scenario][risk.id].weights)
+            np.testing.assert_array_equal(stored[scenario][risk.id].impact_distribution, in_memory[scenario][risk.id].impact_distribution)
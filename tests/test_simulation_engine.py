@@ -0,0 +1,85 @@
+import pytest
+import numpy as np
+from src.models import Risk, ExternalData, SimulationModel
+from src.config import SCENARIOS
+from src.sensitivity_analysis.simulation_engine import run_simulation_engine, adverse_directions, likelihood_ratio_weights
+from src.sensitivity_analysis.distribution_store import DistributionStore
+from src.risk_analysis.scenario_analysis import monte_carlo_simulation, SCENARIO_MODEL, SCENARIO_MODEL_NAME
+from src.sensitivity_analysis.monte_carlo import SENSITIVITY_MODEL, SENSITIVITY_MODEL_NAME
+
+@pytest.fixture
+def sample_risks():
+    return [
+        Risk(id=1, description="Physical Risk 1", category="Physical", likelihood=0.7, impact=0.4, subcategory="Acute", tertiary_category="", time_horizon="Short-term", industry_specific=False, sasb_category=""),
+        Risk(id=2, description="Transition Risk 1", category="Transition", likelihood=0.6, impact=0.3, subcategory="Policy", tertiary_category="", time_horizon="Medium-term", industry_specific=True, sasb_category="Energy"),
+    ]
+
+@pytest.fixture
+def sample_external_data():
+    return {
+        "2021": ExternalData(year=2021, gdp_growth=5.7, population=7874965732, energy_demand=176431, carbon_price=40, renewable_energy_share=0.31, biodiversity_index=0.68, deforestation_rate=0.48),
+    }
+
+@pytest.fixture
+def simulation_models():
+    return {SCENARIO_MODEL_NAME: SCENARIO_MODEL, SENSITIVITY_MODEL_NAME: SENSITIVITY_MODEL}
+
+def _constant_multipliers(base_params, external_data, normals):
+    return np.ones(normals.shape[:2]), np.ones(normals.shape[:2])
+
+def test_run_simulation_engine_shares_draws(sample_risks, sample_external_data, simulation_models):
+    results = run_simulation_engine(sample_risks, sample_external_data, SCENARIOS, simulation_models, num_simulations=2000, seed=3)
+    standalone = monte_carlo_simulation(sample_risks, sample_external_data, SCENARIOS, num_simulations=2000, seed=3)
+    independent = monte_carlo_simulation(sample_risks, sample_external_data, SCENARIOS, num_simulations=2000, seed=4)
+
+    assert set(results) == set(simulation_models)
+    for scenario in SCENARIOS:
+        for risk in sample_risks:
+            np.testing.assert_array_equal(results[SCENARIO_MODEL_NAME][scenario][risk.id].impact_distribution,
+                                          standalone[scenario][risk.id].impact_distribution)
+            # Common random numbers: both models respond to the same scenario parameter draws
+            sensitivity_impacts = results[SENSITIVITY_MODEL_NAME][scenario][risk.id].impact_distribution
+            shared = np.corrcoef(standalone[scenario][risk.id].impact_distribution, sensitivity_impacts)[0, 1]
+            unshared = np.corrcoef(independent[scenario][risk.id].impact_distribution, sensitivity_impacts)[0, 1]
+            assert shared > 0.2
+            assert abs(unshared) < 0.1
+
+def test_run_simulation_engine_pluggable_model(sample_risks, sample_external_data):
+    models = {"constant": SimulationModel(3, _constant_multipliers)}
+    results = run_simulation_engine(sample_risks, sample_external_data, SCENARIOS, models, num_simulations=100, seed=0, dtype=np.float32)
+    for scenario_results in results["constant"].values():
+        for risk in sample_risks:
+            assert scenario_results[risk.id].impact_distribution.dtype == np.float32
+            np.testing.assert_allclose(scenario_results[risk.id].impact_distribution, risk.impact, rtol=1e-6)
+
+def test_run_simulation_engine_store_paths(sample_risks, sample_external_data, simulation_models, tmp_path):
+    store_path = str(tmp_path / "sensitivity")
+    stored = run_simulation_engine(sample_risks, sample_external_data, SCENARIOS, simulation_models, num_simulations=300, seed=1,
+                                   store_paths={SENSITIVITY_MODEL_NAME: store_path})
+    in_memory = run_simulation_engine(sample_risks, sample_external_data, SCENARIOS, simulation_models, num_simulations=300, seed=1)
+
+    assert DistributionStore.open(store_path).num_simulations == 300
+    for model_name in simulation_models:
+        for scenario in SCENARIOS:
+            for risk in sample_risks:
+                np.testing.assert_array_equal(stored[model_name][scenario][risk.id].impact_distribution,
+                                              in_memory[model_name][scenario][risk.id].impact_distribution)
+
+def test_run_simulation_engine_importance_tilt(sample_risks, sample_external_data, simulation_models):
+    results = run_simulation_engine(sample_risks, sample_external_data, SCENARIOS, simulation_models, num_simulations=500, seed=2, importance_tilt=2.0)
+    for scenario in SCENARIOS:
+        weights = results[SCENARIO_MODEL_NAME][scenario][1].weights
+        np.testing.assert_array_equal(results[SENSITIVITY_MODEL_NAME][scenario][1].weights, weights)
+        assert np.all(weights > 0)
+
+def test_adverse_directions_ignores_unused_dimensions(sample_external_data):
+    base_params = np.ones((2, 12))
+    directions = adverse_directions(SENSITIVITY_MODEL, base_params, sample_external_data, num_dimensions=14)
+    np.testing.assert_allclose(np.linalg.norm(directions, axis=1), 1.0)
+    assert np.all(directions[:, 12:] == 0)
+    assert np.all(adverse_directions(SimulationModel(3, _constant_multipliers), base_params, sample_external_data) == 0)
+
+def test_likelihood_ratio_weights_have_unit_mean():
+    mean_shift = np.array([[1.0, 0.5]])
+    normals = np.random.default_rng(0).standard_normal((1, 200000, 2)) + mean_shift[:, None, :]
+    assert likelihood_ratio_weights(normals, mean_shift).mean() == pytest.approx(1.0, abs=0.02)
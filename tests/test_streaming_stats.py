@@ -0,0 +1,56 @@
+import pytest
+import numpy as np
+from src.sensitivity_analysis.streaming_stats import RunningMoments, HistogramSketch, StreamingAccumulator
+
+@pytest.fixture
+def sample_draws():
+    rng = np.random.default_rng(42)
+    return np.clip(rng.beta(2, 5, size=(4, 20000)), 0, 1)
+
+def test_running_moments_match_numpy(sample_draws):
+    moments = RunningMoments(sample_draws.shape[0])
+    for start in range(0, sample_draws.shape[1], 3000):
+        moments.update(sample_draws[:, start:start + 3000])
+
+    assert moments.count == sample_draws.shape[1]
+    np.testing.assert_allclose(moments.mean, sample_draws.mean(axis=1))
+    np.testing.assert_allclose(moments.std, sample_draws.std(axis=1))
+
+def test_histogram_sketch_percentiles_within_one_bin(sample_draws):
+    sketch = HistogramSketch(sample_draws.shape[0], num_bins=1000)
+    sketch.update(sample_draws)
+
+    for q in (5, 50, 95):
+        np.testing.assert_allclose(sketch.percentile(q), np.percentile(sample_draws, q, axis=1), atol=1e-3)
+
+def test_accumulators_merge_exactly(sample_draws):
+    whole = StreamingAccumulator(sample_draws.shape[0])
+    whole.update(sample_draws)
+
+    left = StreamingAccumulator(sample_draws.shape[0])
+    right = StreamingAccumulator(sample_draws.shape[0])
+    left.update(sample_draws[:, :7000])
+    right.update(sample_draws[:, 7000:])
+    left.merge(right)
+
+    assert left.count == whole.count
+    np.testing.assert_array_equal(left.sketch.counts, whole.sketch.counts)
+    np.testing.assert_allclose(left.moments.mean, whole.moments.mean)
+    np.testing.assert_allclose(left.moments.m2, whole.moments.m2)
+
+def test_merge_rejects_different_binning():
+    with pytest.raises(ValueError):
+        HistogramSketch(2, num_bins=10).merge(HistogramSketch(2, num_bins=20))
+
+def test_subset_and_confidence_half_widths(sample_draws):
+    accumulator = StreamingAccumulator(sample_draws.shape[0])
+    accumulator.update(sample_draws[:, :1000])
+    wide = accumulator.confidence_half_widths((5, 95), z=1.96)
+    accumulator.update(sample_draws[:, 1000:])
+    narrow = accumulator.confidence_half_widths((5, 95), z=1.96)
+    assert np.all(narrow < wide)
+
+    selected = accumulator.subset(np.array([2, 0]))
+    assert selected.count == accumulator.count
+    np.testing.assert_array_equal(selected.moments.mean, accumulator.moments.mean[[2, 0]])
+    np.testing.assert_array_equal(selected.sketch.counts, accumulator.sketch.counts[[2, 0]])
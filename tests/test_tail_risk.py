@@ -0,0 +1,108 @@
+import pytest
+import numpy as np
+from src.models import SimulationResult
+from src.sensitivity_analysis.distribution_store import DistributionStore
+from src.risk_analysis.tail_risk import (stack_distributions, stack_weights, select_quantiles, var_cvar_array, weighted_quantiles, weighted_var_cvar_array,
+                                         tail_statistics, tail_risk_from_array, calculate_tail_risk)
+
+@pytest.fixture
+def simulation_results():
+    rng = np.random.default_rng(0)
+    shock = rng.normal(0, 0.1, (2, 5000))
+    return {
+        scenario: {
+            risk_id: SimulationResult(risk_id, scenario, np.clip(base + scale * shock[s] + rng.normal(0, 0.02, 5000), 0, 1),
+                                      np.full(5000, 0.5))
+            for risk_id, base, scale in [(1, 0.5, 1.0), (2, 0.3, 0.5), (3, 0.2, 0.1)]
+        } for s, scenario in enumerate(["Scenario1", "Scenario2"])
+    }
+
+def test_select_quantiles_matches_percentile():
+    values = np.random.default_rng(1).random((3, 4, 1001))
+    levels = [0.05, 0.5, 0.95, 0.999]
+    expected = np.percentile(values, np.array(levels) * 100, axis=-1)
+    np.testing.assert_allclose(select_quantiles(values, levels), expected)
+
+def test_var_cvar_array_tail_mean():
+    values = np.arange(100, dtype=float)
+    var, cvar = var_cvar_array(values, [0.9])
+    assert var[0] == pytest.approx(np.percentile(values, 90))
+    assert cvar[0] == pytest.approx(values[values > var[0]].mean())
+
+def test_stack_distributions(simulation_results):
+    scenario_names, risk_ids, impacts = stack_distributions(simulation_results)
+    assert scenario_names == ["Scenario1", "Scenario2"]
+    assert risk_ids == [1, 2, 3]
+    assert impacts.shape == (2, 3, 5000)
+
+def test_stack_distributions_rejects_mismatched_risks(simulation_results):
+    del simulation_results["Scenario2"][3]
+    with pytest.raises(ValueError):
+        stack_distributions(simulation_results)
+
+def test_calculate_tail_risk(simulation_results):
+    results = calculate_tail_risk(simulation_results, confidence_levels=(0.95, 0.99))
+    for scenario, by_level in results.items():
+        assert set(by_level) == {0.95, 0.99}
+        for level, result in by_level.items():
+            portfolio = result["portfolio"]
+            assert portfolio["CVaR"] >= portfolio["VaR"]
+            # Component contributions are an exact allocation of the portfolio CVaR
+            assert sum(r["component_CVaR"] for r in result["risks"].values()) == pytest.approx(portfolio["CVaR"])
+            # Diversification: the portfolio tail is no worse than the sum of the stand-alone tails
+            assert portfolio["CVaR"] <= sum(r["CVaR"] for r in result["risks"].values()) + 1e-12
+        assert by_level[0.99]["portfolio"]["VaR"] >= by_level[0.95]["portfolio"]["VaR"]
+        risks = by_level[0.95]["risks"]
+        # The risk most exposed to the shared shock contributes most to the tail
+        assert risks[1]["marginal_CVaR"] > risks[2]["marginal_CVaR"] > risks[3]["marginal_CVaR"]
+        assert risks[1]["component_CVaR"] > risks[3]["component_CVaR"]
+
+def test_tail_risk_from_array_accepts_memory_mapped_buffer(simulation_results, tmp_path):
+    scenario_names, risk_ids, impacts = stack_distributions(simulation_results)
+    path = str(tmp_path / "impacts.npy")
+    np.save(path, impacts)
+    mapped = np.load(path, mmap_mode='r')
+    assert tail_risk_from_array(scenario_names, risk_ids, mapped) == calculate_tail_risk(simulation_results)
+
+def test_stack_distributions_keeps_store_buffers(simulation_results, tmp_path):
+    scenario_names, risk_ids, impacts = stack_distributions(simulation_results)
+    store = DistributionStore.create(str(tmp_path / "run"), scenario_names, risk_ids, impacts.shape[2], weighted=True)
+    for s, scenario_name in enumerate(scenario_names):
+        store.write(scenario_name, 0, impacts[s], impacts[s], np.full(impacts.shape[2], 1.0 + s))
+    store.flush()
+    reopened = DistributionStore.open(store.path)
+
+    # Store-backed results are evaluated on the mapped buffers without stacking a copy
+    _, _, stored_impacts = stack_distributions(reopened.results())
+    assert stored_impacts is reopened.impacts
+    assert stack_weights(reopened.results()) is reopened.weights
+    assert calculate_tail_risk(reopened.results()) == tail_risk_from_array(scenario_names, risk_ids, impacts, weights=reopened.weights)
+    # Independently allocated results are still stacked
+    assert not isinstance(stack_distributions(simulation_results)[2], np.memmap)
+
+def test_weighted_quantiles_with_unit_weights():
+    values = np.random.default_rng(2).random((2, 1000))
+    quantiles = weighted_quantiles(values, np.ones(1000), [0.5, 0.99])
+    np.testing.assert_allclose(quantiles, np.percentile(values, [50, 99], axis=-1, method='higher'), atol=2e-3)
+
+def test_weighted_var_cvar_array_reweights_tilted_draws():
+    # Draws from N(2.5, 1) reweighted by the likelihood ratio against N(0, 1)
+    draws = np.random.default_rng(3).normal(2.5, 1, 200000)
+    weights = np.exp(0.5 * 2.5 ** 2 - 2.5 * draws)
+    var, cvar = weighted_var_cvar_array(draws, weights, [0.99])
+    assert var[0] == pytest.approx(2.326, abs=0.02)
+    assert cvar[0] == pytest.approx(2.665, abs=0.02)
+
+@pytest.mark.parametrize("weighted", [False, True])
+def test_marginal_cvar_matches_removing_the_risk(simulation_results, weighted):
+    scenario_names, risk_ids, impacts = stack_distributions(simulation_results)
+    weights = np.random.default_rng(4).exponential(1, impacts.shape[::2]) if weighted else None
+    levels = (0.9, 0.99)
+    results = tail_risk_from_array(scenario_names, risk_ids, impacts, levels, weights)
+    for s, scenario in enumerate(scenario_names):
+        for r, risk_id in enumerate(risk_ids):
+            without_risk = np.delete(impacts[s], r, axis=0).sum(axis=0)
+            _, cvar = tail_statistics(without_risk, levels, None if weights is None else weights[s])
+            for l, level in enumerate(levels):
+                expected = results[scenario][level]["portfolio"]["CVaR"] - cvar[l]
+                assert results[scenario][level]["risks"][risk_id]["marginal_CVaR"] == pytest.approx(expected)